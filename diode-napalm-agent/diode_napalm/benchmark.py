@@ -0,0 +1,393 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Benchmark the translation and serialization of captured device data."""
+
+import json
+import logging
+import platform
+import statistics
+import time
+import tracemalloc
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+
+from netboxlabs.diode.sdk.version import version_semver as sdk_version_semver
+from pydantic import BaseModel, Field
+
+from diode_napalm.client import ingest_request
+from diode_napalm.collected import CollectedData
+from diode_napalm.getters import GETTERS
+from diode_napalm.snapshot import read_snapshot, snapshot_files
+from diode_napalm.storage import atomic_open
+from diode_napalm.translate import translate_data
+from diode_napalm.version import version_semver
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Name of the Diode SDK in the ingest requests, payload sizes match the agent ones
+SDK_NAME = "diode-sdk-python"
+
+# Optional file of a capture directory holding the driver and site of the device
+CAPTURE_METADATA = "metadata.json"
+
+STAGES = ("compact", "translate", "serialize")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DeviceBenchmark(BaseModel):
+    """Model for the benchmark results of a device."""
+
+    hostname: str
+    interfaces: int
+    addresses: int
+    entities: int
+    payload_bytes: int = Field(description="Size of the serialized ingest request")
+    timings: dict[str, float] = Field(
+        default_factory=dict, description="Median seconds spent in each stage"
+    )
+    allocated_bytes: int = Field(
+        description="Peak memory allocated by the stages, traced on a separate pass"
+    )
+
+    @property
+    def seconds(self) -> float:
+        """Seconds spent in all the stages."""
+        return sum(self.timings.values())
+
+
+class BenchmarkReport(BaseModel):
+    """Model for the results of a benchmark run, with one result per device."""
+
+    created_at: datetime = Field(default_factory=_now)
+    agent_version: str = Field(default_factory=version_semver)
+    python_version: str = Field(default_factory=platform.python_version)
+    repeat: int
+    summary: dict[str, float] = Field(default_factory=dict)
+    devices: list[DeviceBenchmark] = Field(default_factory=list)
+
+    def summarize(self):
+        """Compute the aggregate results of the devices."""
+        seconds = sum(device.seconds for device in self.devices)
+        entities = sum(device.entities for device in self.devices)
+        self.summary = {
+            "devices": len(self.devices),
+            "entities": entities,
+            "payload_bytes": sum(device.payload_bytes for device in self.devices),
+            "seconds": seconds,
+            "devices_per_second": len(self.devices) / seconds if seconds else 0.0,
+            "entities_per_second": entities / seconds if seconds else 0.0,
+            "peak_allocated_bytes": max(
+                (device.allocated_bytes for device in self.devices), default=0
+            ),
+        }
+        for stage in STAGES:
+            self.summary[f"{stage}_seconds"] = sum(
+                device.timings.get(stage, 0.0) for device in self.devices
+            )
+
+
+def capture_directories(path: Path) -> list[Path]:
+    """
+    List the capture directories of a directory.
+
+    A capture directory holds the output of the getters of a device, one
+    ``<getter>.json`` file per getter as written by ``napalm ... call <getter>``,
+    and optionally a ``metadata.json`` file with the ``driver`` and ``site`` of
+    the device. It is named after the device.
+
+    Args:
+    ----
+        path (Path): A directory searched recursively.
+
+    Returns:
+    -------
+        list[Path]: The directories holding a ``get_facts.json`` file, sorted.
+
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return []
+    return sorted(facts.parent for facts in path.rglob("get_facts.json"))
+
+
+def read_capture_directory(directory: Path) -> tuple[str, dict]:
+    """
+    Read the getters output of a capture directory.
+
+    Args:
+    ----
+        directory (Path): The capture directory.
+
+    Returns:
+    -------
+        tuple[str, dict]: The directory name and the data, as passed to ``translate_data``.
+
+    """
+    data = {}
+    metadata = directory / CAPTURE_METADATA
+    if metadata.is_file():
+        with open(metadata) as f:
+            data.update(json.load(f))
+    for getter, key in GETTERS.items():
+        getter_path = directory / f"{getter}.json"
+        if getter_path.is_file():
+            with open(getter_path) as f:
+                data[key] = json.load(f)
+    return directory.name, data
+
+
+def iter_captures(path: Path) -> Iterator[tuple[str, dict]]:
+    """
+    Iterate over the captured data of a file or directory, reading it one device at a time.
+
+    Capture directories and snapshot files are both read. Files that can't be
+    read are logged and skipped.
+
+    Args:
+    ----
+        path (Path): A snapshot file, or a directory of capture directories and
+            snapshot files searched recursively.
+
+    Returns:
+    -------
+        Iterator[tuple[str, dict]]: The device names and data.
+
+    """
+    directories = capture_directories(path)
+    for directory in directories:
+        try:
+            yield read_capture_directory(directory)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping capture directory %s: %s", directory, e)
+    for file_path in snapshot_files(path):
+        if any(directory in file_path.parents for directory in directories):
+            continue
+        try:
+            snapshot = read_snapshot(file_path)
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping snapshot file %s: %s", file_path, e)
+            continue
+        yield snapshot.hostname, snapshot.data
+
+
+def _traced_peak(data: dict, sdk_version: str) -> int:
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        entities = translate_data(CollectedData.from_napalm(data))
+        ingest_request(entities, SDK_NAME, sdk_version).SerializeToString()
+        return tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+
+def benchmark_device(
+    hostname: str, data: dict, repeat: int = 5
+) -> DeviceBenchmark | None:
+    """
+    Benchmark the compaction, translation and serialization of the data of a device.
+
+    Each stage is timed ``repeat`` times and the median kept. Allocations are
+    traced on a separate pass, since tracing slows every allocation down.
+
+    Args:
+    ----
+        hostname (str): The device name.
+        data (dict): The collected data, as passed to ``translate_data``.
+        repeat (int): Number of timed passes.
+
+    Returns:
+    -------
+        DeviceBenchmark | None: The results, None if the data holds no facts.
+
+    """
+    if CollectedData.from_napalm(data).device is None:
+        return None
+    sdk_version = sdk_version_semver()
+    samples = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        collected = CollectedData.from_napalm(data)
+        compacted = time.perf_counter()
+        entities = translate_data(collected)
+        translated = time.perf_counter()
+        payload = ingest_request(entities, SDK_NAME, sdk_version).SerializeToString()
+        serialized = time.perf_counter()
+        samples["compact"].append(compacted - started)
+        samples["translate"].append(translated - compacted)
+        samples["serialize"].append(serialized - translated)
+    return DeviceBenchmark(
+        hostname=hostname,
+        interfaces=len(collected.interfaces),
+        addresses=sum(len(addresses) for addresses in collected.interfaces_ip.values()),
+        entities=len(entities),
+        payload_bytes=len(payload),
+        timings={stage: statistics.median(times) for stage, times in samples.items()},
+        allocated_bytes=_traced_peak(data, sdk_version),
+    )
+
+
+def run_benchmark(path: Path, repeat: int = 5) -> BenchmarkReport:
+    """
+    Benchmark the captured data of every device of a file or directory.
+
+    Args:
+    ----
+        path (Path): A snapshot file, or a directory of capture directories and
+            snapshot files.
+        repeat (int): Number of timed passes per device.
+
+    Returns:
+    -------
+        BenchmarkReport: The results of the devices and their aggregate.
+
+    """
+    report = BenchmarkReport(repeat=repeat)
+    for hostname, data in iter_captures(path):
+        result = benchmark_device(hostname, data, repeat)
+        if result is None:
+            logger.warning("Skipping %s: no facts were captured", hostname)
+            continue
+        logger.info(
+            "Hostname %s: %d entities, %d bytes in %.2f ms",
+            hostname,
+            result.entities,
+            result.payload_bytes,
+            result.seconds * 1000,
+        )
+        report.devices.append(result)
+    report.summarize()
+    return report
+
+
+def write_benchmark(path: Path, report: BenchmarkReport):
+    """
+    Write benchmark results to a JSON file, replacing the previous one atomically.
+
+    Args:
+    ----
+        path (Path): The results file.
+        report (BenchmarkReport): The benchmark results.
+
+    """
+    with atomic_open(path) as f:
+        f.write(report.model_dump_json(indent=2))
+
+
+def read_benchmark(path: Path) -> BenchmarkReport:
+    """
+    Read benchmark results from a JSON file.
+
+    Args:
+    ----
+        path (Path): The results file.
+
+    Returns:
+    -------
+        BenchmarkReport: The benchmark results.
+
+    """
+    with open(path) as f:
+        return BenchmarkReport.model_validate_json(f.read())
+
+
+def format_report(report: BenchmarkReport) -> str:
+    """
+    Format benchmark results as a table, one line per device and a total line.
+
+    Args:
+    ----
+        report (BenchmarkReport): The benchmark results.
+
+    Returns:
+    -------
+        str: The table.
+
+    """
+    lines = [
+        f"{'device':<32} {'interfaces':>10} {'addresses':>10} {'entities':>9} "
+        f"{'bytes':>10} {'ms':>9} {'alloc KiB':>10}"
+    ]
+    for device in report.devices:
+        lines.append(
+            f"{device.hostname:<32} {device.interfaces:>10} {device.addresses:>10} "
+            f"{device.entities:>9} {device.payload_bytes:>10} "
+            f"{device.seconds * 1000:>9.2f} {device.allocated_bytes / 1024:>10.1f}"
+        )
+    summary = report.summary
+    lines.append(
+        f"{'total':<32} {'':>10} {'':>10} {int(summary['entities']):>9} "
+        f"{int(summary['payload_bytes']):>10} {summary['seconds'] * 1000:>9.2f} "
+        f"{summary['peak_allocated_bytes'] / 1024:>10.1f}"
+    )
+    lines.append(
+        f"{int(summary['devices'])} devices, "
+        f"{summary['devices_per_second']:.1f} devices/s, "
+        f"{summary['entities_per_second']:.0f} entities/s, median of "
+        f"{report.repeat} passes"
+    )
+    return "\n".join(lines)
+
+
+def _change(baseline: float, current: float) -> str:
+    if not baseline:
+        return "n/a"
+    return f"{(current - baseline) / baseline:+.1%}"
+
+
+def format_comparison(baseline: BenchmarkReport, current: BenchmarkReport) -> str:
+    """
+    Format the changes of benchmark results against a baseline run.
+
+    Devices are matched by name, and the totals only cover the devices present
+    in both runs so that captures added or removed in between don't skew them.
+
+    Args:
+    ----
+        baseline (BenchmarkReport): The results of the baseline run.
+        current (BenchmarkReport): The results of the current run.
+
+    Returns:
+    -------
+        str: One line per device with the change of time, payload size and
+        allocations, and a total line.
+
+    """
+    previous = {device.hostname: device for device in baseline.devices}
+    lines = [
+        f"Compared with {baseline.agent_version} of {baseline.created_at:%Y-%m-%d %H:%M}",
+        f"{'device':<32} {'time':>9} {'bytes':>9} {'alloc':>9}",
+    ]
+    totals = [0.0] * 6
+    for device in current.devices:
+        before = previous.get(device.hostname)
+        if before is None:
+            lines.append(f"{device.hostname:<32} not in the baseline")
+            continue
+        values = (
+            before.seconds,
+            device.seconds,
+            before.payload_bytes,
+            device.payload_bytes,
+            before.allocated_bytes,
+            device.allocated_bytes,
+        )
+        totals = [total + value for total, value in zip(totals, values, strict=True)]
+        lines.append(
+            f"{device.hostname:<32} {_change(*values[0:2]):>9} "
+            f"{_change(*values[2:4]):>9} {_change(*values[4:6]):>9}"
+        )
+    lines.append(
+        f"{'total':<32} {_change(*totals[0:2]):>9} {_change(*totals[2:4]):>9} "
+        f"{_change(*totals[4:6]):>9}"
+    )
+    return "\n".join(lines)
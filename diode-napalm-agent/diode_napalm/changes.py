@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Ingest only the objects of a device that changed since its previous poll."""
+
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+from netboxlabs.diode.sdk.ingester import Device, Entity, Interface, IPAddress
+
+from diode_napalm.storage import HostStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Key prefixes of the objects owned by the polled device, tombstoned once removed
+INTERFACE_KEY = "interface:"
+ADDRESS_KEY = "ip:"
+
+
+def _fingerprint(messages) -> str:
+    digest = hashlib.blake2b(digest_size=8)
+    for message in messages:
+        digest.update(message.SerializeToString(deterministic=True))
+    return digest.hexdigest()
+
+
+def entity_key(entity: Entity, device_name: str) -> str:
+    """
+    Return the key identifying the object of an entity across polls of a device.
+
+    Interfaces and IP addresses of the polled device have their own keys, as
+    they are tombstoned when removed. LLDP neighbor interfaces and ARP addresses
+    are only forgotten.
+
+    Args:
+    ----
+        entity (Entity): The translated entity.
+        device_name (str): The name of the polled device.
+
+    Returns:
+    -------
+        str: The object key.
+
+    """
+    kind = entity.WhichOneof("entity")
+    value = getattr(entity, kind)
+    if kind == "interface":
+        if value.device.name == device_name:
+            return f"{INTERFACE_KEY}{value.name}"
+        return f"neighbor-interface:{value.device.name}:{value.name}"
+    if kind == "ip_address":
+        if value.interface.name and value.interface.device.name == device_name:
+            return f"{ADDRESS_KEY}{value.address}"
+        return f"address:{value.address}"
+    if kind == "prefix":
+        return f"prefix:{value.prefix}"
+    if kind == "device":
+        return f"device:{value.name}"
+    return f"{kind}:{_fingerprint([value])}"
+
+
+def fingerprint_entities(
+    entities: list[Entity], device_name: str
+) -> tuple[dict[str, list[Entity]], dict[str, str]]:
+    """
+    Group the entities of a device by object and fingerprint each object.
+
+    Args:
+    ----
+        entities (list[Entity]): The translated entities of the device.
+        device_name (str): The name of the polled device.
+
+    Returns:
+    -------
+        tuple[dict[str, list[Entity]], dict[str, str]]: The entities and the
+        fingerprint of each object key.
+
+    """
+    groups: dict[str, list[Entity]] = {}
+    for entity in entities:
+        groups.setdefault(entity_key(entity, device_name), []).append(entity)
+    fingerprints = {key: _fingerprint(group) for key, group in groups.items()}
+    return groups, fingerprints
+
+
+def tombstone(key: str, device: Device) -> Entity | None:
+    """
+    Build the entity recording the removal of an object of the polled device.
+
+    Diode ingestion has no deletion, so removed interfaces are disabled and the
+    addresses removed from the device interfaces are deprecated.
+
+    Args:
+    ----
+        key (str): The key of the removed object.
+        device (Device): The reference of the polled device.
+
+    Returns:
+    -------
+        Entity | None: The tombstone, None for objects that are only forgotten.
+
+    """
+    if key.startswith(INTERFACE_KEY):
+        return Entity(
+            interface=Interface(
+                name=key.removeprefix(INTERFACE_KEY), device=device, enabled=False
+            )
+        )
+    if key.startswith(ADDRESS_KEY):
+        return Entity(
+            ip_address=IPAddress(
+                address=key.removeprefix(ADDRESS_KEY), status="deprecated"
+            )
+        )
+    return None
+
+
+class FingerprintStore(HostStore):
+    """
+    Fingerprints of the objects ingested for each device, by object key.
+
+    Polls of a device are diffed against the fingerprints of its last ingested
+    poll, so only the added and modified objects are sent, along with the
+    tombstones of the removed ones. The fingerprints of a poll are only
+    committed once its ingestion succeeded, so a failed ingestion is sent again
+    in full by the next poll. Fingerprints are kept in memory as compressed
+    JSON, or in one compressed JSON file per device when a directory is
+    configured. Disabled until configured.
+    """
+
+    def __init__(self):
+        """Initialize a disabled store."""
+        super().__init__()
+        self._pending: dict[str, dict[str, str]] = {}
+        self.enabled = False
+
+    def configure(self, enabled: bool, directory: Path | None = None):
+        """
+        Enable or disable the store, dropping the fingerprints held in memory.
+
+        Args:
+        ----
+            enabled (bool): Whether polls are diffed.
+            directory (Path | None): Directory the fingerprints are persisted in,
+                in memory if unset.
+
+        """
+        super().configure(directory)
+        with self._lock:
+            self._pending = {}
+            self.enabled = enabled
+
+    def get(self, hostname: str) -> dict[str, str] | None:
+        """
+        Return the fingerprints of the last ingested poll of a device.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+
+        Returns:
+        -------
+            dict[str, str] | None: Object key to fingerprint, None if the device
+            was never ingested.
+
+        """
+        try:
+            encoded = self.read(hostname)
+            return None if encoded is None else json.loads(encoded)
+        except (OSError, ValueError) as e:
+            logger.warning(
+                "Hostname %s: ignoring unreadable fingerprints: %s", hostname, e
+            )
+            return None
+
+    def diff(self, hostname: str, entities: list[Entity]) -> list[Entity]:
+        """
+        Keep the entities of the objects added or modified since the last ingested poll.
+
+        The fingerprints of the poll are held until ``commit``.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            entities (list[Entity]): The translated entities of the poll.
+
+        Returns:
+        -------
+            list[Entity]: The changed entities followed by the tombstones of the
+            removed objects, all the entities on the first poll.
+
+        """
+        if not entities or entities[0].WhichOneof("entity") != "device":
+            return entities
+        device = entities[0].device
+        groups, fingerprints = fingerprint_entities(entities, device.name)
+        previous = self.get(hostname)
+        with self._lock:
+            self._pending[hostname] = fingerprints
+        if previous is None:
+            return entities
+
+        changed = [
+            entity
+            for key, group in groups.items()
+            if previous.get(key) != fingerprints[key]
+            for entity in group
+        ]
+        added = sum(1 for key in fingerprints if key not in previous)
+        modified = sum(
+            1
+            for key, fingerprint in fingerprints.items()
+            if previous.get(key, fingerprint) != fingerprint
+        )
+        device_ref = Device(name=device.name, site=device.site)
+        removed = [key for key in previous if key not in fingerprints]
+        tombstones = [
+            entity
+            for entity in (tombstone(key, device_ref) for key in removed)
+            if entity is not None
+        ]
+        logger.info(
+            "Hostname %s: %d objects added, %d modified, %d removed, %d unchanged",
+            hostname,
+            added,
+            modified,
+            len(removed),
+            len(fingerprints) - added - modified,
+        )
+        return changed + tombstones
+
+    def commit(self, hostname: str):
+        """
+        Record the fingerprints of the last poll of a device, once ingested.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+
+        """
+        with self._lock:
+            fingerprints = self._pending.pop(hostname, None)
+        if fingerprints is None:
+            return
+        encoded = json.dumps(fingerprints, separators=(",", ":")).encode()
+        try:
+            self.write(hostname, encoded)
+        except OSError as e:
+            logger.warning("Hostname %s: unable to write fingerprints: %s", hostname, e)
+
+    def close(self):
+        """Drop the fingerprints held in memory and disable the store."""
+        self.configure(False)
+
+
+fingerprint_store = FingerprintStore()
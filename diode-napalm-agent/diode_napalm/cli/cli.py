@@ -5,15 +5,60 @@
 import argparse
 import logging
 import sys
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from importlib.metadata import version
+from pathlib import Path
 
 import netboxlabs.diode.sdk.version as SdkVersion
 from dotenv import load_dotenv
-from napalm import get_network_driver
 
+from diode_napalm.benchmark import (
+    format_comparison,
+    format_report,
+    read_benchmark,
+    run_benchmark,
+    write_benchmark,
+)
+from diode_napalm.changes import fingerprint_store
 from diode_napalm.client import Client
-from diode_napalm.discovery import discover_device_driver, supported_drivers
+from diode_napalm.collected import CollectedData
+from diode_napalm.coordination import (
+    LeaseKeeper,
+    ShardLease,
+    create_lease_store,
+    default_worker_id,
+    device_key,
+    device_shard,
+    run_coordinator,
+    run_worker,
+)
+from diode_napalm.discovery import (
+    discover_device_driver,
+    get_network_driver,
+    get_supported_drivers,
+    preload_drivers,
+)
+from diode_napalm.getters import GETTERS, collect, getter_cache, getter_stats
+from diode_napalm.inventory import PolicyInventory, policy_devices
+from diode_napalm.isolation import process_pool
+from diode_napalm.ledger import (
+    DeviceOutcome,
+    RunReport,
+    read_ledger,
+    run_ledger,
+    write_ledger,
+)
+from diode_napalm.logs import LOG_FORMATS, configure_logging, log_context
+from diode_napalm.options import RunOptions
 from diode_napalm.parser import (
     Diode,
     DiscoveryConfig,
@@ -21,26 +66,43 @@ from diode_napalm.parser import (
     Policy,
     parse_config_file,
 )
+from diode_napalm.pipeline import ingest_pipeline
+from diode_napalm.plan import build_plan, format_plan
+from diode_napalm.profiling import profile_run, tracer
+from diode_napalm.sessions import DEFAULT_IDLE_TIMEOUT, session_pool
+from diode_napalm.snapshot import read_snapshot, snapshot_files, write_snapshot
+from diode_napalm.translators import register_translator, reset_translators
 from diode_napalm.version import version_semver
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def run_driver(info: Napalm, config: DiscoveryConfig):
+def open_session(info: Napalm, getters: list[str], outcome: DeviceOutcome) -> dict:
     """
-    Run the device driver code for a single info item.
+    Discover the device driver if needed, then run the getters in a device session.
+
+    The session is borrowed from the session pool when it is enabled, opened for
+    the getters and closed after otherwise.
 
     Args:
     ----
-        info: Information data for the device.
-        config: Configuration data containing site information.
+        info: Information data for the device, its driver is set once discovered.
+        getters: The getters to run.
+        outcome: Outcome of the device, filled with the stage timings.
+
+    Returns:
+    -------
+        dict: The collected data, keyed as expected by ``translate_data``.
 
     """
+    supported_drivers = get_supported_drivers()
     if info.driver is None:
-        logger.info(f"Hostname {info.hostname}: Driver not informed, discovering it")
-        info.driver = discover_device_driver(info)
+        logger.info("Hostname %s: Driver not informed, discovering it", info.hostname)
+        started = time.perf_counter()
+        with tracer.span("discover_driver", hostname=info.hostname):
+            info.driver = discover_device_driver(info)
+        outcome.timings["discover"] = time.perf_counter() - started
         if not info.driver:
             raise Exception(
                 f"Hostname {info.hostname}: Not able to discover device driver"
@@ -52,23 +114,248 @@ def run_driver(info: Napalm, config: DiscoveryConfig):
             f"\n\n\tpip install napalm-{info.driver.replace('_', '-')}\n"
         )
 
-    logger.info(f"Hostname {info.hostname}: Get driver '{info.driver}'")
+    outcome.driver = info.driver
+    logger.info("Hostname %s: Get driver '%s'", info.hostname, info.driver)
     np_driver = get_network_driver(info.driver)
-    logger.info(f"Hostname {info.hostname}: Getting information")
-    with np_driver(
-        info.hostname, info.username, info.password, info.timeout, info.optional_args
-    ) as device:
-        data = {
-            "driver": info.driver,
-            "site": config.netbox.get("site", None),
-            "device": device.get_facts(),
-            "interface": device.get_interfaces(),
-            "interface_ip": device.get_interfaces_ip(),
-        }
-        Client().ingest(info.hostname, data)
-
-
-def start_policy(name: str, cfg: Policy, max_workers: int):
+    logger.info("Hostname %s: Getting information", info.hostname)
+    started = time.perf_counter()
+    with tracer.span(
+        "collect", hostname=info.hostname, driver=info.driver, getters=getters
+    ):
+        if session_pool.enabled:
+            collected, timings = session_pool.run(
+                info,
+                np_driver,
+                lambda device: collect(device, info.hostname, info.driver, getters),
+            )
+        else:
+            with np_driver(
+                info.hostname,
+                info.username,
+                info.password,
+                info.timeout,
+                info.optional_args,
+            ) as device:
+                collected, timings = collect(
+                    device, info.hostname, info.driver, getters
+                )
+    outcome.timings["collect"] = time.perf_counter() - started
+    logger.debug("Hostname %s: getters timings %s", info.hostname, timings)
+    return collected
+
+
+def _refreshed_output(
+    collected: dict, getters: list[str], refresh: dict[str, int]
+) -> dict[str, object]:
+    return {
+        getter: collected[GETTERS[getter]]
+        for getter in getters
+        if getter in refresh and GETTERS[getter] in collected
+    }
+
+
+def collect_in_process(
+    info: Napalm,
+    getters: list[str],
+    cached: dict,
+    refresh: dict[str, int],
+    site: str | None,
+    raw: bool,
+) -> tuple[str, dict[str, float], dict[str, object], dict | CollectedData]:
+    """
+    Collect the data of a device, in a session worker process.
+
+    Only the compact form of the data is sent back to the agent process, unless
+    the raw data is needed for a snapshot.
+
+    Args:
+    ----
+        info: Information data for the device.
+        getters: The getters to run.
+        cached: The fresh cached getters output, keyed as expected by ``translate_data``.
+        refresh: Getter name to refresh interval in seconds.
+        site: The NetBox site of the device.
+        raw: Whether to return the raw data instead of its compact form.
+
+    Returns:
+    -------
+        tuple: The device driver, the stage timings, the output of the getters
+        to cache, and the collected data.
+
+    """
+    outcome = DeviceOutcome(policy="", hostname=info.hostname)
+    with log_context(hostname=info.hostname):
+        collected = open_session(info, getters, outcome)
+    refreshed = _refreshed_output(collected, getters, refresh)
+    data = {"driver": info.driver, "site": site, **cached, **collected}
+    del collected
+    if not raw:
+        data = CollectedData.from_napalm(data)
+    return info.driver, outcome.timings, refreshed, data
+
+
+def run_driver(
+    info: Napalm,
+    config: DiscoveryConfig,
+    options: RunOptions | None = None,
+    outcome: DeviceOutcome | None = None,
+) -> bool:
+    """
+    Run the device driver code for a single info item.
+
+    The device session runs in a session worker process when the process pool
+    is enabled, in the calling thread otherwise. When the ingest pipeline is
+    enabled, the device is collected once the memory budget allows it and its
+    data is handed over to the pipeline.
+
+    Args:
+    ----
+        info: Information data for the device.
+        config: Configuration data containing site information.
+        options: Run options, the collected data is ingested by default.
+        outcome: Outcome of the device, filled with the stage timings and entity count.
+
+    Returns:
+    -------
+        bool: Whether the outcome is completed and recorded by the ingest pipeline.
+
+    """
+    if outcome is None:
+        outcome = DeviceOutcome(policy="", hostname=info.hostname)
+    now = time.time()
+    getters, cached = getter_cache.plan(
+        info.hostname, config.getters, config.refresh, now
+    )
+    if not getters:
+        logger.info("Hostname %s: All getters output is fresh, skipping", info.hostname)
+        outcome.status = "skipped"
+        return False
+
+    site = config.netbox.get("site", None)
+    snapshot = options is not None and options.snapshot_dir is not None
+    if not snapshot:
+        ingest_pipeline.admit()
+    if process_pool.enabled:
+        info.driver, timings, refreshed, data = process_pool.call(
+            collect_in_process, info, getters, cached, config.refresh, site, snapshot
+        )
+        outcome.driver = info.driver
+        outcome.timings.update(timings)
+    else:
+        collected = open_session(info, getters, outcome)
+        refreshed = _refreshed_output(collected, getters, config.refresh)
+        data = {"driver": info.driver, "site": site, **cached, **collected}
+        del collected
+    del cached
+    getter_cache.update(info.hostname, refreshed, now)
+    del refreshed
+
+    started = time.perf_counter()
+    if snapshot:
+        path = write_snapshot(options.snapshot_dir, info.hostname, data)
+        logger.info("Hostname %s: Snapshot written to %s", info.hostname, path)
+        outcome.timings["snapshot"] = time.perf_counter() - started
+        return False
+    # Only the compact model is kept while entities are built and sent
+    if not isinstance(data, CollectedData):
+        data = CollectedData.from_napalm(data)
+    if ingest_pipeline.enabled:
+        ingest_pipeline.submit(info.hostname, data, outcome)
+        return True
+    outcome.entities = Client().ingest(info.hostname, data)
+    outcome.timings["ingest"] = time.perf_counter() - started
+    return False
+
+
+def run_device(
+    policy: str,
+    info: Napalm,
+    config: DiscoveryConfig,
+    options: RunOptions | None = None,
+):
+    """
+    Run the device driver code for a device and record its outcome in the run ledger.
+
+    Args:
+    ----
+        policy: Name of the policy the device belongs to.
+        info: Information data for the device.
+        config: Configuration data containing site information.
+        options: Run options.
+
+    """
+    outcome = DeviceOutcome(policy=policy, hostname=info.hostname, driver=info.driver)
+    pipelined = False
+    try:
+        with log_context(policy=policy, hostname=info.hostname), tracer.span(
+            "run_driver", policy=policy, hostname=info.hostname
+        ) as span:
+            pipelined = run_driver(info, config, options, outcome)
+            if span is not None:
+                span.set_attribute("status", outcome.status)
+    except Exception as e:
+        outcome.fail(e)
+        raise
+    finally:
+        if not pipelined:
+            run_ledger.record(outcome)
+
+
+def check_result(name: str, future: Future):
+    """
+    Log the error of a finished future, if any.
+
+    Args:
+    ----
+        name: Name of what is being processed, used in the error message.
+        future: The finished future.
+
+    """
+    try:
+        future.result()
+    except Exception as e:
+        logger.error("Error while processing %s: %s", name, e)
+
+
+def run_tasks(name: str, max_workers: int, func: Callable, items: Iterable):
+    """
+    Call func for every item in a thread pool.
+
+    Items are submitted as they are read, keeping at most a couple of items per
+    worker queued, so memory stays flat for large inventories.
+
+    Args:
+    ----
+        name: Name of what is being processed, used in error messages.
+        max_workers: Maximum number of threads in the pool.
+        func: The function called with each item.
+        items: The items to process, consumed lazily.
+
+    """
+    max_pending = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = set()
+        try:
+            for item in items:
+                if len(futures) >= max_pending:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        check_result(name, future)
+                futures.add(executor.submit(func, item))
+        except Exception as e:
+            logger.error("Error while reading items of %s: %s", name, e)
+
+        for future in as_completed(futures):
+            check_result(name, future)
+
+
+def start_policy(
+    name: str,
+    cfg: Policy,
+    max_workers: int,
+    devices: Iterable[Napalm] | None = None,
+    options: RunOptions | None = None,
+):
     """
     Start the policy for the given configuration.
 
@@ -77,19 +364,273 @@ def start_policy(name: str, cfg: Policy, max_workers: int):
         name: Policy name
         cfg: Configuration data for the policy.
         max_workers: Maximum number of threads in the pool.
+        devices: Devices to process, streamed from the policy inventory by default.
+        options: Run options, only the devices of the configured shard are processed.
 
     """
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(run_driver, info, cfg.config) for info in cfg.data]
+    if devices is None:
+        devices = policy_devices(cfg)
+    if options is not None and options.shard is not None:
+        index, count = options.shard
+        devices = (
+            info for info in devices if device_shard(info.hostname, count) == index
+        )
+    run_tasks(
+        f"policy {name}",
+        max_workers,
+        lambda info: run_device(name, info, cfg.config, options),
+        devices,
+    )
+    ingest_pipeline.join()
 
-        for future in as_completed(futures):
-            try:
-                future.result()
-            except Exception as e:
-                logger.error(f"Error while processing policy {name}: {e}")
+
+def run_cycles(
+    cfg: Diode, workers: int, options: RunOptions, stop: threading.Event | None = None
+):
+    """
+    Execute the policies every interval until stopped.
+
+    Policy inventories are reloaded before each cycle, only re-reading the files
+    and devices that changed, so inventory edits are picked up without a restart.
+
+    Args:
+    ----
+        cfg: Configuration data containing policies.
+        workers: Number of workers to be used in the thread pool.
+        options: Run options, with the seconds between the start of two cycles.
+        stop: Event that ends the loop once set.
+
+    """
+    if stop is None:
+        stop = threading.Event()
+    inventories = {
+        name: PolicyInventory(policy) for name, policy in cfg.policies.items()
+    }
+    while not stop.is_set():
+        started = time.monotonic()
+        if options.ledger is not None:
+            run_ledger.start()
+        for name, inventory in inventories.items():
+            changes = inventory.reload()
+            if changes:
+                logger.info(
+                    "Policy %s: inventory reloaded, %d added, %d changed, %d removed",
+                    name,
+                    len(changes.added),
+                    len(changes.changed),
+                    len(changes.removed),
+                )
+            start_policy(
+                name, cfg.policies[name], workers, inventory.devices(), options
+            )
+        getter_stats.log_summary()
+        session_pool.reap()
+        finish_ledger(options)
+        stop.wait(max(0.0, options.interval - (time.monotonic() - started)))
+
+
+def start_coordinator(options: RunOptions, stop: threading.Event | None = None):
+    """
+    Open a cycle of shards in the lease store every interval until stopped.
+
+    Args:
+    ----
+        options: Run options, with the lease store, shards and interval.
+        stop: Event that ends the loop once set.
+
+    """
+    store = create_lease_store(options.lease_store)
+    try:
+        run_coordinator(
+            store, options.shards, options.interval, stop or threading.Event()
+        )
+    finally:
+        store.close()
+
+
+def start_worker(
+    cfg: Diode, workers: int, options: RunOptions, stop: threading.Event | None = None
+):
+    """
+    Poll the devices of the shards leased from the lease store until stopped.
+
+    Policy inventories are reloaded at the start of each cycle. Every device is
+    claimed in the lease store right before it is polled, so a worker taking over
+    the shard of a dead worker only polls the devices that were not claimed yet.
+
+    Args:
+    ----
+        cfg: Configuration data containing policies.
+        workers: Number of workers to be used in the thread pool.
+        options: Run options, with the lease store and worker id.
+        stop: Event that ends the loop once set.
+
+    """
+    store = create_lease_store(options.lease_store)
+    worker_id = options.worker_id or default_worker_id()
+    inventories = {
+        name: PolicyInventory(policy) for name, policy in cfg.policies.items()
+    }
+    loaded_cycle = None
+
+    def poll_shard(lease: ShardLease, keeper: LeaseKeeper):
+        nonlocal loaded_cycle
+        if lease.cycle != loaded_cycle:
+            for inventory in inventories.values():
+                inventory.reload()
+            loaded_cycle = lease.cycle
+            if options.ledger is not None:
+                run_ledger.start()
+        logger.info(
+            "Worker %s: polling shard %s of cycle %s",
+            worker_id,
+            lease.shard,
+            lease.cycle,
+        )
+        polled = store.polled(lease)
+        for name, inventory in inventories.items():
+            config = cfg.policies[name].config
+
+            def run(info: Napalm, name: str = name, config: DiscoveryConfig = config):
+                if store.claim_device(lease, device_key(name, info.hostname)):
+                    run_device(name, info, config, options)
+
+            devices = (
+                info
+                for info in inventory.devices()
+                if not keeper.lost.is_set()
+                and lease.owns(key := device_key(name, info.hostname))
+                and key not in polled
+            )
+            run_tasks(f"policy {name} shard {lease.shard}", workers, run, devices)
+        # The shard is only complete once its devices are ingested
+        ingest_pipeline.join()
+
+    def finish_cycle(cycle: int):
+        logger.info("Worker %s: no shard left to poll in cycle %s", worker_id, cycle)
+        getter_stats.log_summary()
+        session_pool.reap()
+        finish_ledger(options)
+
+    try:
+        run_worker(
+            store,
+            worker_id,
+            poll_shard,
+            stop or threading.Event(),
+            on_cycle=finish_cycle,
+        )
+    finally:
+        store.close()
+
+
+def finish_ledger(options: RunOptions, previous: RunReport | None = None):
+    """
+    Write the run ledger, if enabled.
+
+    Args:
+    ----
+        options: Run options, with the ledger file.
+        previous: Ledger of a previous run whose outcomes are kept for the devices
+            that did not run again.
+
+    """
+    report = run_ledger.finish()
+    if report is None or options.ledger is None:
+        return
+    if previous is not None:
+        report.merge(previous)
+    write_ledger(options.ledger, report)
+    summary = ", ".join(f"{count} {status}" for status, count in report.summary.items())
+    logger.info("Run ledger written to %s: %s", options.ledger, summary or "no devices")
+
+
+def policy_drivers(cfg: Diode) -> list[str]:
+    """
+    List the NAPALM drivers the policies are known to use ahead of the run.
+
+    Inline devices without a driver go through driver discovery, which tries every
+    supported driver. Inventory devices are not read ahead, their drivers are
+    loaded on first use.
+
+    Args:
+    ----
+        cfg: Configuration data containing policies.
+
+    Returns:
+    -------
+        list[str]: The supported drivers used by the policies.
+
+    """
+    supported_drivers = get_supported_drivers()
+    drivers = set()
+    for policy in cfg.policies.values():
+        drivers.update(
+            profile.driver for profile in policy.profiles.values() if profile.driver
+        )
+        for info in policy.data:
+            if info.driver is None:
+                return list(supported_drivers)
+            drivers.add(info.driver)
+    return [driver for driver in supported_drivers if driver in drivers]
+
+
+def run_policies(cfg: Diode, workers: int, options: RunOptions):
+    """
+    Execute the policies once, in cycles or as a worker, depending on the options.
+
+    Args:
+    ----
+        cfg: Configuration data containing policies.
+        workers: Number of workers to be used in the thread pool.
+        options: Run options.
+
+    """
+    if options.role == "worker":
+        start_worker(cfg, workers, options)
+        return
+    if options.interval:
+        run_cycles(cfg, workers, options)
+        return
+    previous = None
+    if options.rerun_failed:
+        previous = read_ledger(options.ledger)
+        failed = previous.failed()
+        logger.info("Rerunning %d failed devices of %s", len(failed), options.ledger)
+    if options.ledger is not None:
+        run_ledger.start()
+    for policy_name in cfg.policies:
+        policy = cfg.policies.get(policy_name)
+        if previous is None:
+            start_policy(policy_name, policy, workers, options=options)
+            continue
+        devices = (
+            info
+            for info in policy_devices(policy)
+            if (policy_name, info.hostname) in failed
+        )
+        start_policy(policy_name, policy, workers, devices, options=options)
+    getter_stats.log_summary()
+    finish_ledger(options, previous)
 
 
-def start_agent(cfg: Diode, workers: int):
+def register_translators(cfg: Diode):
+    """
+    Register the field mappings of the drivers set in the configuration.
+
+    Mappings registered for a previous configuration are dropped.
+
+    Args:
+    ----
+        cfg: Configuration data containing the translators.
+
+    """
+    reset_translators()
+    for driver, translator in cfg.config.translators.items():
+        register_translator(driver, translator.device, translator.interface)
+
+
+def start_agent(cfg: Diode, workers: int, options: RunOptions | None = None):
     """
     Start the diode client and execute policies.
 
@@ -97,12 +638,215 @@ def start_agent(cfg: Diode, workers: int):
     ----
         cfg: Configuration data containing policies.
         workers: Number of workers to be used in the thread pool.
+        options: Run options.
+
+    """
+    if options is None:
+        options = RunOptions()
+    if options.role == "coordinator":
+        start_coordinator(options)
+        return
+    getter_cache.configure(options.cache_dir)
+    fingerprint_store.configure(
+        options.incremental,
+        options.cache_dir / "fingerprints" if options.cache_dir else None,
+    )
+    register_translators(cfg)
+    if options.isolate_sessions:
+        # Drivers are imported by the session processes instead
+        process_pool.configure(
+            workers, options.max_tasks_per_child, options.max_child_rss
+        )
+    else:
+        preload_drivers(policy_drivers(cfg), workers)
+    if options.session_pool is not None:
+        session_pool.configure(
+            options.session_pool,
+            options.session_idle_timeout
+            or (2 * options.interval if options.interval else DEFAULT_IDLE_TIMEOUT),
+        )
+    try:
+        if options.snapshot_dir is None:
+            client = Client()
+            client.init_client(
+                target=cfg.config.target,
+                api_key=cfg.config.api_key,
+                channel=cfg.config.channel,
+            )
+            ingest_pipeline.configure(client, options.memory_budget)
+        run_policies(cfg, workers, options)
+    finally:
+        ingest_pipeline.close()
+        process_pool.close()
+        session_pool.close()
+        fingerprint_store.close()
+
+
+def replay_snapshot(path: Path):
+    """
+    Translate and ingest a snapshot file.
+
+    Args:
+    ----
+        path: The snapshot file.
+
+    """
+    snapshot = read_snapshot(path)
+    Client().ingest(snapshot.hostname, snapshot.data)
+
+
+def replay_snapshots(cfg: Diode, path: Path, workers: int):
+    """
+    Translate and ingest previously collected snapshots, without device access.
+
+    Args:
+    ----
+        cfg: Configuration data containing the Diode target.
+        path: A snapshot file or a directory of snapshots.
+        workers: Number of workers to be used in the thread pool.
 
     """
+    register_translators(cfg)
     client = Client()
-    client.init_client(target=cfg.config.target, api_key=cfg.config.api_key)
-    for policy_name in cfg.policies:
-        start_policy(policy_name, cfg.policies.get(policy_name), workers)
+    client.init_client(
+        target=cfg.config.target,
+        api_key=cfg.config.api_key,
+        channel=cfg.config.channel,
+    )
+    run_tasks(f"snapshots {path}", workers, replay_snapshot, snapshot_files(path))
+
+
+def benchmark_captures(
+    cfg: Diode,
+    path: Path,
+    repeat: int,
+    output: Path | None = None,
+    baseline: Path | None = None,
+):
+    """
+    Benchmark the translation and serialization of captured device data and print the results.
+
+    Args:
+    ----
+        cfg: Configuration data containing the translators.
+        path: A snapshot file, or a directory of capture directories and snapshots.
+        repeat: Number of timed passes per device.
+        output: JSON file the results are written to, if set.
+        baseline: JSON results of a previous run to compare with, if set.
+
+    """
+    register_translators(cfg)
+    report = run_benchmark(path, repeat)
+    print(format_report(report))
+    if output is not None:
+        write_benchmark(output, report)
+    if baseline is not None:
+        print(format_comparison(read_benchmark(baseline), report))
+
+
+def shard_arg(value: str) -> tuple[int, int]:
+    """
+    Parse a shard argument.
+
+    Args:
+    ----
+        value: The shard, as ``N/M`` with N from 0 to M - 1.
+
+    Returns:
+    -------
+        tuple[int, int]: The shard index and the number of shards.
+
+    """
+    index, separator, count = value.partition("/")
+    try:
+        shard = (int(index), int(count))
+    except ValueError:
+        shard = None
+    if not separator or shard is None or not 0 <= shard[0] < shard[1]:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{value}', expected N/M with N from 0 to M-1"
+        )
+    return shard
+
+
+def check_state_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    Exit with a usage error if the arguments keeping state across polls can't be used.
+
+    Args:
+    ----
+        parser: The command-line parser.
+        args: The parsed arguments.
+
+    """
+    if args.session_pool is not None and (
+        args.isolate_sessions or not (args.interval or args.role == "worker")
+    ):
+        parser.error(
+            "--session-pool requires --interval or --role worker "
+            "and can't be used with --isolate-sessions"
+        )
+    if args.session_idle_timeout is not None and args.session_pool is None:
+        parser.error("--session-idle-timeout requires --session-pool")
+    if args.incremental and not (
+        args.interval or args.role == "worker" or args.cache_dir
+    ):
+        parser.error("--incremental requires --interval, --role worker or --cache-dir")
+    if args.incremental and (args.collect_only or args.replay):
+        parser.error("--incremental can't be used with --collect-only or --replay")
+
+
+def check_benchmark_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    Exit with a usage error if the benchmark arguments can't be used.
+
+    Args:
+    ----
+        parser: The command-line parser.
+        args: The parsed arguments.
+
+    """
+    if (
+        args.benchmark_output is not None or args.benchmark_compare is not None
+    ) and args.benchmark is None:
+        parser.error("--benchmark-output and --benchmark-compare require --benchmark")
+    if args.benchmark_repeat < 1:
+        parser.error("--benchmark-repeat must be at least 1")
+
+
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    Exit with a usage error if command-line arguments can't be used together.
+
+    Args:
+    ----
+        parser: The command-line parser.
+        args: The parsed arguments.
+
+    """
+    if args.rerun_failed and (args.ledger is None or args.interval):
+        parser.error(
+            "--rerun-failed requires --ledger and can't be used with --interval"
+        )
+    if args.role is not None and args.lease_store is None:
+        parser.error("--role requires --lease-store")
+    if args.role == "coordinator" and not args.interval:
+        parser.error("--role coordinator requires --interval")
+    if (
+        args.max_tasks_per_child is not None or args.max_child_rss is not None
+    ) and not args.isolate_sessions:
+        parser.error(
+            "--max-tasks-per-child and --max-child-rss require --isolate-sessions"
+        )
+    check_state_args(parser, args)
+    check_benchmark_args(parser, args)
+    if args.shard is not None and args.role is not None:
+        parser.error("--shard can't be used with --role, workers lease their shards")
+    if args.role == "worker" and (args.interval or args.rerun_failed):
+        parser.error(
+            "--role worker can't be used with --interval or --rerun-failed, "
+            "cycles are opened by the coordinator"
+        )
 
 
 def main():
@@ -143,7 +887,166 @@ def main():
         type=int,
         default=2,
     )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        metavar="SECONDS",
+        help="Keep running and execute the policies every SECONDS seconds, reloading changed inventories",
+        type=int,
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Keep the output of getters with a refresh interval in DIR across runs",
+        type=Path,
+    )
+    parser.add_argument(
+        "--ledger",
+        metavar="FILE",
+        help="Write the outcome of every device to the JSON run ledger FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--rerun-failed",
+        action="store_true",
+        help="Only poll the devices that failed in the run ledger, updating it",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Sample the agent stacks and write them to FILE in collapsed stack format",
+        type=Path,
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Append timing spans of the device, discovery and ingestion steps to the JSON lines FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=LOG_FORMATS,
+        default="text",
+        help="Write logs as text, or as JSON lines with the policy and hostname of the device from a background thread",
+    )
+    parser.add_argument(
+        "--lease-store",
+        metavar="URL",
+        help="Lease store shared by a coordinator and its workers, such as sqlite:///path/leases.db",
+        type=str,
+    )
+    parser.add_argument(
+        "--role",
+        choices=["coordinator", "worker"],
+        help="Open a cycle of device shards every --interval seconds, or poll the shards leased from the lease store",
+    )
+    parser.add_argument(
+        "--worker-id",
+        metavar="ID",
+        help="Worker id in the lease store, defaults to the host name and process id",
+        type=str,
+    )
+    parser.add_argument(
+        "--shards",
+        metavar="N",
+        help="Number of shards the coordinator splits the devices of a cycle into",
+        type=int,
+        default=64,
+    )
+    parser.add_argument(
+        "--shard",
+        metavar="N/M",
+        help="Only poll the devices whose hostname hashes to shard N of M, N counting from 0",
+        type=shard_arg,
+    )
+    parser.add_argument(
+        "--isolate-sessions",
+        action="store_true",
+        help="Run device sessions in worker processes, recycled to release the memory leaked by drivers",
+    )
+    parser.add_argument(
+        "--max-tasks-per-child",
+        metavar="N",
+        help="Replace a session worker process after N devices",
+        type=int,
+    )
+    parser.add_argument(
+        "--max-child-rss",
+        metavar="MB",
+        help="Replace a session worker process once its resident memory exceeds MB megabytes",
+        type=int,
+    )
+    parser.add_argument(
+        "--session-pool",
+        metavar="N",
+        help="Keep up to N device sessions open across cycles, reconnecting the ones that dropped",
+        type=int,
+    )
+    parser.add_argument(
+        "--session-idle-timeout",
+        metavar="SECONDS",
+        help="Close the pooled sessions idle for SECONDS seconds, twice the interval by default",
+        type=int,
+    )
+    parser.add_argument(
+        "--memory-budget",
+        metavar="MB",
+        help="Ingest through a staged pipeline holding at most about MB megabytes of device data, pausing collection when reached",
+        type=int,
+    )
+    parser.add_argument(
+        "--benchmark-repeat",
+        metavar="N",
+        help="Time the stages of every device N times in benchmark mode, keeping the median",
+        type=int,
+        default=5,
+    )
+    parser.add_argument(
+        "--benchmark-output",
+        metavar="FILE",
+        help="Write the benchmark results to the JSON FILE",
+        type=Path,
+    )
+    parser.add_argument(
+        "--benchmark-compare",
+        metavar="FILE",
+        help="Compare the benchmark results with the JSON results FILE of a previous run",
+        type=Path,
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only ingest the objects of a device that changed since its previous poll, "
+        "disabling removed interfaces and deprecating removed IP addresses",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Validate the configuration and print the execution plan without connecting to devices",
+    )
+    mode.add_argument(
+        "--collect-only",
+        metavar="DIR",
+        help="Write the collected device data to snapshot files in DIR instead of ingesting it",
+        type=Path,
+    )
+    mode.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="Translate and ingest the snapshot files in PATH without connecting to devices",
+        type=Path,
+    )
+    mode.add_argument(
+        "--benchmark",
+        metavar="PATH",
+        help="Benchmark the translation and serialization of the captured getters output "
+        "and snapshot files in PATH, without connecting to devices or Diode",
+        type=Path,
+    )
     args = parser.parse_args()
+    check_args(parser, args)
+    configure_logging(args.log_format)
 
     if hasattr(args, "env") and args.env is not None:
         if not load_dotenv(args.env, override=True):
@@ -151,13 +1054,60 @@ def main():
                 f"ERROR: Unable to load environment variables from file {args.env}"
             )
 
+    tracer.configure(args.trace)
     try:
-        config = parse_config_file(args.config)
-        start_agent(config, args.workers)
+        with profile_run(args.profile):
+            config = parse_config_file(args.config)
+            if args.dry_run:
+                plan = build_plan(config, args.workers, get_supported_drivers())
+                print(format_plan(plan))
+                sys.exit(1 if plan.errors else 0)
+            if args.replay:
+                replay_snapshots(config, args.replay, args.workers)
+                return
+            if args.benchmark:
+                benchmark_captures(
+                    config,
+                    args.benchmark,
+                    args.benchmark_repeat,
+                    args.benchmark_output,
+                    args.benchmark_compare,
+                )
+                return
+            options = RunOptions(
+                interval=args.interval,
+                snapshot_dir=args.collect_only,
+                cache_dir=args.cache_dir,
+                ledger=args.ledger,
+                rerun_failed=args.rerun_failed,
+                lease_store=args.lease_store,
+                role=args.role,
+                worker_id=args.worker_id,
+                shards=args.shards,
+                shard=args.shard,
+                isolate_sessions=args.isolate_sessions,
+                max_tasks_per_child=args.max_tasks_per_child,
+                max_child_rss=(
+                    args.max_child_rss * 1024 * 1024
+                    if args.max_child_rss is not None
+                    else None
+                ),
+                session_pool=args.session_pool,
+                session_idle_timeout=args.session_idle_timeout,
+                memory_budget=(
+                    args.memory_budget * 1024 * 1024
+                    if args.memory_budget is not None
+                    else None
+                ),
+                incremental=args.incremental,
+            )
+            start_agent(config, args.workers, options)
     except (KeyboardInterrupt, RuntimeError):
         pass
     except Exception as e:
         sys.exit(f"ERROR: Unable to start agent: {e}")
+    finally:
+        tracer.close()
 
 
 if __name__ == "__main__":
@@ -2,11 +2,25 @@
 # Copyright 2024 NetBox Labs Inc
 """Diode SDK Client for NAPALM."""
 
+import functools
+import itertools
 import logging
+import os
+import platform
 import threading
+import uuid
 
+import certifi
+import grpc
 from netboxlabs.diode.sdk import DiodeClient
+from netboxlabs.diode.sdk.client import DiodeMethodClientInterceptor
+from netboxlabs.diode.sdk.diode.v1 import ingester_pb2, ingester_pb2_grpc
+from netboxlabs.diode.sdk.exceptions import DiodeClientError
 
+from diode_napalm.changes import fingerprint_store
+from diode_napalm.collected import CollectedData
+from diode_napalm.parser import ChannelConfig
+from diode_napalm.profiling import tracer
 from diode_napalm.translate import translate_data
 from diode_napalm.version import version_semver
 
@@ -14,9 +28,147 @@ APP_NAME = "diode-napalm-agent"
 APP_VERSION = version_semver()
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Method path of the ingest RPC, for requests sent already serialized
+INGEST_METHOD = "/diode.v1.IngesterService/Ingest"
+
+COMPRESSION = {
+    "none": grpc.Compression.NoCompression,
+    "gzip": grpc.Compression.Gzip,
+    "deflate": grpc.Compression.Deflate,
+}
+
+
+class IngestionError(Exception):
+    """Diode rejected the entities of an ingest request."""
+
+    def __init__(self, hostname: str, errors):
+        """Initialize the error with the errors returned by Diode."""
+        super().__init__(f"ingestion failed for {hostname}: {list(errors)}")
+        self.errors = list(errors)
+
+
+@functools.cache
+def root_certificates() -> bytes:
+    """Return the certifi CA bundle, the trust store of the Diode SDK channels."""
+    with open(certifi.where(), "rb") as f:
+        return f.read()
+
+
+def ingest_method(grpc_channel: grpc.Channel) -> grpc.UnaryUnaryMultiCallable:
+    """Return the ingest RPC of a channel, taking serialized ingest requests."""
+    return grpc_channel.unary_unary(
+        INGEST_METHOD,
+        request_serializer=None,
+        response_deserializer=ingester_pb2.IngestResponse.FromString,
+    )
+
+
+def ingest_request(
+    entities, sdk_name: str, sdk_version: str
+) -> ingester_pb2.IngestRequest:
+    """
+    Build the ingest request of entities produced by the agent.
+
+    Args:
+    ----
+        entities: The entities to ingest.
+        sdk_name (str): The name of the Diode SDK sending the request.
+        sdk_version (str): The version of the Diode SDK sending the request.
+
+    Returns:
+    -------
+        IngestRequest: The ingest request.
+
+    """
+    return ingester_pb2.IngestRequest(
+        stream="latest",
+        id=str(uuid.uuid4()),
+        entities=entities,
+        sdk_name=sdk_name,
+        sdk_version=sdk_version,
+        producer_app_name=APP_NAME,
+        producer_app_version=APP_VERSION,
+    )
+
+
+def channel_options(diode_client: DiodeClient, channel: ChannelConfig) -> list[tuple]:
+    """
+    Build the gRPC channel arguments for the channel settings.
+
+    Args:
+    ----
+        diode_client (DiodeClient): The Diode client, used for the user agent.
+        channel (ChannelConfig): The channel settings.
+
+    Returns:
+    -------
+        list[tuple]: The gRPC channel arguments.
+
+    """
+    options = [
+        (
+            "grpc.primary_user_agent",
+            f"{diode_client.name}/{diode_client.version} "
+            f"{diode_client.app_name}/{diode_client.app_version}",
+        ),
+        # Pooled channels must not share their connection through the global
+        # subchannel pool, or they would all end up on the same socket
+        ("grpc.use_local_subchannel_pool", 1),
+    ]
+    if channel.keepalive is not None:
+        options.extend(
+            [
+                ("grpc.keepalive_time_ms", channel.keepalive * 1000),
+                ("grpc.keepalive_timeout_ms", channel.keepalive_timeout * 1000),
+                ("grpc.keepalive_permit_without_calls", 1),
+                ("grpc.http2.max_pings_without_data", 0),
+            ]
+        )
+    if channel.max_message_size is not None:
+        options.extend(
+            [
+                ("grpc.max_send_message_length", channel.max_message_size),
+                ("grpc.max_receive_message_length", channel.max_message_size),
+            ]
+        )
+    return options
+
+
+def create_channel(diode_client: DiodeClient, channel: ChannelConfig) -> grpc.Channel:
+    """
+    Create a gRPC channel to the Diode target of a client with the channel settings.
+
+    Args:
+    ----
+        diode_client (DiodeClient): The Diode client, used for the target and TLS settings.
+        channel (ChannelConfig): The channel settings.
+
+    Returns:
+    -------
+        grpc.Channel: The channel, intercepted to prefix the target path if any.
+
+    """
+    options = channel_options(diode_client, channel)
+    compression = COMPRESSION[channel.compression]
+    if diode_client.tls_verify:
+        grpc_channel = grpc.secure_channel(
+            diode_client.target,
+            grpc.ssl_channel_credentials(root_certificates=root_certificates()),
+            options=options,
+            compression=compression,
+        )
+    else:
+        grpc_channel = grpc.insecure_channel(
+            diode_client.target, options=options, compression=compression
+        )
+    if diode_client.path:
+        grpc_channel = grpc.intercept_channel(
+            grpc_channel, DiodeMethodClientInterceptor(subpath=diode_client.path)
+        )
+    return grpc_channel
+
 
 class Client:
     """
@@ -53,8 +205,16 @@ class Client:
         """Initialize the Client instance with no Diode client."""
         if not hasattr(self, "diode_client"):  # Prevent reinitialization
             self.diode_client = None
+            self._stubs = None
+            self._senders = None
+            self._channels = []
 
-    def init_client(self, target: str, api_key: str | None = None):
+    def init_client(
+        self,
+        target: str,
+        api_key: str | None = None,
+        channel: ChannelConfig | None = None,
+    ):
         """
         Initialize the Diode client with the specified target, API key, and TLS verification.
 
@@ -62,37 +222,198 @@ class Client:
         ----
             target (str): The target endpoint for the Diode client.
             api_key (Optional[str]): The API key for authentication (default is None).
+            channel (Optional[ChannelConfig]): The gRPC channel settings, the SDK
+                defaults are used when unset.
 
         """
         with self._lock:
+            self._close_pool()
             self.diode_client = DiodeClient(
                 target=target,
                 app_name=APP_NAME,
                 app_version=APP_VERSION,
                 api_key=api_key,
             )
+            self._metadata = (
+                ("diode-api-key", api_key or os.getenv("DIODE_API_KEY", "")),
+                ("platform", platform.platform()),
+                ("python-version", platform.python_version()),
+            )
+            if channel is not None and channel != ChannelConfig():
+                self._init_pool(channel)
+
+    def _close_pool(self):
+        """Close the pooled channels, if any."""
+        for grpc_channel in self._channels:
+            grpc_channel.close()
+        self._channels = []
+        self._stubs = None
+        self._senders = None
+
+    def _init_pool(self, channel: ChannelConfig):
+        """Create the tuned channels ingest requests are sent over."""
+        self._channels = [
+            create_channel(self.diode_client, channel) for _ in range(channel.pool_size)
+        ]
+        self._stubs = itertools.cycle(
+            [
+                ingester_pb2_grpc.IngesterServiceStub(grpc_channel)
+                for grpc_channel in self._channels
+            ]
+        )
+        self._senders = itertools.cycle(
+            [ingest_method(grpc_channel) for grpc_channel in self._channels]
+        )
+        logger.info(
+            "Diode channel pool: %d channels, compression %s",
+            channel.pool_size,
+            channel.compression,
+        )
+
+    def _request(self, entities) -> ingester_pb2.IngestRequest:
+        """Build the ingest request of entities."""
+        return ingest_request(
+            entities, self.diode_client.name, self.diode_client.version
+        )
 
-    def ingest(self, hostname: str, data: dict):
+    def _send(self, entities) -> ingester_pb2.IngestResponse:
+        """Send entities over the next pooled channel."""
+        try:
+            return next(self._stubs).Ingest(
+                self._request(entities), metadata=self._metadata
+            )
+        except grpc.RpcError as err:
+            raise DiodeClientError(err) from err
+
+    def ingest(self, hostname: str, data: dict | CollectedData):
         """
         Ingest data using the Diode client after translating it.
 
         Args:
         ----
             hostname (str): The device hostname.
-            data (dict): The data to be ingested.
+            data (dict | CollectedData): The data to be ingested, or its compact form.
+
+        Returns:
+        -------
+            int: The number of entities sent.
 
         Raises:
         ------
             ValueError: If the Diode client is not initialized.
+            IngestionError: If Diode rejected the entities.
 
         """
         if self.diode_client is None:
             raise ValueError("Diode client not initialized")
 
+        entities = self._translate(hostname, data)
+        if not entities:
+            self._unchanged(hostname)
+            return 0
+        with tracer.span("ingest", hostname=hostname):
+            if self._stubs is not None:
+                # Pooled channels are safe to use concurrently
+                response = self._send(entities)
+            else:
+                with self._lock:
+                    response = self.diode_client.ingest(entities)
+
+        self._handle_response(hostname, response)
+        return len(entities)
+
+    @staticmethod
+    def _translate(hostname: str, data: dict | CollectedData) -> list:
+        """Translate data, keeping the changed entities if polls are diffed."""
+        with tracer.span("translate", hostname=hostname) as span:
+            entities = translate_data(data)
+            if fingerprint_store.enabled:
+                entities = fingerprint_store.diff(hostname, entities)
+            if span is not None:
+                span.set_attribute("entities", len(entities))
+        return entities
+
+    @staticmethod
+    def _unchanged(hostname: str):
+        fingerprint_store.commit(hostname)
+        logger.info("Hostname %s: no changes to ingest", hostname)
+
+    def serialize(self, hostname: str, data: dict | CollectedData) -> tuple[bytes, int]:
+        """
+        Translate data and serialize it into an ingest request.
+
+        The request is empty when polls are diffed and nothing changed.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            data (dict | CollectedData): The data to be ingested, or its compact form.
+
+        Returns:
+        -------
+            tuple[bytes, int]: The serialized request and the number of entities in it.
+
+        Raises:
+        ------
+            ValueError: If the Diode client is not initialized.
+
+        """
+        if self.diode_client is None:
+            raise ValueError("Diode client not initialized")
+
+        entities = self._translate(hostname, data)
+        if not entities:
+            return b"", 0
+        with tracer.span("serialize", hostname=hostname):
+            return self._request(entities).SerializeToString(), len(entities)
+
+    def send(self, hostname: str, request: bytes):
+        """
+        Send a serialized ingest request.
+
+        Requests are sent over the pooled channels if any, over the channel of the
+        Diode client otherwise. Both are safe to use concurrently.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            request (bytes): The request, as returned by ``serialize``. Empty
+                requests are not sent.
+
+        Raises:
+        ------
+            ValueError: If the Diode client is not initialized.
+            DiodeClientError: If the request failed.
+            IngestionError: If Diode rejected the entities.
+
+        """
+        if self.diode_client is None:
+            raise ValueError("Diode client not initialized")
+        if not request:
+            self._unchanged(hostname)
+            return
         with self._lock:
-            response = self.diode_client.ingest(translate_data(data))
+            if self._senders is None:
+                grpc_channel = self.diode_client.channel
+                if self.diode_client.path:
+                    grpc_channel = grpc.intercept_channel(
+                        grpc_channel,
+                        DiodeMethodClientInterceptor(subpath=self.diode_client.path),
+                    )
+                self._senders = itertools.repeat(ingest_method(grpc_channel))
+            sender = next(self._senders)
+
+        with tracer.span("ingest", hostname=hostname):
+            try:
+                response = sender(request, metadata=self._metadata)
+            except grpc.RpcError as err:
+                raise DiodeClientError(err) from err
+        self._handle_response(hostname, response)
 
+    @staticmethod
+    def _handle_response(hostname: str, response: ingester_pb2.IngestResponse):
+        """Record the fingerprints of the poll, or raise if Diode rejected it."""
         if response.errors:
-            logger.error(f"ERROR ingestion failed for {hostname} : {response.errors}")
-        else:
-            logger.info(f"Hostname {hostname}: Successful ingestion")
+            raise IngestionError(hostname, response.errors)
+        fingerprint_store.commit(hostname)
+        logger.info("Hostname %s: Successful ingestion", hostname)
@@ -0,0 +1,370 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Compact representation of the data collected from a device."""
+
+import sys
+
+# Values that repeat across devices (vendors, models, sites, interface names,
+# speeds...) are shared through these tables instead of being held once per device
+_INTEGERS: dict[int, int] = {}
+
+
+def intern_str(value) -> str | None:
+    """
+    Return the canonical instance of a string, so equal values share memory.
+
+    Args:
+    ----
+        value: The value, converted to a string unless it is None.
+
+    Returns:
+    -------
+        str | None: The interned string, or None.
+
+    """
+    if value is None:
+        return None
+    return sys.intern(value if type(value) is str else str(value))
+
+
+def intern_int(value) -> int | None:
+    """
+    Return the canonical instance of an integer, so equal values share memory.
+
+    Args:
+    ----
+        value: The value, converted to an integer unless it is None.
+
+    Returns:
+    -------
+        int | None: The shared integer, or None.
+
+    """
+    if value is None:
+        return None
+    value = int(value)
+    return _INTEGERS.setdefault(value, value)
+
+
+class DeviceRecord:
+    """Device facts, as returned by ``get_facts`` plus the policy driver and site."""
+
+    __slots__ = (
+        "hostname",
+        "vendor",
+        "model",
+        "serial_number",
+        "driver",
+        "site",
+        "interface_list",
+    )
+
+    def __init__(
+        self,
+        hostname: str | None,
+        vendor: str | None = None,
+        model: str | None = None,
+        serial_number: str | None = None,
+        driver: str | None = None,
+        site: str | None = None,
+        interface_list: frozenset[str] = frozenset(),
+    ):
+        """Initialize the record, interning the values shared between devices."""
+        self.hostname = hostname
+        self.vendor = intern_str(vendor)
+        self.model = intern_str(model)
+        self.serial_number = serial_number
+        self.driver = intern_str(driver)
+        self.site = intern_str(site)
+        self.interface_list = interface_list
+
+    @classmethod
+    def from_napalm(
+        cls, facts: dict, driver: str | None = None, site: str | None = None
+    ) -> "DeviceRecord":
+        """
+        Build the record from the output of ``get_facts``.
+
+        Args:
+        ----
+            facts (dict): The device facts.
+            driver (str | None): The NAPALM driver, taken from the facts if unset.
+            site (str | None): The NetBox site, taken from the facts if unset.
+
+        Returns:
+        -------
+            DeviceRecord: The device record.
+
+        """
+        return cls(
+            hostname=facts.get("hostname"),
+            vendor=facts.get("vendor"),
+            model=facts.get("model"),
+            serial_number=facts.get("serial_number"),
+            driver=driver if driver is not None else facts.get("driver"),
+            site=site if site is not None else facts.get("site"),
+            interface_list=frozenset(
+                intern_str(name) for name in facts.get("interface_list") or ()
+            ),
+        )
+
+
+class InterfaceRecord:
+    """Interface details, as returned by ``get_interfaces``, with its 802.1Q mode."""
+
+    __slots__ = (
+        "name",
+        "enabled",
+        "mac_address",
+        "description",
+        "speed",
+        "mtu",
+        "mode",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool | None = None,
+        mac_address: str | None = None,
+        description: str | None = None,
+        speed: int | None = None,
+        mtu: int | None = None,
+        mode: str | None = None,
+    ):
+        """Initialize the record, interning the values shared between devices."""
+        self.name = intern_str(name)
+        self.enabled = enabled
+        self.mac_address = mac_address
+        self.description = description
+        self.speed = intern_int(speed)
+        self.mtu = intern_int(mtu)
+        self.mode = intern_str(mode)
+
+    @classmethod
+    def from_napalm(
+        cls, name: str, interface_info: dict, mode: str | None = None
+    ) -> "InterfaceRecord":
+        """
+        Build the record from the output of ``get_interfaces`` for one interface.
+
+        Args:
+        ----
+            name (str): The interface name.
+            interface_info (dict): The interface details.
+            mode (str | None): The 802.1Q mode of the interface, if known.
+
+        Returns:
+        -------
+            InterfaceRecord: The interface record.
+
+        """
+        return cls(
+            name=name,
+            enabled=interface_info.get("is_enabled"),
+            mac_address=interface_info.get("mac_address"),
+            description=interface_info.get("description"),
+            speed=interface_info.get("speed"),
+            mtu=interface_info.get("mtu"),
+            mode=mode,
+        )
+
+
+class NeighborRecord:
+    """LLDP neighbor seen from a device, as returned by ``get_lldp_neighbors_detail``."""
+
+    __slots__ = ("system_name", "port", "port_description")
+
+    def __init__(
+        self,
+        system_name: str | None,
+        port: str | None = None,
+        port_description: str | None = None,
+    ):
+        """Initialize the record, interning the port names shared between devices."""
+        # Neighbor names are mostly distinct hostnames, interning them would
+        # only grow the interned table of a long-running agent
+        self.system_name = system_name
+        self.port = intern_str(port)
+        self.port_description = port_description or None
+
+
+class ArpRecord:
+    """ARP entry of a device, as returned by ``get_arp_table``."""
+
+    __slots__ = ("ip", "interface")
+
+    def __init__(self, ip: str | None, interface: str | None = None):
+        """Initialize the record, interning the interface name."""
+        self.ip = ip
+        self.interface = intern_str(interface)
+
+
+def compact_addresses(ip_info: dict) -> tuple[tuple[str, int], ...]:
+    """
+    Compact the addresses of one ``get_interfaces_ip`` entry.
+
+    Args:
+    ----
+        ip_info (dict): The IPv4 and IPv6 addresses of an interface.
+
+    Returns:
+    -------
+        tuple[tuple[str, int], ...]: The addresses and prefix lengths, IPv4 first.
+
+    """
+    return tuple(
+        (ip, intern_int(details.get("prefix_length", default_prefix)))
+        for ip_version, default_prefix in (("ipv4", 32), ("ipv6", 128))
+        for ip, details in (ip_info.get(ip_version) or {}).items()
+    )
+
+
+def compact_interfaces_ip(
+    interfaces_ip: dict,
+) -> dict[str, tuple[tuple[str, int], ...]]:
+    """
+    Compact the output of ``get_interfaces_ip``.
+
+    Args:
+    ----
+        interfaces_ip (dict): Interface names to their IPv4 and IPv6 addresses.
+
+    Returns:
+    -------
+        dict[str, tuple[tuple[str, int], ...]]: Interface names to their addresses
+        and prefix lengths. Interfaces without addresses are left out.
+
+    """
+    compacted = {}
+    for name, ip_info in interfaces_ip.items():
+        addresses = compact_addresses(ip_info)
+        if addresses:
+            compacted[intern_str(name)] = addresses
+    return compacted
+
+
+def interface_vlan_modes(vlans: dict) -> dict[str, str]:
+    """
+    Compute the 802.1Q mode of interfaces from NAPALM VLANs information.
+
+    Args:
+    ----
+        vlans (dict): Dictionary of VLAN ids to VLAN information, as returned by ``get_vlans``.
+
+    Returns:
+    -------
+        dict[str, str]: Interface name to mode, "access" for interfaces in a single
+        VLAN and "tagged" for interfaces in several VLANs.
+
+    """
+    memberships = {}
+    for vlan_info in vlans.values():
+        for if_name in vlan_info.get("interfaces", []):
+            memberships[if_name] = memberships.get(if_name, 0) + 1
+    return {
+        if_name: "access" if count == 1 else "tagged"
+        for if_name, count in memberships.items()
+    }
+
+
+class CollectedData:
+    """
+    Data collected from a device, reduced to what translation reads.
+
+    Getter output that is not translated (such as ``get_environment``) and
+    interfaces missing from the device ``interface_list`` are dropped.
+    """
+
+    __slots__ = ("device", "interfaces", "interfaces_ip", "neighbors", "arp_table")
+
+    def __init__(
+        self,
+        device: DeviceRecord | None,
+        interfaces: tuple[InterfaceRecord, ...] = (),
+        interfaces_ip: dict[str, tuple[tuple[str, int], ...]] | None = None,
+        neighbors: tuple[NeighborRecord, ...] = (),
+        arp_table: tuple[ArpRecord, ...] = (),
+    ):
+        """Initialize the collected data of a device."""
+        self.device = device
+        self.interfaces = interfaces
+        self.interfaces_ip = interfaces_ip or {}
+        self.neighbors = neighbors
+        self.arp_table = arp_table
+
+    @classmethod
+    def from_napalm(cls, data: dict) -> "CollectedData":
+        """
+        Compact the collected data of a device.
+
+        Args:
+        ----
+            data (dict): The getters output keyed as in ``GETTERS``, plus the
+                ``driver`` and ``site`` of the device.
+
+        Returns:
+        -------
+            CollectedData: The compact data. Its device is None when no facts were collected.
+
+        """
+        facts = data.get("device")
+        if not facts:
+            return cls(None)
+        device = DeviceRecord.from_napalm(facts, data.get("driver"), data.get("site"))
+        vlan_modes = interface_vlan_modes(data.get("vlan") or {})
+        interfaces = tuple(
+            InterfaceRecord.from_napalm(name, info, vlan_modes.get(name))
+            for name, info in (data.get("interface") or {}).items()
+            if name in device.interface_list
+        )
+        neighbors = tuple(
+            NeighborRecord(
+                neighbor.get("remote_system_name"),
+                neighbor.get("remote_port"),
+                neighbor.get("remote_port_description"),
+            )
+            for port_neighbors in (data.get("lldp_neighbors") or {}).values()
+            for neighbor in port_neighbors
+        )
+        arp_table = tuple(
+            ArpRecord(entry.get("ip"), entry.get("interface"))
+            for entry in data.get("arp_table") or ()
+        )
+        return cls(
+            device,
+            interfaces,
+            compact_interfaces_ip(data.get("interface_ip") or {}),
+            neighbors,
+            arp_table,
+        )
+
+    def approximate_size(self) -> int:
+        """
+        Approximate the memory held by the data, in bytes.
+
+        Values interned in the shared tables are counted as if the device held
+        them alone, so the result errs on the high side.
+
+        Returns
+        -------
+            int: The approximate size in bytes.
+
+        """
+        size = sys.getsizeof(self.interfaces_ip)
+        for addresses in self.interfaces_ip.values():
+            size += sys.getsizeof(addresses)
+            for address in addresses:
+                size += sys.getsizeof(address) + sys.getsizeof(address[0])
+        records = (self.device, *self.interfaces, *self.neighbors, *self.arp_table)
+        for group in (self.interfaces, self.neighbors, self.arp_table):
+            size += sys.getsizeof(group)
+        for record in records:
+            if record is None:
+                continue
+            size += sys.getsizeof(record)
+            for slot in record.__slots__:
+                size += sys.getsizeof(getattr(record, slot))
+        if self.device is not None:
+            size += sum(sys.getsizeof(name) for name in self.device.interface_list)
+        return size
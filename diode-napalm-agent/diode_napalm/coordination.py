@@ -0,0 +1,471 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Distribute the devices of a cycle across agent nodes through a lease store."""
+
+import hashlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from pydantic import BaseModel
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARDS = 64
+DEFAULT_LEASE_TTL = 60
+
+
+def device_key(policy: str, hostname: str) -> str:
+    """Return the key identifying a device across agent nodes."""
+    return f"{policy}/{hostname}"
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """
+    Map a 64-bit key to a bucket with the jump consistent hash.
+
+    When the number of buckets grows from n to n + 1, only 1/(n + 1) of the keys
+    move, all of them to the new bucket.
+
+    Args:
+    ----
+        key (int): The 64-bit key.
+        buckets (int): The number of buckets.
+
+    Returns:
+    -------
+        int: The bucket, between 0 and buckets - 1.
+
+    """
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        jump = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def device_shard(key: str, shards: int) -> int:
+    """
+    Return the shard of a device, identical on every node and Python process.
+
+    Shards are assigned by consistent hashing, so changing the number of shards
+    moves as few devices as possible.
+
+    Args:
+    ----
+        key (str): The device key.
+        shards (int): The number of shards.
+
+    Returns:
+    -------
+        int: The shard, between 0 and shards - 1.
+
+    """
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return jump_hash(int.from_bytes(digest, "big"), shards)
+
+
+def default_worker_id() -> str:
+    """Return a worker id unique to this process."""
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class ShardLease(BaseModel):
+    """Model for a shard of a cycle leased by a worker."""
+
+    cycle: int
+    shards: int
+    shard: int
+    worker: str
+
+    def owns(self, key: str) -> bool:
+        """Whether the device belongs to the leased shard."""
+        return device_shard(key, self.shards) == self.shard
+
+
+class CycleProgress(BaseModel):
+    """Model for the state of the shards of a cycle."""
+
+    cycle: int
+    completed: int = 0
+    leased: int = 0
+    pending: int = 0
+
+
+class LeaseStore(ABC):
+    """
+    Shared state through which workers split the devices of each cycle.
+
+    The coordinator opens a cycle of numbered shards, and workers lease pending
+    shards one at a time. A lease that is not renewed in time expires and the
+    shard goes back to the pending ones, so the shards of a dead worker are
+    taken over by the others. Devices are claimed before being polled, while
+    the lease is held, so a worker taking a shard over never polls a device
+    again in the cycle.
+    """
+
+    @abstractmethod
+    def open_cycle(self, shards: int) -> int:
+        """Open a new cycle of pending shards and return its number."""
+
+    @abstractmethod
+    def progress(self, cycle: int) -> CycleProgress:
+        """Return the state of the shards of a cycle."""
+
+    @abstractmethod
+    def claim(self, worker: str, ttl: float) -> ShardLease | None:
+        """Lease a pending shard of the latest cycle, None if there is none left."""
+
+    @abstractmethod
+    def renew(self, lease: ShardLease, ttl: float) -> bool:
+        """Extend a lease, False if it expired and was taken over or completed."""
+
+    @abstractmethod
+    def complete(self, lease: ShardLease):
+        """Mark a leased shard as completed."""
+
+    @abstractmethod
+    def claim_device(self, lease: ShardLease, key: str) -> bool:
+        """Claim a device of a leased shard, False if it was polled or the lease is lost."""
+
+    @abstractmethod
+    def polled(self, lease: ShardLease) -> set[str]:
+        """Return the devices of a leased shard already polled in the cycle."""
+
+    def close(self):
+        """Release the resources held by the store."""
+
+
+class SQLiteLeaseStore(LeaseStore):
+    """
+    Lease store kept in a SQLite database.
+
+    Claims run in immediate transactions, so concurrent workers never lease the
+    same shard. The database must be on a file system every node can lock, such
+    as a local disk shared by the agent processes of a host.
+    """
+
+    # Cycles kept in the database, older ones are deleted when a cycle opens
+    KEEP_CYCLES = 2
+
+    def __init__(self, path: str | Path):
+        """Open the database, creating its tables if needed."""
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS cycles (
+                cycle INTEGER PRIMARY KEY AUTOINCREMENT,
+                shards INTEGER NOT NULL,
+                opened_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS leases (
+                cycle INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                worker TEXT,
+                expires_at REAL NOT NULL DEFAULT 0,
+                completed_at REAL,
+                PRIMARY KEY (cycle, shard)
+            );
+            CREATE TABLE IF NOT EXISTS polled (
+                cycle INTEGER NOT NULL,
+                shard INTEGER NOT NULL,
+                device TEXT NOT NULL,
+                PRIMARY KEY (cycle, shard, device)
+            );
+            """)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Cursor]:
+        with self._lock:
+            cursor = self._db.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            try:
+                yield cursor
+            except BaseException:
+                cursor.execute("ROLLBACK")
+                raise
+            cursor.execute("COMMIT")
+
+    def open_cycle(self, shards: int) -> int:
+        """Open a new cycle of pending shards and return its number."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO cycles (shards, opened_at) VALUES (?, ?)",
+                (shards, time.time()),
+            )
+            cycle = cursor.lastrowid
+            cursor.executemany(
+                "INSERT INTO leases (cycle, shard) VALUES (?, ?)",
+                ((cycle, shard) for shard in range(shards)),
+            )
+            oldest = cycle - self.KEEP_CYCLES
+            for table in ("cycles", "leases", "polled"):
+                cursor.execute(f"DELETE FROM {table} WHERE cycle <= ?", (oldest,))
+        return cycle
+
+    def progress(self, cycle: int) -> CycleProgress:
+        """Return the state of the shards of a cycle."""
+        now = time.time()
+        with self._lock:
+            completed, leased, pending = self._db.execute(
+                """
+                SELECT
+                    COUNT(completed_at),
+                    SUM(completed_at IS NULL AND expires_at >= ?),
+                    SUM(completed_at IS NULL AND expires_at < ?)
+                FROM leases WHERE cycle = ?
+                """,
+                (now, now, cycle),
+            ).fetchone()
+        return CycleProgress(
+            cycle=cycle, completed=completed, leased=leased or 0, pending=pending or 0
+        )
+
+    def claim(self, worker: str, ttl: float) -> ShardLease | None:
+        """Lease a pending shard of the latest cycle, None if there is none left."""
+        now = time.time()
+        with self._transaction() as cursor:
+            row = cursor.execute(
+                """
+                SELECT leases.cycle, cycles.shards, leases.shard
+                FROM leases JOIN cycles ON cycles.cycle = leases.cycle
+                WHERE leases.cycle = (SELECT MAX(cycle) FROM cycles)
+                    AND completed_at IS NULL AND expires_at < ?
+                ORDER BY leases.shard LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            cycle, shards, shard = row
+            cursor.execute(
+                "UPDATE leases SET worker = ?, expires_at = ? WHERE cycle = ? AND shard = ?",
+                (worker, now + ttl, cycle, shard),
+            )
+        return ShardLease(cycle=cycle, shards=shards, shard=shard, worker=worker)
+
+    def renew(self, lease: ShardLease, ttl: float) -> bool:
+        """Extend a lease, False if it expired and was taken over or completed."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE leases SET expires_at = ?
+                WHERE cycle = ? AND shard = ? AND worker = ? AND completed_at IS NULL
+                """,
+                (time.time() + ttl, lease.cycle, lease.shard, lease.worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, lease: ShardLease):
+        """Mark a leased shard as completed."""
+        with self._transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE leases SET completed_at = ?
+                WHERE cycle = ? AND shard = ? AND worker = ?
+                """,
+                (time.time(), lease.cycle, lease.shard, lease.worker),
+            )
+
+    def claim_device(self, lease: ShardLease, key: str) -> bool:
+        """Claim a device of a leased shard, False if it was polled or the lease is lost."""
+        with self._transaction() as cursor:
+            held = cursor.execute(
+                """
+                SELECT 1 FROM leases
+                WHERE cycle = ? AND shard = ? AND worker = ?
+                    AND completed_at IS NULL AND expires_at >= ?
+                """,
+                (lease.cycle, lease.shard, lease.worker, time.time()),
+            ).fetchone()
+            if held is None:
+                return False
+            cursor.execute(
+                "INSERT OR IGNORE INTO polled (cycle, shard, device) VALUES (?, ?, ?)",
+                (lease.cycle, lease.shard, key),
+            )
+            return cursor.rowcount == 1
+
+    def polled(self, lease: ShardLease) -> set[str]:
+        """Return the devices of a leased shard already polled in the cycle."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT device FROM polled WHERE cycle = ? AND shard = ?",
+                (lease.cycle, lease.shard),
+            ).fetchall()
+        return {device for (device,) in rows}
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._db.close()
+
+
+# URL scheme -> factory of the lease store, given the rest of the URL
+LEASE_STORES: dict[str, Callable[[str], LeaseStore]] = {
+    "sqlite": SQLiteLeaseStore,
+}
+
+
+def create_lease_store(url: str) -> LeaseStore:
+    """
+    Create the lease store of a URL.
+
+    Args:
+    ----
+        url (str): ``<scheme>://<location>``, or the path of a SQLite database.
+
+    Returns:
+    -------
+        LeaseStore: The lease store.
+
+    Raises:
+    ------
+        ValueError: If the URL scheme has no registered lease store.
+
+    """
+    scheme, separator, location = url.partition("://")
+    if not separator:
+        return SQLiteLeaseStore(url)
+    factory = LEASE_STORES.get(scheme)
+    if factory is None:
+        raise ValueError(
+            f"unsupported lease store '{scheme}', expected any of {list(LEASE_STORES)}"
+        )
+    return factory(location)
+
+
+class LeaseKeeper:
+    """Background renewal of a lease, for as long as its shard is being polled."""
+
+    def __init__(self, store: LeaseStore, lease: ShardLease, ttl: float):
+        """Initialize the keeper of a lease."""
+        self.store = store
+        self.lease = lease
+        self.ttl = ttl
+        self.lost = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"diode-napalm-lease-{lease.shard}", daemon=True
+        )
+
+    def __enter__(self) -> "LeaseKeeper":
+        """Start renewing the lease."""
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop renewing the lease."""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                renewed = self.store.renew(self.lease, self.ttl)
+            except Exception as e:
+                logger.warning(
+                    "Unable to renew lease of shard %s: %s", self.lease.shard, e
+                )
+                continue
+            if not renewed:
+                logger.warning(
+                    "Lease of shard %s of cycle %s lost",
+                    self.lease.shard,
+                    self.lease.cycle,
+                )
+                self.lost.set()
+                return
+
+
+def run_worker(
+    store: LeaseStore,
+    worker: str,
+    poll_shard: Callable[[ShardLease, LeaseKeeper], None],
+    stop: threading.Event,
+    ttl: float = DEFAULT_LEASE_TTL,
+    poll_interval: float = 5.0,
+    on_cycle: Callable[[int], None] | None = None,
+):
+    """
+    Lease and poll shards until stopped.
+
+    Args:
+    ----
+        store (LeaseStore): The lease store.
+        worker (str): The worker id.
+        poll_shard (Callable): Polls the devices of a leased shard, it should stop
+            when the lease is lost.
+        stop (threading.Event): Event that ends the loop once set.
+        ttl (float): Seconds a lease lasts without renewal.
+        poll_interval (float): Seconds between two claims when no shard is pending.
+        on_cycle (Callable | None): Called with the cycle number once the worker
+            has no more pending shard to lease in it.
+
+    """
+    cycle = None
+    while not stop.is_set():
+        lease = store.claim(worker, ttl)
+        if lease is None:
+            if cycle is not None and on_cycle is not None:
+                on_cycle(cycle)
+            cycle = None
+            stop.wait(poll_interval)
+            continue
+        if cycle is not None and lease.cycle != cycle and on_cycle is not None:
+            on_cycle(cycle)
+        cycle = lease.cycle
+        with LeaseKeeper(store, lease, ttl) as keeper:
+            try:
+                poll_shard(lease, keeper)
+            except Exception as e:
+                logger.error("Error while polling shard %s: %s", lease.shard, e)
+                continue
+        if not keeper.lost.is_set():
+            store.complete(lease)
+
+
+def run_coordinator(
+    store: LeaseStore, shards: int, interval: float, stop: threading.Event
+):
+    """
+    Open a cycle every interval until stopped.
+
+    Args:
+    ----
+        store (LeaseStore): The lease store.
+        shards (int): The number of shards of each cycle.
+        interval (float): Seconds between the start of two cycles.
+        stop (threading.Event): Event that ends the loop once set.
+
+    """
+    cycle = None
+    while not stop.is_set():
+        started = time.monotonic()
+        if cycle is not None:
+            progress = store.progress(cycle)
+            if progress.completed < shards:
+                logger.warning(
+                    "Cycle %s unfinished: %d of %d shards completed, %d leased, "
+                    "%d pending",
+                    cycle,
+                    progress.completed,
+                    shards,
+                    progress.leased,
+                    progress.pending,
+                )
+        cycle = store.open_cycle(shards)
+        logger.info("Cycle %s opened with %d shards", cycle, shards)
+        stop.wait(max(0.0, interval - (time.monotonic() - started)))
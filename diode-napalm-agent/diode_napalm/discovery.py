@@ -2,15 +2,34 @@
 # Copyright 2024 NetBox Labs Inc
 """Discover the correct NAPALM Driver."""
 
+import hashlib
+import json
 import logging
+import os
+import sys
+import threading
+import time
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 
 import importlib_metadata
-from napalm import get_network_driver
+
+from diode_napalm.logs import suppress_driver_logs
+from diode_napalm.storage import atomic_open
 
 # Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+DRIVER_CACHE_ENV = "DIODE_NAPALM_CACHE_DIR"
+DRIVER_CACHE_FILE = "drivers.json"
+
+_supported_drivers: list[str] | None = None
+_supported_drivers_lock = threading.Lock()
+
+# Driver name -> NAPALM network driver class, filled once per process
+_driver_classes: dict[str, type] = {}
+
 
 def napalm_driver_list() -> list[str]:
     """
@@ -36,7 +55,175 @@ def napalm_driver_list() -> list[str]:
     return napalm_packages
 
 
-supported_drivers = napalm_driver_list()
+def site_packages_fingerprint() -> str:
+    """
+    Compute a fingerprint of the directories Python imports packages from.
+
+    Installing or removing a distribution changes the modification time of the
+    directory it is installed in, so the fingerprint changes whenever the set of
+    installed NAPALM drivers may have changed.
+
+    Returns
+    -------
+        str: A hex digest identifying the current state of ``sys.path``.
+
+    """
+    digest = hashlib.sha256(sys.version.encode())
+    for entry in sys.path:
+        try:
+            mtime = os.stat(entry or ".").st_mtime_ns
+        except OSError:
+            continue
+        digest.update(f"{entry}:{mtime}\n".encode())
+    return digest.hexdigest()
+
+
+def driver_cache_path() -> Path:
+    """
+    Return the path of the on-disk NAPALM driver list cache.
+
+    The directory can be overridden with the ``DIODE_NAPALM_CACHE_DIR`` environment
+    variable, otherwise ``$XDG_CACHE_HOME/diode-napalm-agent`` is used.
+
+    Returns
+    -------
+        Path: The driver cache file path.
+
+    """
+    cache_dir = os.getenv(DRIVER_CACHE_ENV)
+    if not cache_dir:
+        xdg_cache = os.getenv("XDG_CACHE_HOME") or os.path.join(
+            os.path.expanduser("~"), ".cache"
+        )
+        cache_dir = os.path.join(xdg_cache, "diode-napalm-agent")
+    return Path(cache_dir) / DRIVER_CACHE_FILE
+
+
+def _load_cached_drivers(path: Path, fingerprint: str) -> list[str] | None:
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cached, dict) or cached.get("fingerprint") != fingerprint:
+        return None
+    drivers = cached.get("drivers")
+    if not isinstance(drivers, list):
+        return None
+    return drivers
+
+
+def _store_cached_drivers(path: Path, fingerprint: str, drivers: list[str]):
+    try:
+        with atomic_open(path) as f:
+            json.dump({"fingerprint": fingerprint, "drivers": drivers}, f)
+    except OSError as e:
+        logger.debug("Unable to write NAPALM driver cache %s: %s", path, e)
+
+
+def get_supported_drivers() -> list[str]:
+    """
+    Return the available NAPALM drivers, enumerating them at most once.
+
+    The list is memoized for the lifetime of the process and cached on disk keyed
+    on the site-packages fingerprint, so subsequent runs skip scanning every
+    installed distribution unless the environment changed.
+
+    Returns
+    -------
+        List[str]: The names of the available NAPALM drivers.
+
+    """
+    global _supported_drivers
+    if _supported_drivers is not None:
+        return _supported_drivers
+    with _supported_drivers_lock:
+        if _supported_drivers is None:
+            path = driver_cache_path()
+            fingerprint = site_packages_fingerprint()
+            drivers = _load_cached_drivers(path, fingerprint)
+            if drivers is None:
+                drivers = napalm_driver_list()
+                _store_cached_drivers(path, fingerprint, drivers)
+            _supported_drivers = drivers
+    return _supported_drivers
+
+
+def __getattr__(name: str):
+    """Resolve ``supported_drivers`` lazily on first access."""
+    if name == "supported_drivers":
+        return get_supported_drivers()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_network_driver(driver: str):
+    """
+    Return the NAPALM driver class for the given driver name.
+
+    NAPALM and its driver dependencies are imported on first use rather than when
+    this module is imported, which keeps CLI startup fast. Driver classes are
+    cached, so only the first call for a driver goes through the NAPALM import
+    machinery.
+
+    Args:
+    ----
+        driver (str): The NAPALM driver name.
+
+    Returns:
+    -------
+        type: The NAPALM network driver class.
+
+    """
+    driver_class = _driver_classes.get(driver)
+    if driver_class is None:
+        from napalm import get_network_driver as napalm_get_network_driver
+
+        driver_class = _driver_classes[driver] = napalm_get_network_driver(driver)
+    return driver_class
+
+
+def preload_drivers(drivers: Iterable[str], workers: int = 4) -> dict[str, Exception]:
+    """
+    Import NAPALM driver classes in parallel, before devices are scheduled.
+
+    Workers then get the cached classes instead of contending on the import lock
+    of the first devices of each driver.
+
+    Args:
+    ----
+        drivers (Iterable[str]): The driver names.
+        workers (int): Number of threads importing drivers.
+
+    Returns:
+    -------
+        dict[str, Exception]: The drivers that could not be imported, with the error.
+
+    """
+    drivers = [
+        driver for driver in dict.fromkeys(drivers) if driver not in _driver_classes
+    ]
+    if not drivers:
+        return {}
+    started = time.perf_counter()
+    # Import napalm itself once, drivers are then imported concurrently
+    from napalm import get_network_driver as napalm_get_network_driver  # noqa: F401
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(drivers)))) as executor:
+        futures = {
+            driver: executor.submit(get_network_driver, driver) for driver in drivers
+        }
+    for driver, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            logger.warning("Unable to preload NAPALM driver '%s': %s", driver, error)
+            errors[driver] = error
+    logger.info(
+        "Preloaded %d NAPALM drivers in %.2fs",
+        len(drivers) - len(errors),
+        time.perf_counter() - started,
+    )
+    return errors
 
 
 def set_napalm_logs_level(level: int):
@@ -51,7 +238,8 @@ def set_napalm_logs_level(level: int):
 
     This function adjusts the logging levels for the "napalm", "ncclient","paramiko"
     and "pyeapi" loggers to the specified level, which is useful for controlling the
-    verbosity of log output from these libraries.
+    verbosity of log output from these libraries. Levels are global to the
+    process, use ``suppress_driver_logs`` to silence the drivers of a single thread.
 
     """
     logging.getLogger("napalm").setLevel(level)
@@ -76,29 +264,34 @@ def discover_device_driver(info: dict) -> str:
              the device. Returns an empty string if no suitable driver is found.
 
     """
-    set_napalm_logs_level(logging.CRITICAL)
-    for driver in supported_drivers:
-        try:
-            logger.info(f"Hostname {info.hostname}: Trying '{driver}' driver")
-            np_driver = get_network_driver(driver)
-            with np_driver(
-                info.hostname,
-                info.username,
-                info.password,
-                info.timeout,
-                info.optional_args,
-            ) as device:
-                device_info = device.get_facts()
-                if device_info.get("serial_number", "Unknown").lower() == "unknown":
-                    logger.info(
-                        f"Hostname {info.hostname}: '{driver}' driver did not work"
-                    )
-                    continue
-                set_napalm_logs_level(logging.INFO)
-                return driver
-        except Exception as e:
-            logger.info(
-                f"Hostname {info.hostname}: '{driver}' driver did not work. Exception: {str(e)}"
-            )
-    set_napalm_logs_level(logging.INFO)
+    # The logs of the drivers that don't match the device are noise
+    with suppress_driver_logs():
+        for driver in get_supported_drivers():
+            try:
+                logger.info("Hostname %s: Trying '%s' driver", info.hostname, driver)
+                np_driver = get_network_driver(driver)
+                with np_driver(
+                    info.hostname,
+                    info.username,
+                    info.password,
+                    info.timeout,
+                    info.optional_args,
+                ) as device:
+                    device_info = device.get_facts()
+                    serial_number = device_info.get("serial_number", "Unknown")
+                    if serial_number.lower() == "unknown":
+                        logger.info(
+                            "Hostname %s: '%s' driver did not work",
+                            info.hostname,
+                            driver,
+                        )
+                        continue
+                    return driver
+            except Exception as e:
+                logger.info(
+                    "Hostname %s: '%s' driver did not work. Exception: %s",
+                    info.hostname,
+                    driver,
+                    e,
+                )
     return ""
@@ -0,0 +1,264 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Run NAPALM getters and account for their cost."""
+
+import json
+import logging
+import threading
+import time
+
+from diode_napalm.storage import HostStore
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# NAPALM getter name -> key of its output in the collected data
+GETTERS = {
+    "get_facts": "device",
+    "get_interfaces": "interface",
+    "get_interfaces_ip": "interface_ip",
+    "get_lldp_neighbors_detail": "lldp_neighbors",
+    "get_vlans": "vlan",
+    "get_environment": "environment",
+    "get_arp_table": "arp_table",
+}
+
+DEFAULT_GETTERS = ["get_facts", "get_interfaces", "get_interfaces_ip"]
+
+
+class GetterStats:
+    """
+    Thread-safe accounting of the time spent in each NAPALM getter, per driver.
+
+    Attributes
+    ----------
+        stats (dict): (driver, getter) -> [calls, failures, total seconds, max seconds].
+
+    """
+
+    def __init__(self):
+        """Initialize empty statistics."""
+        self._lock = threading.Lock()
+        self.stats: dict[tuple[str, str], list] = {}
+
+    def record(self, driver: str, getter: str, seconds: float, failed: bool = False):
+        """
+        Record a getter call.
+
+        Args:
+        ----
+            driver (str): The NAPALM driver name.
+            getter (str): The getter name.
+            seconds (float): The time spent in the getter.
+            failed (bool): Whether the getter raised an exception.
+
+        """
+        with self._lock:
+            entry = self.stats.setdefault((driver, getter), [0, 0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += int(failed)
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+
+    def drain(self) -> dict[tuple[str, str], list]:
+        """Return the statistics recorded so far and reset them."""
+        with self._lock:
+            stats, self.stats = self.stats, {}
+        return stats
+
+    def merge(self, stats: dict[tuple[str, str], list]):
+        """
+        Add statistics recorded elsewhere, such as in a session worker process.
+
+        Args:
+        ----
+            stats (dict): The statistics, as returned by ``drain``.
+
+        """
+        with self._lock:
+            for key, (calls, failures, total, longest) in stats.items():
+                entry = self.stats.setdefault(key, [0, 0, 0.0, 0.0])
+                entry[0] += calls
+                entry[1] += failures
+                entry[2] += total
+                entry[3] = max(entry[3], longest)
+
+    def average(self, driver: str, getter: str) -> float | None:
+        """Return the average duration of a getter for a driver, if it ran."""
+        with self._lock:
+            entry = self.stats.get((driver, getter))
+        if not entry:
+            return None
+        return entry[2] / entry[0]
+
+    def summary(self) -> list[str]:
+        """Return one line per driver and getter, most expensive first."""
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1][2])
+        return [
+            f"{driver} {getter}: {calls} calls, {failures} failed, "
+            f"avg {total / calls:.3f}s, max {longest:.3f}s, total {total:.3f}s"
+            for (driver, getter), (calls, failures, total, longest) in items
+        ]
+
+    def log_summary(self):
+        """Log the getters cost summary."""
+        for line in self.summary():
+            logger.info("Getter cost %s", line)
+
+
+getter_stats = GetterStats()
+
+
+def collect(
+    device, hostname: str, driver: str, getters: list[str]
+) -> tuple[dict, dict[str, float]]:
+    """
+    Run the selected NAPALM getters on an open device session.
+
+    Failures of the default getters are raised, while failures of the optional
+    getters (which some drivers do not implement) are logged and skipped.
+
+    Args:
+    ----
+        device: The open NAPALM device session.
+        hostname (str): The device hostname, used in log messages.
+        driver (str): The NAPALM driver name, used for cost accounting.
+        getters (list[str]): The getters to run.
+
+    Returns:
+    -------
+        tuple[dict, dict[str, float]]: The collected data keyed as expected by
+        ``translate_data``, and the seconds spent in each getter.
+
+    """
+    data = {}
+    timings = {}
+    for getter in getters:
+        started = time.perf_counter()
+        try:
+            data[GETTERS[getter]] = getattr(device, getter)()
+        except Exception as e:
+            timings[getter] = time.perf_counter() - started
+            getter_stats.record(driver, getter, timings[getter], failed=True)
+            if getter in DEFAULT_GETTERS:
+                raise
+            logger.warning("Hostname %s: getter '%s' failed: %s", hostname, getter, e)
+            continue
+        timings[getter] = time.perf_counter() - started
+        getter_stats.record(driver, getter, timings[getter])
+    return data, timings
+
+
+def _encode_entries(entries: dict[str, tuple[float, object]]) -> bytes:
+    return json.dumps(entries, separators=(",", ":"), default=str).encode()
+
+
+def _decode_entries(encoded: bytes | str) -> dict[str, tuple[float, object]]:
+    return {
+        getter: (collected_at, value)
+        for getter, (collected_at, value) in json.loads(encoded).items()
+    }
+
+
+class GetterCache(HostStore):
+    """
+    Cache of the getters output that only needs refreshing every so often.
+
+    Entries are kept in memory, or in one compressed JSON file per device when a
+    directory is configured, so one-shot runs can reuse them across executions.
+    In memory, each device entry is held as compressed JSON rather than as the
+    getters output objects, which would add up to the whole inventory output in
+    long-running mode.
+    """
+
+    def get(self, hostname: str) -> dict[str, tuple[float, object]]:
+        """
+        Return the cached getters output of a device.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+
+        Returns:
+        -------
+            dict[str, tuple[float, object]]: Getter name to collection time and output.
+
+        """
+        try:
+            encoded = self.read(hostname)
+            return {} if encoded is None else _decode_entries(encoded)
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(
+                "Hostname %s: ignoring unreadable getter cache: %s", hostname, e
+            )
+            return {}
+
+    def update(self, hostname: str, values: dict[str, object], collected_at: float):
+        """
+        Store fresh getters output of a device.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            values (dict[str, object]): Getter name to output.
+            collected_at (float): The collection time, as a UNIX timestamp.
+
+        """
+        if not values:
+            return
+        entries = self.get(hostname)
+        entries.update(
+            {getter: (collected_at, value) for getter, value in values.items()}
+        )
+        encoded = _encode_entries(entries)
+        del entries
+        try:
+            self.write(hostname, encoded)
+        except OSError as e:
+            logger.warning("Hostname %s: unable to write getter cache: %s", hostname, e)
+
+    def plan(
+        self, hostname: str, getters: list[str], refresh: dict[str, int], now: float
+    ) -> tuple[list[str], dict]:
+        """
+        Split getters between the ones to run and the ones still fresh in cache.
+
+        Facts are run whenever interfaces are, since their interface list selects
+        the interfaces that are translated.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            getters (list[str]): The configured getters.
+            refresh (dict[str, int]): Getter name to refresh interval in seconds.
+            now (float): The current time, as a UNIX timestamp.
+
+        Returns:
+        -------
+            tuple[list[str], dict]: The getters to run, and the fresh cached data
+            keyed as expected by ``translate_data``.
+
+        """
+        if not any(getter in refresh for getter in getters):
+            return list(getters), {}
+        entries = self.get(hostname)
+        due = []
+        cached = {}
+        for getter in getters:
+            entry = entries.get(getter)
+            if (
+                getter in refresh
+                and entry is not None
+                and now - entry[0] < refresh[getter]
+            ):
+                cached[GETTERS[getter]] = entry[1]
+            else:
+                due.append(getter)
+        if "get_interfaces" in due and "device" in cached:
+            del cached["device"]
+            due.insert(0, "get_facts")
+        return due, cached
+
+
+getter_cache = GetterCache()
@@ -0,0 +1,500 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Device inventories read from external files."""
+
+import csv
+import hashlib
+import json
+import logging
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from itertools import chain
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, Field, ValidationError
+
+from diode_napalm.parser import (
+    ConnectionProfile,
+    EnvResolver,
+    InventorySource,
+    Napalm,
+    ParseException,
+    Policy,
+    iter_yaml_sequence,
+    resolve_env_vars,
+    validate_device,
+)
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+OPTIONAL_ARGS_PREFIX = "optional_args."
+
+
+def _iter_jsonl(file_path: Path) -> Iterator[Any]:
+    with open(file_path) as f:
+        for lineno, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                logger.error(
+                    "Inventory %s:%d: skipping invalid line: %s", file_path, lineno, e
+                )
+
+
+def _iter_csv(file_path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over the rows of a CSV inventory.
+
+    Empty cells are left out so model defaults apply. The ``optional_args`` column
+    holds a JSON object, and ``optional_args.<name>`` columns set single arguments.
+    """
+    with open(file_path, newline="") as f:
+        for row in csv.DictReader(f):
+            record = {}
+            optional_args = {}
+            for key, value in row.items():
+                if key is None or value is None or value == "":
+                    continue
+                if key == "optional_args":
+                    # Invalid JSON is reported by the model validation
+                    try:
+                        optional_args.update(json.loads(value))
+                    except (TypeError, ValueError):
+                        record[key] = value
+                elif key.startswith(OPTIONAL_ARGS_PREFIX):
+                    optional_args[key[len(OPTIONAL_ARGS_PREFIX) :]] = value
+                else:
+                    record[key] = value
+            if optional_args:
+                record["optional_args"] = optional_args
+            yield record
+
+
+def _iter_netbox(file_path: Path) -> Iterator[dict[str, Any]]:
+    """
+    Iterate over the devices of a NetBox JSON export.
+
+    Both a plain list of devices and an API response with ``results`` are accepted.
+    The hostname is the primary IP address (without prefix length) when the
+    device has one, otherwise its name, and the driver comes from the platform
+    ``napalm_driver`` when it is set.
+    """
+    with open(file_path) as f:
+        document = json.load(f)
+    if isinstance(document, dict):
+        document = document.get("results", [])
+    for device in document:
+        if not isinstance(device, dict):
+            yield device
+            continue
+        record = {
+            key: device[key]
+            for key in (
+                "hostname",
+                "username",
+                "password",
+                "timeout",
+                "optional_args",
+                "profile",
+            )
+            if key in device
+        }
+        if "hostname" not in record:
+            primary_ip = device.get("primary_ip") or {}
+            address = (
+                primary_ip.get("address")
+                if isinstance(primary_ip, dict)
+                else primary_ip
+            )
+            hostname = address.split("/")[0] if address else device.get("name")
+            if hostname:
+                record["hostname"] = hostname
+        platform = device.get("platform")
+        driver = device.get("driver") or (
+            platform.get("napalm_driver") if isinstance(platform, dict) else None
+        )
+        if driver:
+            record["driver"] = driver
+        yield record
+
+
+_READERS = {
+    "yaml": iter_yaml_sequence,
+    "jsonl": _iter_jsonl,
+    "csv": _iter_csv,
+    "netbox": _iter_netbox,
+}
+
+_EXTENSIONS = {
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".csv": "csv",
+    ".json": "netbox",
+}
+
+
+def iter_records(file_path: Path, file_format: str = "auto") -> Iterator[Any]:
+    """
+    Iterate over the raw device records of an inventory file.
+
+    Args:
+    ----
+        file_path (Path): A YAML list, JSON lines, CSV or NetBox JSON export file.
+        file_format (str): The file format, guessed from the extension when "auto".
+
+    Returns:
+    -------
+        Iterator[Any]: The raw records, read one at a time.
+
+    Raises:
+    ------
+        ParseException: If the file format is not supported.
+
+    """
+    if file_format == "auto":
+        file_format = _EXTENSIONS.get(Path(file_path).suffix.lower())
+    reader = _READERS.get(file_format)
+    if reader is None:
+        raise ParseException(
+            f"Unsupported inventory file {file_path}, expected one of: {', '.join(_EXTENSIONS)}"
+        )
+    return reader(file_path)
+
+
+def inventory_files(source: InventorySource) -> list[Path]:
+    """
+    List the inventory files of a source.
+
+    Args:
+    ----
+        source (InventorySource): The inventory source, a file or a directory.
+
+    Returns:
+    -------
+        list[Path]: The source file, or the supported files of the directory sorted by path.
+
+    """
+    if not source.path.is_dir():
+        return [source.path]
+    return sorted(
+        path
+        for path in source.path.rglob("*")
+        if path.is_file()
+        and (source.format != "auto" or path.suffix.lower() in _EXTENSIONS)
+    )
+
+
+def _validate(
+    source: InventorySource,
+    file_path: Path,
+    position: int,
+    record: Any,
+    resolver: EnvResolver,
+    profiles: dict[str, ConnectionProfile] | None = None,
+) -> Napalm | None:
+    try:
+        if source.defaults and isinstance(record, dict):
+            record = {**source.defaults, **record}
+        return validate_device(resolve_env_vars(record, resolver), profiles or {})
+    except ValueError as e:
+        logger.error(
+            "Inventory %s: skipping invalid device #%d: %s", file_path, position, e
+        )
+    return None
+
+
+def iter_inventory(
+    source: InventorySource | Path,
+    profiles: dict[str, ConnectionProfile] | None = None,
+) -> Iterator[Napalm]:
+    """
+    Iterate over the devices of an inventory source, validating them one at a time.
+
+    Invalid entries are logged and skipped so a single bad record does not stop
+    the devices that follow it.
+
+    Args:
+    ----
+        source (InventorySource | Path): The inventory source or file path.
+        profiles (dict[str, ConnectionProfile] | None): The connection profiles
+            devices can reference.
+
+    Returns:
+    -------
+        Iterator[Napalm]: The validated devices.
+
+    """
+    if not isinstance(source, InventorySource):
+        source = InventorySource(path=source)
+    resolver = EnvResolver()
+    for file_path in inventory_files(source):
+        records = iter_records(file_path, source.format)
+        for position, record in enumerate(records, start=1):
+            device = _validate(source, file_path, position, record, resolver, profiles)
+            if device is not None:
+                yield device
+
+
+def policy_devices(policy: Policy) -> Iterator[Napalm]:
+    """
+    Iterate over the inline devices of a policy followed by its inventory devices.
+
+    Args:
+    ----
+        policy (Policy): The policy configuration.
+
+    Returns:
+    -------
+        Iterator[Napalm]: The policy devices.
+
+    """
+    if policy.inventory is None:
+        return iter(policy.data)
+    return chain(policy.data, iter_inventory(policy.inventory, policy.profiles))
+
+
+class InventoryChanges(BaseModel):
+    """Model for the devices changed by an inventory reload."""
+
+    added: list[str] = Field(default_factory=list)
+    changed: list[str] = Field(default_factory=list)
+    removed: list[str] = Field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        """Whether any device was added, changed or removed."""
+        return bool(self.added or self.changed or self.removed)
+
+    def update(self, other: "InventoryChanges"):
+        """Merge the changes of another reload."""
+        self.added.extend(other.added)
+        self.changed.extend(other.changed)
+        self.removed.extend(other.removed)
+
+
+class InventoryProvider(ABC):
+    """Source of devices for a policy that can be reloaded between runs."""
+
+    @abstractmethod
+    def devices(self) -> Iterable[Napalm]:
+        """Return the devices known after the last reload."""
+
+    @abstractmethod
+    def reload(self) -> InventoryChanges:
+        """Refresh the devices from the source, re-reading only what changed."""
+
+
+class StaticInventory(InventoryProvider):
+    """Inventory of the devices listed inline in a policy."""
+
+    def __init__(self, devices: list[Napalm]):
+        """Initialize the inventory with a fixed list of devices."""
+        self._devices = devices
+        self._loaded = False
+
+    def devices(self) -> Iterable[Napalm]:
+        """Return the inline devices."""
+        return self._devices
+
+    def reload(self) -> InventoryChanges:
+        """Report every device as added on the first reload only."""
+        if self._loaded:
+            return InventoryChanges()
+        self._loaded = True
+        return InventoryChanges(added=[device.hostname for device in self._devices])
+
+
+def _fingerprint(record: Any) -> bytes:
+    encoded = json.dumps(record, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).digest()
+
+
+def _file_stat(file_path: Path) -> tuple[int, int] | None:
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class FileInventory(InventoryProvider):
+    """
+    Inventory read from a single file.
+
+    The file is only read again when its modification time or size changed, and
+    only records whose content changed are validated again.
+    """
+
+    def __init__(
+        self,
+        file_path: Path,
+        source: InventorySource,
+        profiles: dict[str, ConnectionProfile] | None = None,
+    ):
+        """Initialize the inventory for a file of the given source."""
+        self.file_path = file_path
+        self.source = source
+        self.profiles = profiles
+        self._stat = None
+        self._devices: dict[str, tuple[bytes, Napalm]] = {}
+
+    def devices(self) -> Iterable[Napalm]:
+        """Return the devices read from the file."""
+        return [device for _, device in self._devices.values()]
+
+    def reload(self) -> InventoryChanges:
+        """Read the file again if it changed since the last reload."""
+        stat = _file_stat(self.file_path)
+        if stat == self._stat:
+            return InventoryChanges()
+
+        previous = self._devices
+        # Records are matched by content, their hostname may only be known once resolved
+        cached = {entry[0]: entry for entry in previous.values()}
+        current = {}
+        changes = InventoryChanges()
+        if stat is not None:
+            self._resolver = EnvResolver()
+            try:
+                records = iter_records(self.file_path, self.source.format)
+                for position, record in enumerate(records, start=1):
+                    self._reload_record(
+                        previous, cached, current, changes, position, record
+                    )
+            except Exception as e:
+                # Keep the known devices until the file can be read again
+                logger.error("Inventory %s: unable to reload: %s", self.file_path, e)
+                return InventoryChanges()
+
+        changes.removed.extend(
+            hostname for hostname in previous if hostname not in current
+        )
+        self._stat = stat
+        self._devices = current
+        return changes
+
+    def _reload_record(
+        self,
+        previous: dict[str, tuple[bytes, Napalm]],
+        cached: dict[bytes, tuple[bytes, Napalm]],
+        current: dict[str, tuple[bytes, Napalm]],
+        changes: InventoryChanges,
+        position: int,
+        record: Any,
+    ):
+        fingerprint = _fingerprint(record)
+        entry = cached.get(fingerprint)
+        if entry is not None:
+            device = entry[1]
+        else:
+            device = _validate(
+                self.source,
+                self.file_path,
+                position,
+                record,
+                self._resolver,
+                self.profiles,
+            )
+            if device is None:
+                return
+        if device.hostname in current:
+            logger.warning(
+                "Inventory %s: duplicated hostname %s", self.file_path, device.hostname
+            )
+        elif entry is None and device.hostname in previous:
+            changes.changed.append(device.hostname)
+        elif entry is None:
+            changes.added.append(device.hostname)
+        current[device.hostname] = (fingerprint, device)
+
+
+class DirectoryInventory(InventoryProvider):
+    """
+    Inventory read from every supported file of a directory tree.
+
+    Only added or modified files are read again on reload.
+    """
+
+    def __init__(
+        self,
+        source: InventorySource,
+        profiles: dict[str, ConnectionProfile] | None = None,
+    ):
+        """Initialize the inventory for a directory source."""
+        self.source = source
+        self.profiles = profiles
+        self._files: dict[Path, FileInventory] = {}
+
+    def devices(self) -> Iterable[Napalm]:
+        """Return the devices of all files."""
+        return [
+            device
+            for inventory in self._files.values()
+            for device in inventory.devices()
+        ]
+
+    def reload(self) -> InventoryChanges:
+        """Reload added and modified files, and drop the devices of removed files."""
+        changes = InventoryChanges()
+        files = inventory_files(self.source)
+        for file_path in set(self._files) - set(files):
+            changes.removed.extend(
+                device.hostname for device in self._files.pop(file_path).devices()
+            )
+        for file_path in files:
+            inventory = self._files.get(file_path)
+            if inventory is None:
+                inventory = self._files[file_path] = FileInventory(
+                    file_path, self.source, self.profiles
+                )
+            changes.update(inventory.reload())
+        return changes
+
+
+class PolicyInventory(InventoryProvider):
+    """Inventory of a policy: its inline devices followed by its inventory source."""
+
+    def __init__(self, policy: Policy):
+        """Initialize the providers for the given policy."""
+        self.providers: list[InventoryProvider] = [StaticInventory(policy.data)]
+        if policy.inventory is not None:
+            self.providers.append(create_provider(policy.inventory, policy.profiles))
+
+    def devices(self) -> Iterable[Napalm]:
+        """Return the devices of all providers."""
+        return chain.from_iterable(provider.devices() for provider in self.providers)
+
+    def reload(self) -> InventoryChanges:
+        """Reload every provider."""
+        changes = InventoryChanges()
+        for provider in self.providers:
+            changes.update(provider.reload())
+        return changes
+
+
+def create_provider(
+    source: InventorySource, profiles: dict[str, ConnectionProfile] | None = None
+) -> InventoryProvider:
+    """
+    Create the inventory provider for an inventory source.
+
+    Args:
+    ----
+        source (InventorySource): The inventory source.
+        profiles (dict[str, ConnectionProfile] | None): The connection profiles
+            devices can reference.
+
+    Returns:
+    -------
+        InventoryProvider: A directory provider if the source is a directory, a file provider otherwise.
+
+    """
+    if source.path.is_dir():
+        return DirectoryInventory(source, profiles)
+    return FileInventory(source.path, source, profiles)
@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Run device sessions in recyclable worker processes."""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import threading
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from diode_napalm.getters import getter_stats
+from diode_napalm.logs import configure_logging, log_format
+from diode_napalm.profiling import tracer
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Worker processes are spawned rather than forked, the agent is multi-threaded
+_CONTEXT = multiprocessing.get_context("spawn")
+
+
+def current_rss() -> int:
+    """
+    Return the resident memory of the current process in bytes.
+
+    The current RSS is read from ``/proc`` when available, otherwise the peak RSS
+    reported by ``getrusage`` is used.
+
+    Returns
+    -------
+        int: The resident memory in bytes.
+
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _picklable_error(error: Exception) -> Exception:
+    # Driver exceptions do not always survive pickling, their message does
+    try:
+        pickle.loads(pickle.dumps(error))
+    except Exception:
+        return RuntimeError(f"{type(error).__name__}: {error}")
+    return error
+
+
+def _serve(conn, max_tasks: int | None, max_rss: int | None, log_fmt: str):
+    """Worker process loop: run tasks until recycled or told to stop."""
+    # Spawned processes start with the default logging configuration
+    configure_logging(log_fmt)
+    tasks = 0
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        func, args, (tracing, trace_context) = task
+        tracer.capture(tracing)
+        try:
+            with tracer.continue_trace(trace_context):
+                result = (True, func(*args))
+        except Exception as e:
+            result = (False, _picklable_error(e))
+        # Getter costs and spans are recorded by the agent process
+        telemetry = (getter_stats.drain(), tracer.drain())
+        tasks += 1
+        recycle = (max_tasks is not None and tasks >= max_tasks) or (
+            max_rss is not None and current_rss() > max_rss
+        )
+        try:
+            conn.send((result, recycle, telemetry))
+        except Exception as e:
+            conn.send(((False, _picklable_error(e)), recycle, telemetry))
+        if recycle:
+            return
+
+
+class _WorkerProcess:
+    """A worker process and the pipe its tasks go through."""
+
+    def __init__(self, max_tasks: int | None, max_rss: int | None):
+        self.conn, child_conn = _CONTEXT.Pipe()
+        self.process = _CONTEXT.Process(
+            target=_serve,
+            args=(child_conn, max_tasks, max_rss, log_format()),
+            name="diode-napalm-session",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+
+    def stop(self, timeout: float = 5.0):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class WorkerProcessPool:
+    """
+    Pool of worker processes running functions on behalf of the agent threads.
+
+    Each agent thread borrows a worker process for the duration of a call, so
+    the pool holds at most as many processes as it has threads. A worker process
+    exits after ``max_tasks`` calls or once its resident memory exceeds
+    ``max_rss`` bytes, and is replaced on the next call, which returns the memory
+    and threads leaked by network drivers to the system. Disabled until
+    configured.
+    """
+
+    def __init__(self):
+        """Initialize a disabled pool."""
+        self._condition = threading.Condition()
+        self._idle: deque[_WorkerProcess] = deque()
+        self._size = 0
+        self._started = 0
+        self.max_tasks: int | None = None
+        self.max_rss: int | None = None
+        self.recycled = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether calls run in worker processes."""
+        return self._size > 0
+
+    def configure(
+        self, size: int, max_tasks: int | None = None, max_rss: int | None = None
+    ):
+        """
+        Enable the pool, or disable it with a size of 0.
+
+        Args:
+        ----
+            size (int): Maximum number of worker processes.
+            max_tasks (int | None): Calls after which a worker process is replaced.
+            max_rss (int | None): Resident memory in bytes above which a worker
+                process is replaced.
+
+        """
+        self.close()
+        with self._condition:
+            self._size = size
+            self.max_tasks = max_tasks
+            self.max_rss = max_rss
+
+    def _acquire(self) -> _WorkerProcess:
+        with self._condition:
+            while not self._idle and self._started >= self._size:
+                self._condition.wait()
+            if self._idle:
+                return self._idle.popleft()
+            self._started += 1
+        try:
+            return _WorkerProcess(self.max_tasks, self.max_rss)
+        except Exception:
+            self._discard()
+            raise
+
+    def _release(self, worker: _WorkerProcess):
+        with self._condition:
+            if self._size:
+                self._idle.append(worker)
+                self._condition.notify()
+                return
+            # The pool was closed during the call
+            self._started -= 1
+        worker.stop()
+
+    def _discard(self, recycled: bool = False):
+        with self._condition:
+            self._started -= 1
+            self.recycled += recycled
+            self._condition.notify()
+
+    def call(self, func: Callable, *args) -> Any:
+        """
+        Call a function in a worker process and return its result.
+
+        Args:
+        ----
+            func (Callable): A module-level function, its arguments and result
+                must be picklable.
+            *args: The function arguments.
+
+        Returns:
+        -------
+            Any: The function result.
+
+        Raises:
+        ------
+            RuntimeError: If the worker process died during the call.
+            Exception: The exception raised by the function.
+
+        """
+        worker = self._acquire()
+        try:
+            tracing = (tracer.enabled, tracer.context())
+            worker.conn.send((func, args, tracing))
+        except (OSError, ValueError):
+            worker.stop()
+            self._discard()
+            raise
+        except Exception:
+            # Unpicklable arguments, nothing reached the worker process
+            self._release(worker)
+            raise
+        try:
+            (succeeded, value), recycle, (stats, spans) = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.process.join(1)
+            exitcode = worker.process.exitcode
+            worker.stop()
+            self._discard()
+            raise RuntimeError(
+                f"session process exited with code {exitcode} during the call"
+            ) from e
+        getter_stats.merge(stats)
+        tracer.write_lines(spans)
+        if recycle:
+            worker.stop()
+            self._discard(recycled=True)
+            logger.debug("Session process %s recycled", worker.process.pid)
+        else:
+            self._release(worker)
+        if not succeeded:
+            raise value
+        return value
+
+    def close(self):
+        """Stop the idle worker processes and disable the pool."""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._started -= len(idle)
+            self._size = 0
+        for worker in idle:
+            worker.stop()
+
+
+process_pool = WorkerProcessPool()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Per-device outcome ledger of an agent run."""
+
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+from diode_napalm.storage import atomic_open
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DeviceOutcome(BaseModel):
+    """Model for the outcome of a device in a run."""
+
+    policy: str
+    hostname: str
+    status: Literal["success", "failed", "skipped"] = "success"
+    driver: str | None = None
+    error_class: str | None = None
+    error: str | None = None
+    timings: dict[str, float] = Field(
+        default_factory=dict, description="Seconds spent in each stage"
+    )
+    entities: int | None = Field(
+        default=None, description="Number of entities ingested"
+    )
+    finished_at: datetime | None = None
+
+    def fail(self, error: Exception):
+        """Mark the device as failed with the given error."""
+        self.status = "failed"
+        self.error_class = type(error).__name__
+        self.error = str(error)
+
+
+class RunReport(BaseModel):
+    """Model for the ledger of a run, with one outcome per device."""
+
+    started_at: datetime = Field(default_factory=_now)
+    finished_at: datetime | None = None
+    summary: dict[str, int] = Field(default_factory=dict)
+    devices: list[DeviceOutcome] = Field(default_factory=list)
+
+    def failed(self) -> set[tuple[str, str]]:
+        """Return the policy and hostname of the devices that failed."""
+        return {
+            (outcome.policy, outcome.hostname)
+            for outcome in self.devices
+            if outcome.status == "failed"
+        }
+
+    def merge(self, previous: "RunReport"):
+        """Keep the outcomes of the devices of a previous run that did not run again."""
+        ran = {(outcome.policy, outcome.hostname) for outcome in self.devices}
+        self.devices[:0] = [
+            outcome
+            for outcome in previous.devices
+            if (outcome.policy, outcome.hostname) not in ran
+        ]
+        self.summary = dict(Counter(outcome.status for outcome in self.devices))
+
+
+class RunLedger:
+    """Thread-safe collector of device outcomes, enabled by starting a run."""
+
+    def __init__(self):
+        """Initialize a ledger with no run started."""
+        self._lock = threading.Lock()
+        self.report: RunReport | None = None
+
+    def start(self):
+        """Start recording a new run."""
+        with self._lock:
+            self.report = RunReport()
+
+    def record(self, outcome: DeviceOutcome):
+        """Record the outcome of a device, ignored if no run was started."""
+        outcome.finished_at = _now()
+        with self._lock:
+            if self.report is not None:
+                self.report.devices.append(outcome)
+
+    def finish(self) -> RunReport | None:
+        """
+        Finish the current run.
+
+        Returns
+        -------
+            RunReport | None: The report of the run, None if no run was started.
+
+        """
+        with self._lock:
+            report, self.report = self.report, None
+        if report is not None:
+            report.finished_at = _now()
+            report.summary = dict(Counter(outcome.status for outcome in report.devices))
+        return report
+
+
+run_ledger = RunLedger()
+
+
+def write_ledger(path: Path, report: RunReport):
+    """
+    Write a run report to a JSON file, replacing the previous one atomically.
+
+    Args:
+    ----
+        path (Path): The ledger file.
+        report (RunReport): The run report.
+
+    """
+    with atomic_open(path) as f:
+        f.write(report.model_dump_json(indent=2))
+
+
+def read_ledger(path: Path) -> RunReport:
+    """
+    Read a run report from a JSON file.
+
+    Args:
+    ----
+        path (Path): The ledger file.
+
+    Returns:
+    -------
+        RunReport: The run report.
+
+    """
+    with open(path) as f:
+        return RunReport.model_validate_json(f.read())
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Logging setup of the agent, in text or structured JSON lines."""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+LOG_FORMATS = ("text", "json")
+
+# Loggers of NAPALM and the libraries its drivers connect with
+DRIVER_LOGGERS = ("napalm", "ncclient", "paramiko", "pyeapi", "netmiko")
+
+# Fields added to the records logged while polling a device, such as its hostname
+_context: ContextVar[dict[str, str]] = ContextVar(
+    "diode_napalm_log_context", default={}
+)
+_driver_logs_suppressed: ContextVar[bool] = ContextVar(
+    "diode_napalm_driver_logs_suppressed", default=False
+)
+
+_log_format = "text"
+_handler: logging.Handler | None = None
+_listener: logging.handlers.QueueListener | None = None
+
+
+@contextmanager
+def log_context(**fields: str) -> Iterator[None]:
+    """
+    Add fields to the records logged by the current thread within the block.
+
+    Args:
+    ----
+        **fields: The fields, such as the policy and hostname of a device.
+
+    """
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+@contextmanager
+def suppress_driver_logs() -> Iterator[None]:
+    """Drop the records of the driver loggers logged by the current thread within the block."""
+    token = _driver_logs_suppressed.set(True)
+    try:
+        yield
+    finally:
+        _driver_logs_suppressed.reset(token)
+
+
+def _is_driver_logger(name: str) -> bool:
+    return name.split(".", 1)[0] in DRIVER_LOGGERS
+
+
+class ContextFilter(logging.Filter):
+    """
+    Handler filter applying the context of the thread that logged a record.
+
+    Handlers run in the thread that logged the record, so the filter sees its
+    context even when the record is then written by another thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """Attach the log context to the record, or drop suppressed driver records."""
+        if _driver_logs_suppressed.get() and _is_driver_logger(record.name):
+            return False
+        record.context = _context.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as JSON lines, with their log context fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Format a record as a JSON object on a single line."""
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+            **getattr(record, "context", {}),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that prepares records in place instead of copying them."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge the arguments in the logging thread, they may change after the call
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self.formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def log_format() -> str:
+    """Return the format logging was configured with."""
+    return _log_format
+
+
+def configure_logging(fmt: str = "text", level: int = logging.INFO):
+    """
+    Configure the root logger of the process.
+
+    The handler installed by a previous call is replaced. In text mode, records
+    are written to stderr by the logging thread as by ``logging.basicConfig``.
+    In JSON mode, the logging threads only queue the records and a background
+    thread formats and writes them, one JSON object per line with the log
+    context fields. The process of the records, which JSON lines don't hold, is
+    not looked up. Both modes drop the driver records logged within
+    ``suppress_driver_logs``.
+
+    Args:
+    ----
+        fmt (str): ``text`` or ``json``.
+        level (int): The root logger level.
+
+    Raises:
+    ------
+        ValueError: If the format is unknown.
+
+    """
+    global _log_format, _handler, _listener
+    if fmt not in LOG_FORMATS:
+        raise ValueError(f"unknown log format '{fmt}'")
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+    stream = logging.StreamHandler(sys.stderr)
+    # JSON lines don't hold the process
+    logging.logProcesses = logging.logMultiprocessing = fmt != "json"
+    if fmt == "json":
+        stream.setFormatter(JsonFormatter())
+        records = queue.SimpleQueue()
+        handler = _QueueHandler(records)
+        handler.setFormatter(logging.Formatter())
+        _listener = logging.handlers.QueueListener(records, stream)
+        _listener.start()
+    else:
+        stream.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+        handler = stream
+    handler.addFilter(ContextFilter())
+    root.addHandler(handler)
+    root.setLevel(level)
+    _handler = handler
+    _log_format = fmt
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Diode NAPALM Agent run options."""
+
+from pathlib import Path
+from typing import Literal
+
+from pydantic import BaseModel, Field
+
+
+class RunOptions(BaseModel):
+    """Model for the command line options that change how the agent runs."""
+
+    interval: int | None = Field(
+        default=None, description="Seconds between policy cycles, run once if unset"
+    )
+    snapshot_dir: Path | None = Field(
+        default=None,
+        description="Write collected data to snapshot files instead of ingesting it",
+    )
+    cache_dir: Path | None = Field(
+        default=None,
+        description="Persist the output of getters with a refresh interval, in memory if unset",
+    )
+    ledger: Path | None = Field(
+        default=None, description="JSON file the outcome of every device is written to"
+    )
+    rerun_failed: bool = Field(
+        default=False, description="Only run the devices that failed in the ledger"
+    )
+    lease_store: str | None = Field(
+        default=None,
+        description="URL of the lease store shared by the coordinator and its workers",
+    )
+    role: Literal["coordinator", "worker"] | None = Field(
+        default=None,
+        description="Open cycles for the workers, or poll the shards of the cycles",
+    )
+    worker_id: str | None = Field(
+        default=None, description="Worker id in the lease store, unique per process"
+    )
+    shards: int = Field(
+        default=64,
+        ge=1,
+        description="Number of shards the devices of a cycle are split into",
+    )
+    shard: tuple[int, int] | None = Field(
+        default=None,
+        description="Index and count of the shard of devices to poll, by hostname hash",
+    )
+    isolate_sessions: bool = Field(
+        default=False, description="Run device sessions in worker processes"
+    )
+    max_tasks_per_child: int | None = Field(
+        default=None,
+        ge=1,
+        description="Devices after which a session worker process is replaced",
+    )
+    max_child_rss: int | None = Field(
+        default=None,
+        ge=1,
+        description="Resident memory in bytes above which a session worker process is replaced",
+    )
+    session_pool: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of device sessions kept open across cycles",
+    )
+    session_idle_timeout: int | None = Field(
+        default=None,
+        ge=1,
+        description="Seconds after which an idle pooled session is closed",
+    )
+    memory_budget: int | None = Field(
+        default=None,
+        ge=1,
+        description="Bytes of collected data in flight, ingested through the staged pipeline if set",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Only ingest the objects of a device that changed since its previous poll",
+    )
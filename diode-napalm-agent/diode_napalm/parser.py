@@ -3,11 +3,27 @@
 """Parse Diode Agent Config file."""
 
 import os
+import re
+from collections.abc import Iterator
 from pathlib import Path
-from typing import Any
+from typing import Any, Literal
 
 import yaml
-from pydantic import BaseModel, Field, ValidationError
+from pydantic import (
+    BaseModel,
+    Field,
+    PrivateAttr,
+    ValidationError,
+    ValidationInfo,
+    field_validator,
+)
+from yaml import events
+
+from diode_napalm.getters import DEFAULT_GETTERS, GETTERS
+from diode_napalm.translators import compile_fields
+
+# Prefer the libyaml based loader, it is an order of magnitude faster on large files
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 class ParseException(Exception):
@@ -27,19 +43,258 @@ class Napalm(BaseModel):
     optional_args: dict[str, Any] | None = Field(
         default=None, description="Optional arguments"
     )
+    profile: str | None = Field(
+        default=None, description="Name of the policy connection profile used"
+    )
+
+
+class ConnectionProfile(BaseModel):
+    """Model for connection settings shared by the devices referencing it."""
+
+    driver: str | None = None
+    username: str | None = None
+    password: str | None = None
+    timeout: int | None = None
+    optional_args: dict[str, Any] | None = Field(
+        default=None,
+        description="Optional arguments, merged under the device optional arguments",
+    )
+    _defaults: dict[str, Any] = PrivateAttr(default_factory=dict)
+
+    def model_post_init(self, __context: Any):
+        """Collect the settings applied to the devices once."""
+        self._defaults = {
+            key: value
+            for key, value in (
+                ("driver", self.driver),
+                ("username", self.username),
+                ("password", self.password),
+                ("timeout", self.timeout),
+            )
+            if value is not None
+        }
+
+    def device(self, record: dict[str, Any]) -> Napalm:
+        """
+        Validate a device record referencing the profile.
+
+        Settings of the record take precedence over the profile ones. Devices without
+        their own optional arguments share the profile optional arguments object.
+
+        Args:
+        ----
+            record (dict[str, Any]): The device record.
+
+        Returns:
+        -------
+            Napalm: The device.
+
+        """
+        device = Napalm.model_validate({**self._defaults, **record})
+        if device.optional_args is None:
+            device.optional_args = self.optional_args
+        elif self.optional_args:
+            device.optional_args = {**self.optional_args, **device.optional_args}
+        return device
+
+
+def validate_device(record: Any, profiles: dict[str, ConnectionProfile]) -> Napalm:
+    """
+    Validate a device record, applying its connection profile if any.
+
+    Args:
+    ----
+        record (Any): The device record.
+        profiles (dict[str, ConnectionProfile]): The policy connection profiles.
+
+    Returns:
+    -------
+        Napalm: The device.
+
+    Raises:
+    ------
+        ValueError: If the record is invalid or references an unknown profile.
+
+    """
+    name = record.get("profile") if isinstance(record, dict) else None
+    if name is None:
+        return Napalm.model_validate(record)
+    profile = profiles.get(name)
+    if profile is None:
+        raise ValueError(
+            f"unknown connection profile '{name}', expected any of {list(profiles)}"
+        )
+    return profile.device(record)
+
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+_DURATION = re.compile(r"^\s*(\d+)\s*([smhd]?)\s*$")
+
+
+def parse_duration(value: int | str) -> int:
+    """
+    Parse a duration into seconds.
+
+    Args:
+    ----
+        value (int | str): Seconds, or a number followed by a unit: "30s", "15m", "1h", "1d".
+
+    Returns:
+    -------
+        int: The duration in seconds.
+
+    Raises:
+    ------
+        ValueError: If the duration is invalid.
+
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    match = _DURATION.match(str(value))
+    if match is None:
+        raise ValueError(
+            f"invalid duration '{value}', expected e.g. 30s, 15m, 1h or 1d"
+        )
+    number, unit = match.groups()
+    return int(number) * DURATION_UNITS[unit or "s"]
 
 
 class DiscoveryConfig(BaseModel):
     """Model for discovery configuration."""
 
     netbox: dict[str, str]
+    getters: list[str] = Field(
+        default_factory=lambda: list(DEFAULT_GETTERS),
+        description="NAPALM getters run on every device",
+    )
+    refresh: dict[str, int] = Field(
+        default_factory=dict,
+        description="Seconds the output of a getter stays fresh, getters not listed run every time",
+    )
+
+    @field_validator("getters")
+    @classmethod
+    def known_getters(cls, value: list[str]) -> list[str]:
+        """Ensure getters are supported and facts are always collected."""
+        unknown = [getter for getter in value if getter not in GETTERS]
+        if unknown:
+            raise ValueError(
+                f"unsupported getters {unknown}, expected any of {list(GETTERS)}"
+            )
+        if "get_facts" not in value:
+            raise ValueError("'get_facts' is required to identify the device")
+        return list(dict.fromkeys(value))
+
+    @field_validator("refresh", mode="before")
+    @classmethod
+    def refresh_durations(cls, value: Any) -> Any:
+        """Ensure refresh intervals are set for supported getters, in seconds."""
+        if not isinstance(value, dict):
+            return value
+        unknown = [getter for getter in value if getter not in GETTERS]
+        if unknown:
+            raise ValueError(
+                f"unsupported getters {unknown}, expected any of {list(GETTERS)}"
+            )
+        return {getter: parse_duration(duration) for getter, duration in value.items()}
+
+
+class InventorySource(BaseModel):
+    """Model for an external device inventory file or directory."""
+
+    path: Path
+    format: Literal["auto", "yaml", "jsonl", "csv", "netbox"] = Field(
+        default="auto", description="File format, guessed from the file extension"
+    )
+    defaults: dict[str, Any] = Field(
+        default_factory=dict,
+        description="Device attributes used when not set by the inventory",
+    )
 
 
 class Policy(BaseModel):
     """Model for a policy configuration."""
 
     config: DiscoveryConfig
-    data: list[Napalm]
+    # Profiles are validated before the devices that reference them
+    profiles: dict[str, ConnectionProfile] = Field(
+        default_factory=dict, description="Connection profiles referenced by devices"
+    )
+    data: list[Napalm] = Field(default_factory=list)
+    inventory: InventorySource | None = Field(
+        default=None,
+        description="Additional devices from an inventory file or directory",
+    )
+
+    @field_validator("data", mode="before")
+    @classmethod
+    def device_profiles(cls, value: Any, info: ValidationInfo) -> Any:
+        """Apply the connection profiles referenced by devices."""
+        if not isinstance(value, list):
+            return value
+        profiles = info.data.get("profiles") or {}
+        return [validate_device(record, profiles) for record in value]
+
+    @field_validator("inventory", mode="before")
+    @classmethod
+    def inventory_path(cls, value: Any) -> Any:
+        """Accept a plain path as inventory source."""
+        if isinstance(value, str | Path):
+            return {"path": value}
+        return value
+
+
+class ChannelConfig(BaseModel):
+    """Model for the gRPC channel settings used to reach Diode."""
+
+    compression: Literal["none", "gzip", "deflate"] = Field(
+        default="none", description="Compression of the ingest requests"
+    )
+    keepalive: int | None = Field(
+        default=None,
+        description="Seconds between keepalive pings on idle connections, disabled if unset",
+    )
+    keepalive_timeout: int = Field(
+        default=20, description="Seconds to wait for a keepalive ping acknowledgement"
+    )
+    max_message_size: int | None = Field(
+        default=None,
+        description="Largest request or response in bytes, gRPC default if unset",
+    )
+    pool_size: int = Field(
+        default=1,
+        ge=1,
+        description="Number of channels ingest requests are spread over",
+    )
+
+    @field_validator("keepalive", "keepalive_timeout", mode="before")
+    @classmethod
+    def durations(cls, value: Any) -> Any:
+        """Accept durations with a unit suffix."""
+        if value is None:
+            return value
+        return parse_duration(value)
+
+
+class TranslatorConfig(BaseModel):
+    """Model for the field mappings of the entities of a NAPALM driver."""
+
+    device: dict[str, str] = Field(
+        default_factory=dict,
+        description="Device field mappings overriding the defaults",
+    )
+    interface: dict[str, str] = Field(
+        default_factory=dict,
+        description="Interface field mappings overriding the defaults",
+    )
+
+    @field_validator("device", "interface")
+    @classmethod
+    def valid_mappings(cls, value: dict[str, str], info: ValidationInfo) -> Any:
+        """Ensure the mappings compile, so errors are reported before the run."""
+        compile_fields(info.field_name, value)
+        return value
 
 
 class DiodeConfig(BaseModel):
@@ -47,6 +302,11 @@ class DiodeConfig(BaseModel):
 
     target: str
     api_key: str
+    channel: ChannelConfig = Field(default_factory=ChannelConfig)
+    translators: dict[str, TranslatorConfig] = Field(
+        default_factory=dict,
+        description="Field mappings of the entities, per NAPALM driver",
+    )
 
 
 class Diode(BaseModel):
@@ -62,27 +322,298 @@ class Config(BaseModel):
     diode: Diode
 
 
-def resolve_env_vars(config):
+# Key slot of a mapping waiting for its next key, None being a valid YAML key
+_NO_KEY = object()
+
+
+class _SlowPath(Exception):
+    """Raised when a YAML document needs the full PyYAML composer and constructor."""
+
+    pass
+
+
+def _iter_values(loader, depth: int) -> Iterator[Any]:  # noqa: C901
+    # Hot loop over every parser event, helpers are inlined on purpose.
+    # With depth 0 the document root is yielded, with depth 1 the items of a
+    # top-level list are yielded one at a time and never attached to the list.
+    scalars = {}
+    stack = []
+    keys = []
+    root = None
+    get_event = loader.get_event
+
+    while True:
+        event = get_event()
+        event_type = type(event)
+        if event_type is events.ScalarEvent:
+            if event.tag is not None:
+                raise _SlowPath
+            value = event.value
+            if event.implicit[0]:
+                if value in scalars:
+                    value = scalars[value]
+                else:
+                    tag = loader.resolve(yaml.ScalarNode, value, (True, False))
+                    constructor = loader.yaml_constructors.get(tag)
+                    if constructor is None:
+                        raise _SlowPath
+                    value = scalars[value] = constructor(
+                        loader, yaml.ScalarNode(tag, value)
+                    )
+        elif event_type is events.MappingStartEvent:
+            if event.tag is not None:
+                raise _SlowPath
+            stack.append({})
+            keys.append(_NO_KEY)
+            continue
+        elif event_type is events.SequenceStartEvent:
+            if event.tag is not None:
+                raise _SlowPath
+            stack.append([])
+            keys.append(_NO_KEY)
+            continue
+        elif (
+            event_type is events.MappingEndEvent
+            or event_type is events.SequenceEndEvent
+        ):
+            value = stack.pop()
+            keys.pop()
+        elif event_type is events.StreamEndEvent:
+            return
+        elif event_type is events.AliasEvent:
+            raise _SlowPath
+        elif event_type is events.DocumentStartEvent and root is not None:
+            # Let the regular loader report multiple documents
+            raise _SlowPath
+        else:
+            continue
+
+        if not stack:
+            root = value
+            if depth == 0:
+                yield value
+            elif type(value) is not list:
+                raise ParseException(
+                    f"expected a YAML list, got {type(value).__name__}"
+                )
+            continue
+        parent = stack[-1]
+        if type(parent) is list:
+            if len(stack) == depth:
+                yield value
+            else:
+                parent.append(value)
+        elif keys[-1] is _NO_KEY:
+            if isinstance(value, (dict, list)):
+                raise _SlowPath
+            keys[-1] = value
+        else:
+            parent[keys[-1]] = value
+            keys[-1] = _NO_KEY
+
+
+def load_yaml(config_data: str) -> Any:
+    """
+    Load a single YAML document.
+
+    Documents without tags, anchors or aliases (the usual shape of an agent
+    configuration) are built straight from the parser event stream, which skips
+    the intermediate node graph and is more than twice as fast on large
+    inventories. Anything else is handed to the regular safe loader.
+
+    Args:
+    ----
+        config_data (str): The YAML document.
+
+    Returns:
+    -------
+        Any: The loaded document.
+
+    """
+    loader = SafeLoader(config_data)
+    document = None
+    try:
+        for document in _iter_values(loader, 0):
+            pass
+        return document
+    except _SlowPath:
+        pass
+    finally:
+        loader.dispose()
+    return yaml.load(config_data, Loader=SafeLoader)
+
+
+def iter_yaml_sequence(file_path: Path) -> Iterator[Any]:
     """
-    Recursively resolve environment variables in the configuration.
+    Iterate over the items of a YAML file holding a top-level list.
+
+    Items are built and yielded one at a time while the file is read, so memory
+    use does not grow with the size of the list. Files using tags, anchors or
+    aliases fall back to loading the whole document.
+
+    Args:
+    ----
+        file_path (Path): The path to the YAML file.
+
+    Returns:
+    -------
+        Iterator[Any]: The list items.
+
+    Raises:
+    ------
+        ParseException: If the document is not a list.
+
+    """
+    count = 0
+    with open(file_path) as f:
+        loader = SafeLoader(f)
+        try:
+            for item in _iter_values(loader, 1):
+                count += 1
+                yield item
+            return
+        except _SlowPath:
+            pass
+        finally:
+            loader.dispose()
+
+    with open(file_path) as f:
+        document = yaml.load(f, Loader=SafeLoader)
+    if document is None:
+        return
+    if not isinstance(document, list):
+        raise ParseException(f"expected a YAML list, got {type(document).__name__}")
+    yield from document[count:]
+
+
+SECRETS_DIR_ENV = "DIODE_NAPALM_SECRETS_DIR"
+
+# ${VAR}, ${VAR:-default} and ${secret:NAME}, anywhere in a string
+_VARIABLE = re.compile(r"\$\{(?:(secret):)?([^}:]+)(?::-([^}]*))?\}")
+
+
+class EnvResolver:
+    """
+    Resolve environment variable and secret references in configuration values.
+
+    Lookups and resolved strings are cached, so a resolver shared by all the
+    devices of a run reads each variable and secret file once.
+
+    Attributes
+    ----------
+        secrets_dir (Path | None): Directory of the secret files, one file per
+            secret named after it, from the DIODE_NAPALM_SECRETS_DIR environment
+            variable by default.
+
+    """
+
+    def __init__(self, secrets_dir: Path | None = None):
+        """Initialize the resolver with empty caches."""
+        if secrets_dir is None and os.getenv(SECRETS_DIR_ENV):
+            secrets_dir = Path(os.environ[SECRETS_DIR_ENV])
+        self.secrets_dir = secrets_dir
+        self._values: dict[tuple[str | None, str], str | None] = {}
+        self._strings: dict[str, str] = {}
+
+    def _read_secret(self, name: str) -> str | None:
+        if self.secrets_dir is None or "/" in name or name.startswith("."):
+            return None
+        try:
+            return (self.secrets_dir / name).read_text().rstrip("\r\n")
+        except OSError:
+            return None
+
+    def lookup(self, name: str, kind: str | None = None) -> str | None:
+        """
+        Return the value of an environment variable or secret.
+
+        Args:
+        ----
+            name (str): The variable or secret name.
+            kind (str | None): "secret" for a secret file, None for an environment variable.
+
+        Returns:
+        -------
+            str | None: The value, None if it is not set.
+
+        """
+        key = (kind, name)
+        if key not in self._values:
+            self._values[key] = (
+                self._read_secret(name) if kind else os.environ.get(name)
+            )
+        return self._values[key]
+
+    def _substitute(self, match: re.Match) -> str:
+        kind, name, default = match.groups()
+        value = self.lookup(name, kind)
+        if value is not None:
+            return value
+        # Unset references without a default are left untouched
+        return default if default is not None else match.group(0)
+
+    def resolve_string(self, value: str) -> str:
+        """Resolve the references of a string."""
+        if "${" not in value:
+            return value
+        resolved = self._strings.get(value)
+        if resolved is None:
+            resolved = self._strings[value] = _VARIABLE.sub(self._substitute, value)
+        return resolved
+
+    def resolve(self, config: Any) -> Any:
+        """
+        Resolve the references of a configuration, rewriting its values in place.
+
+        Args:
+        ----
+            config (Any): A configuration value, dictionary or list.
+
+        Returns:
+        -------
+            Any: The configuration, the same object unless it is a string.
+
+        """
+        if isinstance(config, str):
+            return self.resolve_string(config)
+        if not isinstance(config, (dict, list)):
+            return config
+        resolve_string = self.resolve_string
+        stack = [config]
+        while stack:
+            node = stack.pop()
+            items = node.items() if isinstance(node, dict) else enumerate(node)
+            for key, value in items:
+                if isinstance(value, str):
+                    if "${" in value:
+                        node[key] = resolve_string(value)
+                elif isinstance(value, (dict, list)):
+                    stack.append(value)
+        return config
+
+
+def resolve_env_vars(config, resolver: EnvResolver | None = None):
+    """
+    Resolve environment variables in the configuration, in place.
+
+    Strings may reference variables anywhere, as ``${VAR}`` or ``${VAR:-default}``,
+    and secret files as ``${secret:NAME}``. References to unset variables without
+    a default are left as is.
 
     Args:
     ----
         config (dict): The configuration dictionary.
+        resolver (EnvResolver | None): The resolver, share one to cache lookups
+            across calls.
 
     Returns:
     -------
         dict: The configuration dictionary with environment variables resolved.
 
     """
-    if isinstance(config, dict):
-        return {k: resolve_env_vars(v) for k, v in config.items()}
-    if isinstance(config, list):
-        return [resolve_env_vars(i) for i in config]
-    if isinstance(config, str) and config.startswith("${") and config.endswith("}"):
-        env_var = config[2:-1]
-        return os.getenv(env_var, config)
-    return config
+    if resolver is None:
+        resolver = EnvResolver()
+    return resolver.resolve(config)
 
 
 def parse_config(config_data: str):
@@ -104,7 +635,7 @@ def parse_config(config_data: str):
     """
     try:
         # Parse the YAML configuration data
-        config_dict = yaml.safe_load(config_data)
+        config_dict = load_yaml(config_data)
         # Resolve environment variables
         resolved_config = resolve_env_vars(config_dict)
         # Parse the data into the Config model
@@ -144,4 +675,10 @@ def parse_config_file(file_path: Path) -> Diode:
         raise
     except Exception as e:
         raise Exception(f"Unable to open config file {file_path}: {e.args[1]}")
+
+    # Inventory files are relative to the configuration file
+    config_dir = Path(file_path).parent
+    for policy in cfg.diode.policies.values():
+        if policy.inventory is not None and not policy.inventory.path.is_absolute():
+            policy.inventory.path = config_dir / policy.inventory.path
     return cfg.diode
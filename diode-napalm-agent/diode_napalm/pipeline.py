@@ -0,0 +1,262 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Bounded pipeline from the collected device data to the ingest requests sent."""
+
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable
+
+from diode_napalm.collected import CollectedData
+from diode_napalm.ledger import DeviceOutcome, run_ledger
+from diode_napalm.logs import log_context
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Ends the loop of a stage thread
+_STOP = object()
+
+
+class MemoryBudget:
+    """Bytes of device data in flight, collection waits while the budget is spent."""
+
+    def __init__(self, limit: int):
+        """
+        Initialize an unused budget.
+
+        Args:
+        ----
+            limit (int): The budget in bytes.
+
+        """
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self._condition = threading.Condition()
+
+    def wait(self):
+        """Block until some of the budget is left."""
+        with self._condition:
+            while self.used >= self.limit:
+                self._condition.wait()
+
+    def reserve(self, size: int):
+        """
+        Account for data that is already in memory.
+
+        The data exists by the time its size is known, so the reservation never
+        blocks and may overshoot the budget, new collections wait until it drains.
+
+        Args:
+        ----
+            size (int): Size of the data in bytes.
+
+        """
+        with self._condition:
+            self.used += size
+            self.peak = max(self.peak, self.used)
+
+    def release(self, size: int):
+        """
+        Give back the budget of data that was dropped.
+
+        Args:
+        ----
+            size (int): Size of the data in bytes.
+
+        """
+        with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+class IngestPipeline:
+    """
+    Staged pipeline ingesting the data collected by the agent threads.
+
+    The agent threads collect and compact the device data, then hand it over
+    through a bounded queue to the translate stage, which translates and
+    serializes it into an ingest request. Requests go through a second bounded
+    queue to the send stage. Every device is charged to the memory budget from
+    its collection until its request is sent: collections don't start while the
+    budget is spent and full queues block the agent threads, so the data in
+    flight is bounded whatever the number of workers. Disabled until configured.
+    """
+
+    def __init__(self):
+        """Initialize a disabled pipeline."""
+        self.budget: MemoryBudget | None = None
+        self._client = None
+        self._stages: list[tuple[queue.Queue, list[threading.Thread]]] = []
+        self._translate_queue: queue.Queue | None = None
+        self._send_queue: queue.Queue | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether collected data is ingested through the pipeline."""
+        return self.budget is not None
+
+    def configure(
+        self, client, budget: int | None, translators: int = 2, senders: int = 2
+    ):
+        """
+        Start the stage threads, or disable the pipeline with no budget.
+
+        Args:
+        ----
+            client (Client): The initialized client serializing and sending requests.
+            budget (int | None): Bytes of device data in flight.
+            translators (int): Number of translate stage threads.
+            senders (int): Number of send stage threads.
+
+        """
+        self.close()
+        if budget is None:
+            return
+        self._client = client
+        self.budget = MemoryBudget(budget)
+        self._translate_queue = queue.Queue(maxsize=translators * 2)
+        self._send_queue = queue.Queue(maxsize=senders * 2)
+        self._stages = [
+            self._start_stage(
+                "translate",
+                translators,
+                self._translate_queue,
+                self._translate,
+                self._send_queue,
+            ),
+            self._start_stage("send", senders, self._send_queue, self._send),
+        ]
+
+    def _start_stage(
+        self,
+        name: str,
+        count: int,
+        items: queue.Queue,
+        process: Callable,
+        next_items: queue.Queue | None = None,
+    ) -> tuple[queue.Queue, list[threading.Thread]]:
+        threads = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(items, process, next_items),
+                name=f"diode-napalm-{name}-{i}",
+                daemon=True,
+            )
+            for i in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        return items, threads
+
+    def admit(self):
+        """Block the calling agent thread until a device may be collected."""
+        if self.budget is not None:
+            self.budget.wait()
+
+    def submit(self, hostname: str, data: CollectedData, outcome: DeviceOutcome):
+        """
+        Queue collected data for ingestion, blocking while the translate stage is busy.
+
+        The outcome is filled with the stage timings and entity count, then
+        recorded in the run ledger, once the data is ingested.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            data (CollectedData): The compact data of the device.
+            outcome (DeviceOutcome): Outcome of the device.
+
+        """
+        size = data.approximate_size()
+        self.budget.reserve(size)
+        self._translate_queue.put((hostname, data, size, outcome))
+
+    def _run_stage(
+        self, items: queue.Queue, process: Callable, next_items: queue.Queue | None
+    ):
+        while True:
+            item = items.get()
+            try:
+                if item is _STOP:
+                    return
+                # Items start with the hostname and end with the device outcome
+                with log_context(policy=item[-1].policy, hostname=item[0]):
+                    result = process(*item)
+                # Drop the item before waiting for room in the next stage
+                item = None
+                if result is not None:
+                    next_items.put(result)
+                    result = None
+            finally:
+                items.task_done()
+
+    def _translate(
+        self, hostname: str, data: CollectedData, size: int, outcome: DeviceOutcome
+    ) -> tuple[str, bytes, DeviceOutcome] | None:
+        started = time.perf_counter()
+        try:
+            request, outcome.entities = self._client.serialize(hostname, data)
+        except Exception as e:
+            self._finish(hostname, size, outcome, e)
+            return None
+        outcome.timings["translate"] = time.perf_counter() - started
+        # The request replaces the collected data in the budget
+        self.budget.reserve(len(request))
+        self.budget.release(size)
+        return hostname, request, outcome
+
+    def _send(self, hostname: str, request: bytes, outcome: DeviceOutcome):
+        started = time.perf_counter()
+        try:
+            self._client.send(hostname, request)
+        except Exception as e:
+            self._finish(hostname, len(request), outcome, e)
+            return
+        outcome.timings["ingest"] = time.perf_counter() - started
+        self._finish(hostname, len(request), outcome)
+
+    def _finish(
+        self,
+        hostname: str,
+        size: int,
+        outcome: DeviceOutcome,
+        error: Exception | None = None,
+    ):
+        self.budget.release(size)
+        if error is not None:
+            logger.error("Error while ingesting %s: %s", hostname, error)
+            outcome.fail(error)
+        run_ledger.record(outcome)
+
+    def join(self):
+        """Wait until the data submitted so far is ingested."""
+        if not self.enabled:
+            return
+        self._translate_queue.join()
+        self._send_queue.join()
+        logger.info(
+            "Ingest pipeline: peak of %.1f MB in flight, budget %.1f MB",
+            self.budget.peak / 2**20,
+            self.budget.limit / 2**20,
+        )
+
+    def close(self):
+        """Ingest the submitted data, stop the stage threads and disable the pipeline."""
+        if not self.enabled:
+            return
+        self.join()
+        for items, threads in self._stages:
+            for _ in threads:
+                items.put(_STOP)
+        for _, threads in self._stages:
+            for thread in threads:
+                thread.join()
+        self._stages = []
+        self._client = None
+        self.budget = None
+
+
+ingest_pipeline = IngestPipeline()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Build the execution plan of a Diode NAPALM Agent configuration."""
+
+import math
+from collections import Counter
+
+from pydantic import BaseModel, Field
+
+from diode_napalm.inventory import policy_devices
+from diode_napalm.parser import Diode
+
+DISCOVER = "discover"
+
+
+class PolicyPlan(BaseModel):
+    """Model for the execution plan of a single policy."""
+
+    name: str
+    devices: int
+    drivers: dict[str, int] = Field(default_factory=dict)
+    workers: int
+    waves: int
+    discovery_attempts: int = Field(
+        default=0,
+        description="Upper bound of connections needed to discover missing drivers",
+    )
+
+
+class Plan(BaseModel):
+    """Model for the execution plan of the whole configuration."""
+
+    policies: list[PolicyPlan] = Field(default_factory=list)
+    duplicates: dict[str, list[str]] = Field(default_factory=dict)
+    unknown_drivers: dict[str, str] = Field(default_factory=dict)
+
+    @property
+    def devices(self) -> int:
+        """Total number of devices across all policies."""
+        return sum(policy.devices for policy in self.policies)
+
+    @property
+    def errors(self) -> list[str]:
+        """Problems that would make the agent fail for some devices."""
+        errors = [
+            f"hostname '{hostname}' is defined more than once in: {', '.join(policies)}"
+            for hostname, policies in self.duplicates.items()
+        ]
+        errors.extend(
+            f"device '{device}' uses driver '{driver}' which is not installed"
+            for device, driver in self.unknown_drivers.items()
+        )
+        return errors
+
+
+def build_plan(cfg: Diode, workers: int, supported_drivers: list[str]) -> Plan:
+    """
+    Build the execution plan for the given configuration without touching devices.
+
+    Args:
+    ----
+        cfg (Diode): The parsed Diode configuration.
+        workers (int): Number of workers used by each policy thread pool.
+        supported_drivers (list[str]): The installed NAPALM drivers.
+
+    Returns:
+    -------
+        Plan: The execution plan, including duplicated hostnames and unknown drivers.
+
+    """
+    plan = Plan()
+    supported = set(supported_drivers)
+    seen: dict[str, list[str]] = {}
+
+    for name, policy in cfg.policies.items():
+        drivers = Counter()
+        devices = 0
+        for info in policy_devices(policy):
+            devices += 1
+            seen.setdefault(info.hostname, []).append(name)
+            if info.driver is None:
+                drivers[DISCOVER] += 1
+                continue
+            drivers[info.driver] += 1
+            if info.driver not in supported:
+                plan.unknown_drivers[f"{name}/{info.hostname}"] = info.driver
+
+        policy_workers = max(1, min(workers, devices))
+        plan.policies.append(
+            PolicyPlan(
+                name=name,
+                devices=devices,
+                drivers=dict(drivers.most_common()),
+                workers=policy_workers,
+                waves=math.ceil(devices / policy_workers),
+                discovery_attempts=drivers[DISCOVER] * len(supported_drivers),
+            )
+        )
+
+    plan.duplicates = {
+        hostname: policies for hostname, policies in seen.items() if len(policies) > 1
+    }
+    return plan
+
+
+def format_plan(plan: Plan) -> str:
+    """
+    Format the execution plan as human-readable text.
+
+    Args:
+    ----
+        plan (Plan): The execution plan.
+
+    Returns:
+    -------
+        str: The formatted plan.
+
+    """
+    lines = [f"Policies: {len(plan.policies)}, devices: {plan.devices}"]
+    for policy in plan.policies:
+        drivers = ", ".join(f"{k}: {v}" for k, v in policy.drivers.items()) or "none"
+        lines.append(
+            f"Policy {policy.name}: {policy.devices} devices ({drivers}), "
+            f"{policy.workers} workers, {policy.waves} waves"
+        )
+        if policy.discovery_attempts:
+            lines.append(
+                f"  up to {policy.discovery_attempts} connections to discover drivers"
+            )
+    errors = plan.errors
+    if errors:
+        lines.append(f"Errors: {len(errors)}")
+        lines.extend(f"  {error}" for error in errors)
+    return "\n".join(lines)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Sampling profiler and span tracing of agent runs."""
+
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler sampling the stacks of every thread at a fixed interval.
+
+    Unlike cProfile, it covers all the worker threads and its overhead does not
+    depend on the number of function calls, so it can be used on production runs.
+    The samples are written as collapsed stacks, the input format of flame graph
+    tools such as ``flamegraph.pl`` or speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        """Initialize the profiler with the seconds between two samples."""
+        self.interval = interval
+        self.samples: Counter[tuple] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="diode-napalm-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame.f_code)
+                    frame = frame.f_back
+                # Code objects are cheap to hash, they are formatted when written
+                self.samples[tuple(reversed(stack))] += 1
+
+    @staticmethod
+    def _frame_name(code) -> str:
+        name = getattr(code, "co_qualname", code.co_name)
+        return f"{name} ({os.path.basename(code.co_filename)})"
+
+    def collapsed(self) -> list[str]:
+        """Return the samples as collapsed stack lines, most frequent first."""
+        stacks: Counter[str] = Counter()
+        for stack, count in self.samples.items():
+            stacks[";".join(self._frame_name(code) for code in stack)] += count
+        return [f"{stack} {count}" for stack, count in stacks.most_common()]
+
+    def write(self, path: Path):
+        """Write the samples to a collapsed stacks file."""
+        with open(path, "w") as f:
+            for line in self.collapsed():
+                f.write(f"{line}\n")
+
+
+@contextmanager
+def profile_run(path: Path | None, interval: float = 0.005) -> Iterator[None]:
+    """
+    Profile the enclosed code with a sampling profiler, if a path is given.
+
+    Args:
+    ----
+        path (Path | None): The collapsed stacks file, profiling is disabled if None.
+        interval (float): Seconds between two samples.
+
+    """
+    if path is None:
+        yield
+        return
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        yield
+    finally:
+        profiler.stop()
+        profiler.write(path)
+        logger.info(
+            "Profile written to %s: %d samples", path, sum(profiler.samples.values())
+        )
+
+
+_current_span: contextvars.ContextVar["Span | None"] = contextvars.ContextVar(
+    "diode_napalm_span", default=None
+)
+
+
+class Span:
+    """A timed operation, with the attributes describing it."""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_span_id", "attributes")
+
+    def __init__(self, name: str, parent: "Span | None", attributes: dict):
+        """Initialize the span, in the trace of its parent if any."""
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = attributes
+
+    def set_attribute(self, key: str, value):
+        """Set an attribute of the span."""
+        self.attributes[key] = value
+
+
+class Tracer:
+    """
+    Writer of spans to a JSON lines file, disabled until configured.
+
+    Spans follow the OpenTelemetry data model (trace and span ids, parent span,
+    start and end times in nanoseconds, attributes and status), one per line.
+    """
+
+    def __init__(self):
+        """Initialize a disabled tracer."""
+        self._lock = threading.Lock()
+        self._file = None
+        # Spans held for another process to write, in session worker processes
+        self._buffer: list[str] | None = None
+
+    @property
+    def enabled(self) -> bool:
+        """Whether spans are recorded."""
+        return self._file is not None or self._buffer is not None
+
+    def capture(self, enabled: bool):
+        """Hold the spans in memory until drained, or stop recording them."""
+        with self._lock:
+            if not enabled:
+                self._buffer = None
+            elif self._buffer is None:
+                self._buffer = []
+
+    def drain(self) -> list[str]:
+        """Return the spans held in memory and clear them."""
+        with self._lock:
+            if self._buffer is None:
+                return []
+            lines, self._buffer = self._buffer, []
+        return lines
+
+    def write_lines(self, lines: list[str]):
+        """Write spans recorded elsewhere, such as in a session worker process."""
+        with self._lock:
+            if self._file is not None:
+                self._file.writelines(f"{line}\n" for line in lines)
+
+    def context(self) -> tuple[str, str] | None:
+        """Return the trace and span ids of the current span, if any."""
+        span = _current_span.get()
+        return None if span is None else (span.trace_id, span.span_id)
+
+    @contextmanager
+    def continue_trace(self, context: tuple[str, str] | None) -> Iterator[None]:
+        """
+        Record the spans of the enclosed code as children of a span of another process.
+
+        Args:
+        ----
+            context (tuple[str, str] | None): The trace and span ids of the
+                parent span, as returned by ``context``.
+
+        """
+        if context is None:
+            yield
+            return
+        parent = Span("remote", None, {})
+        parent.trace_id, parent.span_id = context
+        token = _current_span.set(parent)
+        try:
+            yield
+        finally:
+            _current_span.reset(token)
+
+    def configure(self, path: Path | None):
+        """Write spans to the given file, or disable tracing if None."""
+        self.close()
+        if path is not None:
+            self._file = open(path, "a", buffering=1)
+
+    def close(self):
+        """Stop recording spans and close the file."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span | None]:
+        """
+        Record the enclosed code as a span, child of the current span if any.
+
+        Args:
+        ----
+            name (str): The span name.
+            **attributes: The span attributes.
+
+        Returns:
+        -------
+            Iterator[Span | None]: The span, None when tracing is disabled.
+
+        """
+        if not self.enabled:
+            yield None
+            return
+        span = Span(name, _current_span.get(), attributes)
+        token = _current_span.set(span)
+        status = "OK"
+        start = time.time_ns()
+        try:
+            yield span
+        except BaseException as e:
+            status = "ERROR"
+            span.attributes["exception.type"] = type(e).__name__
+            span.attributes["exception.message"] = str(e)
+            raise
+        finally:
+            end = time.time_ns()
+            _current_span.reset(token)
+            self._write(span, start, end, status)
+
+    def _write(self, span: Span, start: int, end: int, status: str):
+        record = {
+            "name": span.name,
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_span_id": span.parent_span_id,
+            "start_time_unix_nano": start,
+            "end_time_unix_nano": end,
+            "attributes": span.attributes,
+            "status": status,
+            "thread": threading.current_thread().name,
+        }
+        line = json.dumps(record, default=str)
+        with self._lock:
+            if self._buffer is not None:
+                self._buffer.append(line)
+            elif self._file is not None:
+                self._file.write(f"{line}\n")
+
+
+tracer = Tracer()
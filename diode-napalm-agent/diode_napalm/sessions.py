@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Keep device sessions open across the cycles of a long-running agent."""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from diode_napalm.parser import Napalm
+
+# Set up logging
+logger = logging.getLogger(__name__)
+
+# Seconds an idle session is kept when no interval tells how often devices are polled
+DEFAULT_IDLE_TIMEOUT = 900
+
+
+def session_key(info: Napalm) -> tuple:
+    """
+    Return the key of the sessions that can be reused for a device.
+
+    Sessions are only reused while the connection settings of the device stay
+    the same, so inventory changes open a new session.
+
+    Args:
+    ----
+        info (Napalm): Information data for the device, with its driver set.
+
+    Returns:
+    -------
+        tuple: The session key.
+
+    """
+    return (
+        info.hostname,
+        info.driver,
+        info.username,
+        info.password,
+        info.timeout,
+        json.dumps(info.optional_args, sort_keys=True, default=str),
+    )
+
+
+def is_alive(device) -> bool:
+    """
+    Check whether an open NAPALM session is still usable.
+
+    Args:
+    ----
+        device: The NAPALM device session.
+
+    Returns:
+    -------
+        bool: False if the driver reports the connection as closed, True if it
+        does not implement the check.
+
+    """
+    try:
+        return bool(device.is_alive().get("is_alive", False))
+    except NotImplementedError:
+        return True
+    except Exception:
+        return False
+
+
+def _close_device(hostname: str, device):
+    try:
+        device.close()
+    except Exception as e:
+        logger.debug("Hostname %s: error while closing the session: %s", hostname, e)
+
+
+class _Session:
+    """An open device session and whether it goes back to the pool after use."""
+
+    __slots__ = ("key", "device", "pooled", "last_used")
+
+    def __init__(self, key: tuple, device, pooled: bool):
+        self.key = key
+        self.device = device
+        self.pooled = pooled
+        self.last_used = time.monotonic()
+
+
+class SessionPool:
+    """
+    Device sessions kept open between the polls of a device.
+
+    A session goes back to the pool after each poll and is reused by the next
+    poll of the same device, provided it was not idle for longer than the idle
+    timeout and it passes the driver health check. A reused session that fails
+    is replaced by a new one and the poll is retried once, so dropped
+    connections are reconnected transparently. At most ``max_sessions`` sessions
+    are open: the least recently used idle session is closed to make room, and
+    when every session is in use, the new one is closed after the poll.
+    Disabled until configured.
+    """
+
+    def __init__(self):
+        """Initialize a disabled pool."""
+        self._lock = threading.Lock()
+        # Idle sessions, least recently used first
+        self._idle: OrderedDict[tuple, _Session] = OrderedDict()
+        self._open = 0
+        self.max_sessions = 0
+        self.idle_timeout = float(DEFAULT_IDLE_TIMEOUT)
+        self.opened = 0
+        self.reused = 0
+        self.reconnected = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether sessions are kept open after a poll."""
+        return self.max_sessions > 0
+
+    def configure(self, max_sessions: int, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        """
+        Enable the pool, or disable it with a size of 0.
+
+        Args:
+        ----
+            max_sessions (int): Maximum number of open sessions.
+            idle_timeout (float): Seconds after which an idle session is closed.
+
+        """
+        self.close()
+        with self._lock:
+            self.max_sessions = max_sessions
+            self.idle_timeout = idle_timeout
+
+    def run(self, info: Napalm, np_driver: type, func: Callable) -> Any:
+        """
+        Call a function with a session to a device, reusing an idle one if possible.
+
+        Args:
+        ----
+            info (Napalm): Information data for the device, with its driver set.
+            np_driver (type): The NAPALM network driver class.
+            func (Callable): Called with the open device session.
+
+        Returns:
+        -------
+            Any: The function result.
+
+        """
+        key = session_key(info)
+        session = self._checkout(key)
+        if session is None:
+            return self._run_new(info, key, np_driver, func)
+        try:
+            result = func(session.device)
+        except Exception as e:
+            self._discard(session)
+            logger.info(
+                "Hostname %s: reused session failed (%s), reconnecting",
+                info.hostname,
+                e,
+            )
+            with self._lock:
+                self.reconnected += 1
+            return self._run_new(info, key, np_driver, func)
+        self._release(session)
+        return result
+
+    def _checkout(self, key: tuple) -> _Session | None:
+        with self._lock:
+            session = self._idle.pop(key, None)
+        if session is None:
+            return None
+        if time.monotonic() - session.last_used > self.idle_timeout:
+            self._discard(session)
+            return None
+        if not is_alive(session.device):
+            self._discard(session)
+            with self._lock:
+                self.reconnected += 1
+            return None
+        with self._lock:
+            self.reused += 1
+        return session
+
+    def _run_new(self, info: Napalm, key: tuple, np_driver: type, func: Callable):
+        session = self._open_session(info, key, np_driver)
+        try:
+            result = func(session.device)
+        except Exception:
+            self._discard(session)
+            raise
+        self._release(session)
+        return result
+
+    def _open_session(self, info: Napalm, key: tuple, np_driver: type) -> _Session:
+        evicted = None
+        with self._lock:
+            pooled = self.enabled
+            if pooled and self._open >= self.max_sessions:
+                if self._idle:
+                    _, evicted = self._idle.popitem(last=False)
+                    self._open -= 1
+                else:
+                    pooled = False
+            if pooled:
+                self._open += 1
+            self.opened += 1
+        if evicted is not None:
+            _close_device(evicted.key[0], evicted.device)
+        device = np_driver(
+            info.hostname,
+            info.username,
+            info.password,
+            info.timeout,
+            info.optional_args,
+        )
+        try:
+            device.open()
+        except Exception:
+            if pooled:
+                with self._lock:
+                    self._open -= 1
+            raise
+        return _Session(key, device, pooled)
+
+    def _release(self, session: _Session):
+        replaced = None
+        with self._lock:
+            if session.pooled and self.enabled:
+                session.last_used = time.monotonic()
+                # Concurrent polls of a device keep the last session only
+                replaced = self._idle.pop(session.key, None)
+                self._idle[session.key] = session
+                if replaced is not None:
+                    self._open -= 1
+            else:
+                replaced = session
+                if session.pooled:
+                    # The pool was closed during the poll
+                    self._open -= 1
+        if replaced is not None:
+            _close_device(replaced.key[0], replaced.device)
+
+    def _discard(self, session: _Session):
+        if session.pooled:
+            with self._lock:
+                self._open -= 1
+        _close_device(session.key[0], session.device)
+
+    def reap(self):
+        """Close the sessions idle for longer than the idle timeout."""
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            expired = [
+                session
+                for session in self._idle.values()
+                if session.last_used < deadline
+            ]
+            for session in expired:
+                del self._idle[session.key]
+            self._open -= len(expired)
+            opened, reused, reconnected = self.opened, self.reused, self.reconnected
+            idle = len(self._idle)
+        for session in expired:
+            _close_device(session.key[0], session.device)
+        if self.enabled:
+            logger.info(
+                "Session pool: %d idle sessions, %d expired, %d opened, %d reused, "
+                "%d reconnected",
+                idle,
+                len(expired),
+                opened,
+                reused,
+                reconnected,
+            )
+
+    def close(self):
+        """Close the idle sessions and disable the pool."""
+        with self._lock:
+            idle, self._idle = list(self._idle.values()), OrderedDict()
+            self._open -= len(idle)
+            self.max_sessions = 0
+        for session in idle:
+            _close_device(session.key[0], session.device)
+
+
+session_pool = SessionPool()
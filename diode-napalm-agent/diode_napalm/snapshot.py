@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Store and load raw NAPALM collection snapshots."""
+
+import gzip
+import json
+from collections.abc import Iterator
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from diode_napalm.storage import atomic_open, safe_filename
+
+SNAPSHOT_SUFFIX = ".json.gz"
+
+
+class Snapshot(BaseModel):
+    """Model for the raw data collected from a device in one run."""
+
+    hostname: str
+    collected_at: datetime
+    data: dict[str, Any]
+
+
+def snapshot_path(directory: Path, hostname: str, collected_at: datetime) -> Path:
+    """
+    Return the path of the snapshot of a device for a run.
+
+    Args:
+    ----
+        directory (Path): The snapshot directory.
+        hostname (str): The device hostname.
+        collected_at (datetime): The collection time.
+
+    Returns:
+    -------
+        Path: The snapshot file path.
+
+    """
+    name = safe_filename(hostname)
+    timestamp = collected_at.strftime("%Y%m%dT%H%M%S%fZ")
+    return Path(directory) / f"{name}-{timestamp}{SNAPSHOT_SUFFIX}"
+
+
+def write_snapshot(
+    directory: Path, hostname: str, data: dict, collected_at: datetime | None = None
+) -> Path:
+    """
+    Write the raw NAPALM getter output of a device to a compressed snapshot file.
+
+    The file is written under a temporary name and renamed once complete, so a
+    concurrent replay never reads a partial snapshot.
+
+    Args:
+    ----
+        directory (Path): The snapshot directory, created if missing.
+        hostname (str): The device hostname.
+        data (dict): The collected data, as passed to ``translate_data``.
+        collected_at (datetime | None): The collection time, now by default.
+
+    Returns:
+    -------
+        Path: The snapshot file path.
+
+    """
+    if collected_at is None:
+        collected_at = datetime.now(timezone.utc)
+    path = snapshot_path(directory, hostname, collected_at)
+    document = {
+        "hostname": hostname,
+        "collected_at": collected_at.isoformat(),
+        "data": data,
+    }
+    with atomic_open(path, "wt", compresslevel=6) as f:
+        json.dump(document, f, separators=(",", ":"), default=str)
+    return path
+
+
+def read_snapshot(path: Path) -> Snapshot:
+    """
+    Read a snapshot file.
+
+    Args:
+    ----
+        path (Path): A compressed (``.json.gz``) or plain (``.json``) snapshot file.
+
+    Returns:
+    -------
+        Snapshot: The snapshot.
+
+    """
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt") as f:
+        return Snapshot.model_validate(json.load(f))
+
+
+def snapshot_files(path: Path) -> list[Path]:
+    """
+    List the snapshot files of a file or directory.
+
+    Args:
+    ----
+        path (Path): A snapshot file, or a directory searched recursively.
+
+    Returns:
+    -------
+        list[Path]: The snapshot files sorted by path.
+
+    """
+    path = Path(path)
+    if not path.is_dir():
+        return [path]
+    return sorted(
+        p
+        for p in path.rglob("*")
+        if p.is_file()
+        and not p.name.startswith(".")
+        and (p.name.endswith(SNAPSHOT_SUFFIX) or p.suffix == ".json")
+    )
+
+
+def iter_snapshots(path: Path) -> Iterator[Snapshot]:
+    """
+    Iterate over the snapshots of a file or directory, reading them one at a time.
+
+    Args:
+    ----
+        path (Path): A snapshot file, or a directory searched recursively.
+
+    Returns:
+    -------
+        Iterator[Snapshot]: The snapshots.
+
+    """
+    for file_path in snapshot_files(path):
+        yield read_snapshot(file_path)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Files replaced atomically and per-device compressed stores."""
+
+import gzip
+import os
+import re
+import threading
+import zlib
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def safe_filename(name: str) -> str:
+    """
+    Return a name usable as a file name, such as a device hostname.
+
+    Args:
+    ----
+        name (str): The name.
+
+    Returns:
+    -------
+        str: The name with the characters unsafe in file names replaced by ``_``.
+
+    """
+    return _UNSAFE_CHARS.sub("_", name)
+
+
+@contextmanager
+def atomic_open(
+    path: Path, mode: str = "w", compresslevel: int | None = None
+) -> Iterator[IO]:
+    """
+    Open a file for writing under a temporary name, renamed over the file once complete.
+
+    Readers never see a partial file, and a failed write leaves the previous
+    file in place. The parent directory is created if missing.
+
+    Args:
+    ----
+        path (Path): The file path.
+        mode (str): The write mode, such as ``w`` or ``wb``.
+        compresslevel (int | None): The gzip compression level, uncompressed if unset.
+
+    Returns:
+    -------
+        Iterator[IO]: The temporary file.
+
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if compresslevel is None:
+            f = open(tmp_path, mode)
+        else:
+            f = gzip.open(tmp_path, mode, compresslevel=compresslevel)
+        with f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+class HostStore:
+    """
+    Compressed documents, one per device.
+
+    Documents are kept in memory as zlib-compressed bytes, or in one gzip file
+    per device when a directory is configured.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        """Initialize the store, in memory unless a directory is given."""
+        self._lock = threading.Lock()
+        self._entries: dict[str, bytes] = {}
+        self.directory = Path(directory) if directory is not None else None
+
+    def configure(self, directory: Path | None):
+        """Set the directory where documents are persisted, dropping in-memory ones."""
+        with self._lock:
+            self._entries = {}
+            self.directory = Path(directory) if directory is not None else None
+
+    def path(self, hostname: str) -> Path:
+        """Return the file of a device in the configured directory."""
+        return self.directory / f"{safe_filename(hostname)}.json.gz"
+
+    def read(self, hostname: str) -> bytes | None:
+        """
+        Return the document of a device.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+
+        Returns:
+        -------
+            bytes | None: The uncompressed document, None if the device has none.
+
+        Raises:
+        ------
+            OSError: If the file of the device can't be read.
+
+        """
+        if self.directory is None:
+            with self._lock:
+                compressed = self._entries.get(hostname)
+            return None if compressed is None else zlib.decompress(compressed)
+        try:
+            with gzip.open(self.path(hostname), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, hostname: str, document: bytes):
+        """
+        Store the document of a device, replacing the previous one.
+
+        Args:
+        ----
+            hostname (str): The device hostname.
+            document (bytes): The uncompressed document.
+
+        Raises:
+        ------
+            OSError: If the file of the device can't be written.
+
+        """
+        if self.directory is None:
+            compressed = zlib.compress(document, 1)
+            with self._lock:
+                self._entries[hostname] = compressed
+            return
+        with atomic_open(self.path(hostname), "wb", compresslevel=1) as f:
+            f.write(document)
@@ -2,68 +2,74 @@
 # Copyright 2024 NetBox Labs Inc
 """Translate from NAPALM output format to Diode SDK entities."""
 
+import functools
 import ipaddress
+import socket
 from collections.abc import Iterable
 
 from netboxlabs.diode.sdk.ingester import (
     Device,
-    DeviceType,
     Entity,
     Interface,
     IPAddress,
-    Platform,
     Prefix,
 )
 
+from diode_napalm.collected import (
+    ArpRecord,
+    CollectedData,
+    DeviceRecord,
+    InterfaceRecord,
+    NeighborRecord,
+    compact_interfaces_ip,
+)
+from diode_napalm.translators import get_translator
+
 
-def int32_overflows(number: int) -> bool:
+def translate_device(device_info: dict | DeviceRecord) -> Device:
     """
-    Check if an integer is overflowing the int32 range.
+    Translate device information from NAPALM format to Diode SDK Device entity.
+
+    Fields are mapped by the translator registered for the device driver.
 
     Args:
     ----
-        number (int): The integer to check.
+        device_info (dict | DeviceRecord): Dictionary or record containing device information.
 
     Returns:
     -------
-        bool: True if the integer is overflowing the int32 range, False otherwise.
+        Device: Translated Device entity.
 
     """
-    INT32_MIN = -2147483648
-    INT32_MAX = 2147483647
-    return not (INT32_MIN <= number <= INT32_MAX)
+    if isinstance(device_info, dict):
+        device_info = DeviceRecord.from_napalm(device_info)
+    return get_translator(device_info.driver).device(device_info)
 
 
-def translate_device(device_info: dict) -> Device:
+def device_reference(device: Device) -> Device:
     """
-    Translate device information from NAPALM format to Diode SDK Device entity.
+    Build the lightweight reference to a device nested in its child entities.
+
+    The full device is ingested once as its own entity, so interfaces only need
+    what identifies it: its name and site.
 
     Args:
     ----
-        device_info (dict): Dictionary containing device information.
+        device (Device): The translated device.
 
     Returns:
     -------
-        Device: Translated Device entity.
+        Device: A Device entity with only the name and site set.
 
     """
-    device = Device(
-        name=device_info.get("hostname"),
-        device_type=DeviceType(
-            model=device_info.get("model"), manufacturer=device_info.get("vendor")
-        ),
-        platform=Platform(
-            name=device_info.get("driver"), manufacturer=device_info.get("vendor")
-        ),
-        serial=device_info.get("serial_number"),
-        status="active",
-        site=device_info.get("site"),
-    )
-    return device
+    return Device(name=device.name, site=device.site)
 
 
 def translate_interface(
-    device: Device, if_name: str, interface_info: dict
+    device: Device,
+    if_name: str,
+    interface_info: dict | InterfaceRecord,
+    driver: str | None = None,
 ) -> Interface:
     """
     Translate interface information from NAPALM format to Diode SDK Interface entity.
@@ -72,31 +78,118 @@ def translate_interface(
     ----
         device (Device): The device to which the interface belongs.
         if_name (str): The name of the interface.
-        interface_info (dict): Dictionary containing interface information.
+        interface_info (dict | InterfaceRecord): Dictionary or record containing interface information.
+        driver (str | None): The device driver, whose translator maps the fields.
 
     Returns:
     -------
         Interface: Translated Interface entity.
 
     """
-    interface = Interface(
-        device=device,
-        name=if_name,
-        enabled=interface_info.get("is_enabled"),
-        mac_address=interface_info.get("mac_address"),
-        description=interface_info.get("description"),
-    )
+    if isinstance(interface_info, dict):
+        interface_info = InterfaceRecord.from_napalm(if_name, interface_info)
+    return get_translator(driver).interface(device, interface_info)
+
+
+_MASKS = {
+    4: [(0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF for length in range(33)],
+    6: [((1 << 128) - 1) << (128 - length) & ((1 << 128) - 1) for length in range(129)],
+}
+
+
+@functools.lru_cache(maxsize=65536)
+def _prefix_string(version: int, network: int, prefix_length: int) -> str:
+    if version == 4:
+        return f"{socket.inet_ntoa(network.to_bytes(4, 'big'))}/{prefix_length}"
+    return f"{ipaddress.IPv6Address(network)}/{prefix_length}"
+
+
+def address_prefixes(
+    addresses: Iterable[tuple[str, int]],
+) -> dict[tuple[str, int], str]:
+    """
+    Compute the prefix of every address of a device in one pass.
 
-    # Convert napalm interface speed from Mbps to Netbox Kbps
-    speed = int(interface_info.get("speed")) * 1000
-    if not int32_overflows(speed):
-        interface.speed = speed
+    Addresses are packed to integers and masked with precomputed prefix masks,
+    instead of building an ``ip_network`` per address. Prefix strings are cached
+    per network and prefix length, since they repeat within and across devices.
+    The zone of scoped IPv6 addresses, such as ``fe80::1%eth0``, is left out of
+    their prefix.
 
-    mtu = interface_info.get("mtu")
-    if not int32_overflows(mtu):
-        interface.mtu = mtu
+    Args:
+    ----
+        addresses (Iterable[tuple[str, int]]): Addresses and prefix lengths.
+
+    Returns:
+    -------
+        dict[tuple[str, int], str]: Each address and prefix length to its prefix.
 
-    return interface
+    Raises:
+    ------
+        ValueError: If an address or prefix length is invalid.
+
+    """
+    inet_pton = socket.inet_pton
+    from_bytes = int.from_bytes
+    masks4, masks6 = _MASKS[4], _MASKS[6]
+    prefixes = {}
+    for address in addresses:
+        if address in prefixes:
+            continue
+        ip, prefix_length = address
+        try:
+            if prefix_length < 0:
+                raise IndexError(prefix_length)
+            if ":" in ip:
+                host, scoped, zone = ip.partition("%")
+                if scoped and (not zone or "%" in zone):
+                    raise OSError(ip)
+                network = from_bytes(inet_pton(socket.AF_INET6, host), "big")
+                prefix = _prefix_string(
+                    6, network & masks6[prefix_length], prefix_length
+                )
+            else:
+                network = from_bytes(inet_pton(socket.AF_INET, ip), "big")
+                prefix = _prefix_string(
+                    4, network & masks4[prefix_length], prefix_length
+                )
+        except (OSError, IndexError, TypeError) as e:
+            raise ValueError(f"invalid address {ip}/{prefix_length}") from e
+        prefixes[address] = prefix
+    return prefixes
+
+
+def _translate_addresses(
+    if_name: str,
+    device_ref: Device,
+    interfaces_ip: dict[str, tuple[tuple[str, int], ...]],
+    prefixes: dict[tuple[str, int], str],
+    translated_name: str | None = None,
+) -> list[Entity]:
+    # Addresses are matched on the collected interface name and reference the
+    # translated one
+    ip_entities = []
+    interface_ref = None
+    site = device_ref.site
+    for if_ip_name, addresses in interfaces_ip.items():
+        if if_name in if_ip_name:
+            if interface_ref is None:
+                interface_ref = Interface(
+                    name=translated_name or if_name, device=device_ref
+                )
+            for address in addresses:
+                ip, prefix_length = address
+                ip_entities.append(
+                    Entity(prefix=Prefix(prefix=prefixes[address], site=site))
+                )
+                ip_entities.append(
+                    Entity(
+                        ip_address=IPAddress(
+                            address=f"{ip}/{prefix_length}", interface=interface_ref
+                        )
+                    )
+                )
+    return ip_entities
 
 
 def translate_interface_ips(
@@ -105,10 +198,11 @@ def translate_interface_ips(
     """
     Translate IP address and Prefixes information for an interface.
 
+    The IP addresses reference the interface and its device by name and site only.
+
     Args:
     ----
         interface (Interface): The interface entity.
-        if_name (str): The name of the interface.
         interfaces_ip (dict): Dictionary containing interface IP information.
 
     Returns:
@@ -116,61 +210,196 @@ def translate_interface_ips(
         Iterable[Entity]: Iterable of translated IP address and Prefixes entities.
 
     """
-    ip_entities = []
+    interfaces_ip = compact_interfaces_ip(interfaces_ip)
+    return _translate_addresses(
+        interface.name,
+        device_reference(interface.device),
+        interfaces_ip,
+        address_prefixes(
+            address for addresses in interfaces_ip.values() for address in addresses
+        ),
+    )
 
-    for if_ip_name, ip_info in interfaces_ip.items():
-        if interface.name in if_ip_name:
-            for ip_version, default_prefix in (("ipv4", 32), ("ipv6", 128)):
-                for ip, details in ip_info.get(ip_version, {}).items():
-                    ip_address = f"{ip}/{details.get('prefix_length', default_prefix)}"
-                    network = ipaddress.ip_network(ip_address, strict=False)
-                    ip_entities.append(
-                        Entity(
-                            prefix=Prefix(
-                                prefix=str(network), site=interface.device.site
-                            )
-                        )
-                    )
-                    ip_entities.append(
-                        Entity(
-                            ip_address=IPAddress(
-                                address=ip_address, interface=interface
-                            )
-                        )
-                    )
 
-    return ip_entities
+def _translate_neighbors(
+    device: Device, neighbors: Iterable[NeighborRecord]
+) -> list[Entity]:
+    entities = []
+    neighbor_devices = {}
+    for neighbor in neighbors:
+        name = neighbor.system_name
+        if not name:
+            continue
+        neighbor_device = neighbor_devices.get(name)
+        if neighbor_device is None:
+            neighbor_device = neighbor_devices[name] = Device(
+                name=name, site=device.site
+            )
+            entities.append(Entity(device=neighbor_device))
+        if neighbor.port:
+            entities.append(
+                Entity(
+                    interface=Interface(
+                        device=neighbor_device,
+                        name=neighbor.port,
+                        description=neighbor.port_description,
+                    )
+                )
+            )
+    return entities
 
 
-def translate_data(data: dict) -> Iterable[Entity]:
+def translate_lldp_neighbors(device: Device, lldp_neighbors: dict) -> Iterable[Entity]:
     """
-    Translate data from NAPALM format to Diode SDK entities.
+    Translate LLDP neighbors into neighbor Device and Interface entities.
 
     Args:
     ----
-        data (dict): Dictionary containing data to be translated.
+        device (Device): The device the neighbors were discovered from.
+        lldp_neighbors (dict): Dictionary of local interfaces to neighbors, as
+            returned by ``get_lldp_neighbors_detail``.
 
     Returns:
     -------
-        Iterable[Entity]: Iterable of translated entities.
+        Iterable[Entity]: Iterable of neighbor devices and their interfaces.
 
     """
+    return _translate_neighbors(
+        device,
+        (
+            NeighborRecord(
+                neighbor.get("remote_system_name"),
+                neighbor.get("remote_port"),
+                neighbor.get("remote_port_description"),
+            )
+            for neighbors in lldp_neighbors.values()
+            for neighbor in neighbors
+        ),
+    )
+
+
+def _network_index(
+    interfaces_ip: dict[str, tuple[tuple[str, int], ...]],
+) -> tuple[set[str], dict[int, list[tuple[int, int, set[int]]]]]:
+    # Interface networks grouped by IP version and prefix length, longest first,
+    # so an address is matched with one set lookup per distinct prefix length
+    own_addresses = set()
+    by_length: dict[tuple[int, int], set[int]] = {}
+    for addresses in interfaces_ip.values():
+        for ip, prefix_length in addresses:
+            own_addresses.add(ip)
+            address = ipaddress.ip_address(ip)
+            shift = address.max_prefixlen - prefix_length
+            by_length.setdefault((address.version, prefix_length), set()).add(
+                int(address) >> shift
+            )
+    index: dict[int, list[tuple[int, int, set[int]]]] = {4: [], 6: []}
+    for (version, prefix_length), networks in sorted(by_length.items(), reverse=True):
+        max_length = 32 if version == 4 else 128
+        index[version].append((prefix_length, max_length - prefix_length, networks))
+    return own_addresses, index
+
+
+def _translate_arp_entries(
+    device: Device,
+    arp_table: Iterable[ArpRecord],
+    interfaces_ip: dict[str, tuple[tuple[str, int], ...]],
+) -> list[Entity]:
+    own_addresses, index = _network_index(interfaces_ip)
     entities = []
+    for entry in arp_table:
+        ip = entry.ip
+        if not ip or ip in own_addresses:
+            continue
+        address = ipaddress.ip_address(ip)
+        value = int(address)
+        prefix_length = next(
+            (
+                length
+                for length, shift, networks in index[address.version]
+                if value >> shift in networks
+            ),
+            address.max_prefixlen,
+        )
+        entities.append(
+            Entity(
+                ip_address=IPAddress(
+                    address=f"{ip}/{prefix_length}",
+                    status="active",
+                    description=f"ARP entry on {device.name} {entry.interface or ''}".rstrip(),
+                )
+            )
+        )
+    return entities
+
+
+def translate_arp_table(
+    device: Device, arp_table: list, interfaces_ip: dict
+) -> Iterable[Entity]:
+    """
+    Translate ARP entries into IP address entities of the neighbors.
+
+    The prefix length is taken from the most specific device interface subnet
+    containing the address. Addresses of the device itself are skipped.
+
+    Args:
+    ----
+        device (Device): The device the ARP table was read from.
+        arp_table (list): List of ARP entries, as returned by ``get_arp_table``.
+        interfaces_ip (dict): Dictionary containing the device interfaces IP information.
+
+    Returns:
+    -------
+        Iterable[Entity]: Iterable of IP address entities.
+
+    """
+    return _translate_arp_entries(
+        device,
+        (ArpRecord(entry.get("ip"), entry.get("interface")) for entry in arp_table),
+        compact_interfaces_ip(interfaces_ip),
+    )
+
 
-    device_info = data.get("device", {})
-    interfaces = data.get("interface", {})
-    interfaces_ip = data.get("interface_ip", {})
-    if device_info:
-        device_info["driver"] = data.get("driver")
-        device_info["site"] = data.get("site")
-        device = translate_device(device_info)
-        entities.append(Entity(device=device))
-
-        interface_list = device_info.get("interface_list", [])
-        for if_name, interface_info in interfaces.items():
-            if if_name in interface_list:
-                interface = translate_interface(device, if_name, interface_info)
-                entities.append(Entity(interface=interface))
-                entities.extend(translate_interface_ips(interface, interfaces_ip))
+def translate_data(data: dict | CollectedData) -> Iterable[Entity]:
+    """
+    Translate data from NAPALM format to Diode SDK entities.
 
+    Args:
+    ----
+        data (dict | CollectedData): Dictionary containing data to be translated,
+            or its compact form.
+
+    Returns:
+    -------
+        Iterable[Entity]: Iterable of translated entities.
+
+    """
+    if not isinstance(data, CollectedData):
+        data = CollectedData.from_napalm(data)
+    if data.device is None:
+        return []
+
+    translator = get_translator(data.device.driver)
+    device = translator.device(data.device)
+    entities = [Entity(device=device)]
+    # Children reference the device by name and site instead of embedding it
+    device_ref = device_reference(device)
+    prefixes = address_prefixes(
+        address for addresses in data.interfaces_ip.values() for address in addresses
+    )
+    for interface_info in data.interfaces:
+        interface = translator.interface(device_ref, interface_info)
+        entities.append(Entity(interface=interface))
+        entities.extend(
+            _translate_addresses(
+                interface_info.name,
+                device_ref,
+                data.interfaces_ip,
+                prefixes,
+                interface.name,
+            )
+        )
+
+    entities.extend(_translate_neighbors(device, data.neighbors))
+    entities.extend(_translate_arp_entries(device, data.arp_table, data.interfaces_ip))
     return entities
@@ -0,0 +1,325 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""Translators of the collected records to Diode SDK entities, per NAPALM driver."""
+
+import re
+from collections.abc import Callable
+from operator import attrgetter
+
+from netboxlabs.diode.sdk.ingester import Device, DeviceType, Interface, Platform
+
+from diode_napalm.collected import DeviceRecord, InterfaceRecord
+
+# Entity field -> "source attribute | transform | transform:argument ..."
+DEVICE_FIELDS = {
+    "name": "hostname",
+    "model": "model",
+    "manufacturer": "vendor",
+    "platform": "driver",
+    "serial": "serial_number",
+    "site": "site",
+}
+INTERFACE_FIELDS = {
+    "name": "name",
+    "enabled": "enabled",
+    "mac_address": "mac_address",
+    "description": "description",
+    # NAPALM speeds are in Mbps, floats since NAPALM 4, NetBox speeds in Kbps
+    "speed": "speed | int | scale:1000 | int32",
+    "mtu": "mtu | int32",
+    "mode": "mode | nonempty",
+}
+
+_SOURCES = {
+    "device": frozenset(DeviceRecord.__slots__) - {"interface_list"},
+    "interface": frozenset(InterfaceRecord.__slots__),
+}
+_TARGETS = {"device": DEVICE_FIELDS.keys(), "interface": INTERFACE_FIELDS.keys()}
+
+INTERFACE_ABBREVIATIONS = {
+    "fa": "FastEthernet",
+    "gi": "GigabitEthernet",
+    "te": "TenGigabitEthernet",
+    "twe": "TwentyFiveGigE",
+    "fo": "FortyGigabitEthernet",
+    "hu": "HundredGigE",
+    "eth": "Ethernet",
+    "et": "Ethernet",
+    "po": "Port-channel",
+    "lo": "Loopback",
+    "vl": "Vlan",
+    "tu": "Tunnel",
+    "mgmt": "Management",
+}
+_INTERFACE_NAME = re.compile(r"([A-Za-z-]+)(\d.*)")
+
+
+def int32_overflows(number: int) -> bool:
+    """
+    Check if an integer is overflowing the int32 range.
+
+    Args:
+    ----
+        number (int): The integer to check.
+
+    Returns:
+    -------
+        bool: True if the integer is overflowing the int32 range, False otherwise.
+
+    """
+    INT32_MIN = -2147483648
+    INT32_MAX = 2147483647
+    return not (INT32_MIN <= number <= INT32_MAX)
+
+
+def normalize_interface_name(name: str) -> str:
+    """
+    Expand an abbreviated interface name, such as ``Gi0/1`` to ``GigabitEthernet0/1``.
+
+    Args:
+    ----
+        name (str): The interface name.
+
+    Returns:
+    -------
+        str: The full interface name, or the name unchanged if it is not abbreviated.
+
+    """
+    match = _INTERFACE_NAME.fullmatch(name)
+    if match is None:
+        return name
+    full = INTERFACE_ABBREVIATIONS.get(match.group(1).lower())
+    return name if full is None else full + match.group(2)
+
+
+def _scale(argument: str) -> Callable:
+    factor = float(argument) if "." in argument else int(argument)
+    return lambda value: value * factor
+
+
+def _replace(old: str, new: str) -> Callable:
+    return lambda value: value.replace(old, new)
+
+
+# Transform name -> factory of the transform, called with the argument if any
+TRANSFORMS: dict[str, Callable[..., Callable]] = {
+    "int": lambda: int,
+    "scale": _scale,
+    "int32": lambda: lambda value: None if int32_overflows(value) else value,
+    "nonempty": lambda: lambda value: value or None,
+    "strip": lambda: str.strip,
+    "lower": lambda: str.lower,
+    "upper": lambda: str.upper,
+    "remove_prefix": lambda prefix: lambda value: value.removeprefix(prefix),
+    "remove_suffix": lambda suffix: lambda value: value.removesuffix(suffix),
+    "replace": lambda argument: _replace(*argument.split("=", 1)),
+    "normalize_interface_name": lambda: normalize_interface_name,
+}
+
+
+def compile_field(kind: str, spec: str) -> Callable:
+    """
+    Compile the mapping of an entity field into a function of the record.
+
+    Transforms are applied left to right and skipped once the value is None.
+
+    Args:
+    ----
+        kind (str): ``device`` or ``interface``, the record the value is read from.
+        spec (str): The mapping, such as ``"speed | int | scale:1000 | int32"``.
+
+    Returns:
+    -------
+        Callable: Function returning the field value of a record.
+
+    Raises:
+    ------
+        ValueError: If the source attribute or a transform is unknown.
+
+    """
+    source, *steps = (part.strip() for part in spec.split("|"))
+    if source not in _SOURCES[kind]:
+        raise ValueError(
+            f"unknown {kind} attribute '{source}', expected one of "
+            f"{sorted(_SOURCES[kind])}"
+        )
+    getter = attrgetter(source)
+    transforms = []
+    for step in steps:
+        name, separator, argument = step.partition(":")
+        factory = TRANSFORMS.get(name)
+        if factory is None:
+            raise ValueError(f"unknown transform '{name}' in '{spec}'")
+        try:
+            transforms.append(factory(argument) if separator else factory())
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"invalid transform '{step}' in '{spec}': {e}") from e
+    if not transforms:
+        return getter
+    transforms = tuple(transforms)
+
+    def value_of(record):
+        value = getter(record)
+        for transform in transforms:
+            if value is None:
+                return None
+            value = transform(value)
+        return value
+
+    return value_of
+
+
+def compile_fields(kind: str, fields: dict[str, str]) -> dict[str, Callable]:
+    """
+    Compile the mappings of entity fields, on top of the default mappings.
+
+    Args:
+    ----
+        kind (str): ``device`` or ``interface``.
+        fields (dict[str, str]): Entity field to mapping, overriding the defaults.
+
+    Returns:
+    -------
+        dict[str, Callable]: Every entity field to the function returning its value.
+
+    Raises:
+    ------
+        ValueError: If a field or mapping is invalid.
+
+    """
+    unknown = fields.keys() - _TARGETS[kind]
+    if unknown:
+        raise ValueError(
+            f"unknown {kind} fields {sorted(unknown)}, expected some of "
+            f"{sorted(_TARGETS[kind])}"
+        )
+    defaults = DEVICE_FIELDS if kind == "device" else INTERFACE_FIELDS
+    return {
+        field: compile_field(kind, spec)
+        for field, spec in {**defaults, **fields}.items()
+    }
+
+
+class Translator:
+    """
+    Translator of the device and interface records of a NAPALM driver.
+
+    The field mappings are compiled once, when the translator is created, so
+    translating a record is a fixed sequence of calls, with no lookup of the
+    mappings.
+    """
+
+    def __init__(
+        self,
+        device: dict[str, str] | None = None,
+        interface: dict[str, str] | None = None,
+    ):
+        """
+        Compile the field mappings of the translator.
+
+        Args:
+        ----
+            device (dict[str, str] | None): Device field mappings overriding the defaults.
+            interface (dict[str, str] | None): Interface field mappings overriding
+                the defaults.
+
+        Raises:
+        ------
+            ValueError: If a field or mapping is invalid.
+
+        """
+        self.device = self._device_translator(compile_fields("device", device or {}))
+        self.interface = self._interface_translator(
+            compile_fields("interface", interface or {})
+        )
+
+    @staticmethod
+    def _device_translator(fields: dict[str, Callable]) -> Callable:
+        name, model, manufacturer, platform, serial, site = (
+            fields[field] for field in DEVICE_FIELDS
+        )
+
+        def translate_device(record: DeviceRecord) -> Device:
+            vendor = manufacturer(record)
+            return Device(
+                name=name(record),
+                device_type=DeviceType(model=model(record), manufacturer=vendor),
+                platform=Platform(name=platform(record), manufacturer=vendor),
+                serial=serial(record),
+                status="active",
+                site=site(record),
+            )
+
+        return translate_device
+
+    @staticmethod
+    def _interface_translator(fields: dict[str, Callable]) -> Callable:
+        name, enabled, mac_address, description, speed, mtu, mode = (
+            fields[field] for field in INTERFACE_FIELDS
+        )
+
+        def translate_interface(device: Device, record: InterfaceRecord) -> Interface:
+            return Interface(
+                device=device,
+                name=name(record),
+                enabled=enabled(record),
+                mac_address=mac_address(record),
+                description=description(record),
+                speed=speed(record),
+                mtu=mtu(record),
+                mode=mode(record),
+            )
+
+        return translate_interface
+
+
+_default_translator = Translator()
+_translators: dict[str, Translator] = {}
+
+
+def register_translator(
+    driver: str,
+    device: dict[str, str] | None = None,
+    interface: dict[str, str] | None = None,
+) -> Translator:
+    """
+    Register the field mappings of a driver, replacing its previous ones.
+
+    Args:
+    ----
+        driver (str): The NAPALM driver name.
+        device (dict[str, str] | None): Device field mappings overriding the defaults.
+        interface (dict[str, str] | None): Interface field mappings overriding the defaults.
+
+    Returns:
+    -------
+        Translator: The compiled translator.
+
+    Raises:
+    ------
+        ValueError: If a field or mapping is invalid.
+
+    """
+    translator = _translators[driver] = Translator(device, interface)
+    return translator
+
+
+def reset_translators():
+    """Unregister the field mappings of every driver."""
+    _translators.clear()
+
+
+def get_translator(driver: str | None) -> Translator:
+    """
+    Return the translator of a driver, the default one if none was registered.
+
+    Args:
+    ----
+        driver (str | None): The NAPALM driver name.
+
+    Returns:
+    -------
+        Translator: The translator.
+
+    """
+    return _translators.get(driver, _default_translator)
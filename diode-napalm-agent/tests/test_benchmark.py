@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Benchmark Unit Tests."""
+
+import json
+
+import pytest
+
+from diode_napalm.benchmark import (
+    BenchmarkReport,
+    benchmark_device,
+    format_comparison,
+    format_report,
+    iter_captures,
+    read_benchmark,
+    run_benchmark,
+    write_benchmark,
+)
+from diode_napalm.snapshot import write_snapshot
+
+
+def device_data(hostname: str, interfaces: int = 4) -> dict:
+    """Build the getters output of a device with addressed subinterfaces."""
+    names = [f"Ethernet1.{i}" for i in range(interfaces)]
+    return {
+        "device": {"hostname": hostname, "vendor": "Arista", "interface_list": names},
+        "interface": {
+            name: {"is_enabled": True, "speed": 10000.0, "mtu": 9214} for name in names
+        },
+        "interface_ip": {
+            name: {
+                "ipv4": {f"10.0.{i}.1": {"prefix_length": 24}},
+                "ipv6": {f"fe80::{i + 1}": {"prefix_length": 64}},
+            }
+            for i, name in enumerate(names)
+        },
+    }
+
+
+@pytest.fixture
+def captures(tmp_path):
+    """Directory with a capture directory and a snapshot file."""
+    data = device_data("switch1")
+    switch = tmp_path / "switch1"
+    switch.mkdir()
+    (switch / "metadata.json").write_text(json.dumps({"driver": "eos"}))
+    (switch / "get_facts.json").write_text(json.dumps(data["device"]))
+    (switch / "get_interfaces.json").write_text(json.dumps(data["interface"]))
+    (switch / "get_interfaces_ip.json").write_text(json.dumps(data["interface_ip"]))
+    write_snapshot(tmp_path / "snapshots", "switch2", device_data("switch2", 8))
+    (tmp_path / "snapshots" / "broken.json").write_text("{")
+    return tmp_path
+
+
+def test_iter_captures(captures):
+    """Ensure capture directories and snapshots are read, skipping broken files."""
+    devices = dict(iter_captures(captures))
+
+    assert sorted(devices) == ["switch1", "switch2"]
+    assert devices["switch1"]["driver"] == "eos"
+    assert set(devices["switch1"]) == {"driver", "device", "interface", "interface_ip"}
+
+
+def test_benchmark_device():
+    """Ensure the size, entities and stage timings of a device are measured."""
+    result = benchmark_device("switch1", device_data("switch1"), repeat=2)
+
+    assert (result.interfaces, result.addresses) == (4, 8)
+    # Device, interfaces, addresses and their prefixes
+    assert result.entities == 1 + 4 + 8 * 2
+    assert result.payload_bytes > 0
+    assert result.allocated_bytes > 0
+    assert set(result.timings) == {"compact", "translate", "serialize"}
+    assert benchmark_device("switch1", {"interface": {}}) is None
+
+
+def test_run_benchmark_and_compare(captures, tmp_path):
+    """Ensure results are aggregated, written, read back and compared."""
+    report = run_benchmark(captures, repeat=1)
+    assert report.summary["devices"] == 2
+    assert report.summary["entities"] == sum(d.entities for d in report.devices)
+    assert "switch2" in format_report(report)
+
+    write_benchmark(tmp_path / "results.json", report)
+    baseline = read_benchmark(tmp_path / "results.json")
+    assert baseline == report
+
+    baseline.devices[0].payload_bytes *= 2
+    baseline.devices.pop()
+    current = BenchmarkReport(repeat=1, devices=report.devices)
+    current.summarize()
+    lines = format_comparison(baseline, current).splitlines()
+    assert "-50.0%" in lines[2]
+    assert lines[3].endswith("not in the baseline")
+    assert lines[-1].startswith("total")
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Changes Unit Tests."""
+
+import pytest
+
+from diode_napalm.changes import FingerprintStore
+from diode_napalm.translate import translate_data
+
+
+def device_data(interfaces: dict[str, str]) -> dict:
+    """Build the getters output of a router, with an address and an LLDP neighbor per interface."""
+    return {
+        "device": {"hostname": "router1", "interface_list": list(interfaces)},
+        "interface": {
+            name: {"is_enabled": True, "description": description}
+            for name, description in interfaces.items()
+        },
+        "interface_ip": {
+            name: {"ipv4": {f"10.0.{i}.1": {"prefix_length": 24}}}
+            for i, name in enumerate(interfaces)
+        },
+        "lldp_neighbors": {
+            name: [{"remote_system_name": "switch1", "remote_port": f"Ethernet{i}"}]
+            for i, name in enumerate(interfaces)
+        },
+        "site": "New York",
+    }
+
+
+def kinds(entities) -> list[tuple[str, str]]:
+    """Return the kind and name of entities."""
+    names = []
+    for entity in entities:
+        kind = entity.WhichOneof("entity")
+        value = getattr(entity, kind)
+        names.append((kind, getattr(value, "name", None) or value.address))
+    return names
+
+
+@pytest.fixture
+def store():
+    """Enabled fingerprint store, in memory."""
+    store = FingerprintStore()
+    store.configure(True)
+    return store
+
+
+def poll(store: FingerprintStore, interfaces: dict[str, str], commit: bool = True):
+    """Diff a poll of the router, committing it as ingested."""
+    entities = store.diff("router1", translate_data(device_data(interfaces)))
+    if commit:
+        store.commit("router1")
+    return entities
+
+
+def test_first_poll_sent_in_full(store):
+    """Ensure devices without fingerprints are sent in full, and then not at all."""
+    interfaces = {"Gi0/0": "uplink", "Gi0/1": "server"}
+    entities = translate_data(device_data(interfaces))
+
+    assert poll(store, interfaces) == entities
+    assert poll(store, interfaces) == []
+
+
+def test_modified_interface_only(store):
+    """Ensure only the modified interface is sent."""
+    poll(store, {"Gi0/0": "uplink", "Gi0/1": "server"})
+
+    entities = poll(store, {"Gi0/0": "uplink", "Gi0/1": "database"})
+
+    assert kinds(entities) == [("interface", "Gi0/1")]
+    assert entities[0].interface.description == "database"
+
+
+def test_removed_objects_tombstoned(store):
+    """Ensure removed interfaces are disabled and their addresses deprecated."""
+    poll(store, {"Gi0/0": "uplink", "Gi0/1": "server"})
+
+    entities = poll(store, {"Gi0/0": "uplink"})
+
+    # The neighbor interface and the prefix are only forgotten
+    assert kinds(entities) == [("interface", "Gi0/1"), ("ip_address", "10.0.1.1/24")]
+    interface, address = entities
+    assert not interface.interface.enabled
+    assert interface.interface.device.site.name == "New York"
+    assert address.ip_address.status == "deprecated"
+    assert poll(store, {"Gi0/0": "uplink", "Gi0/1": "server"})[0].interface.enabled
+
+
+def test_uncommitted_poll_sent_again(store):
+    """Ensure the changes of a poll that failed to be ingested are sent again."""
+    poll(store, {"Gi0/0": "uplink"})
+    poll(store, {"Gi0/0": "core"}, commit=False)
+
+    assert kinds(poll(store, {"Gi0/0": "core"})) == [("interface", "Gi0/0")]
+
+
+def test_fingerprints_persisted(tmp_path):
+    """Ensure fingerprints are read back across runs from the directory."""
+    store = FingerprintStore()
+    store.configure(True, tmp_path)
+    poll(store, {"Gi0/0": "uplink"})
+
+    restarted = FingerprintStore()
+    restarted.configure(True, tmp_path)
+
+    assert restarted.get("router1") == store.get("router1")
+    assert poll(restarted, {"Gi0/0": "uplink"}) == []
@@ -2,13 +2,69 @@
 # Copyright 2024 NetBox Labs Inc
 """NetBox Labs - CLI Unit Tests."""
 
+import argparse
 import sys
+import threading
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from diode_napalm.cli.cli import main, run_driver, start_agent, start_policy
+from diode_napalm.cli.cli import (
+    collect_in_process,
+    main,
+    policy_drivers,
+    replay_snapshots,
+    run_cycles,
+    run_device,
+    run_driver,
+    shard_arg,
+    start_agent,
+    start_policy,
+    start_worker,
+)
+from diode_napalm.collected import CollectedData
+from diode_napalm.coordination import SQLiteLeaseStore, device_key
+from diode_napalm.getters import GetterCache
+from diode_napalm.ledger import DeviceOutcome, read_ledger
+from diode_napalm.options import RunOptions
 from diode_napalm.parser import DiscoveryConfig, Napalm, Policy
+from diode_napalm.sessions import DEFAULT_IDLE_TIMEOUT
+from diode_napalm.snapshot import read_snapshot, write_snapshot
+
+
+def cli_args(**kwargs) -> MagicMock:
+    """Build mocked CLI arguments, using the parser defaults for unset options."""
+    args = {
+        "dry_run": False,
+        "interval": None,
+        "collect_only": None,
+        "replay": None,
+        "cache_dir": None,
+        "ledger": None,
+        "rerun_failed": False,
+        "profile": None,
+        "trace": None,
+        "log_format": "text",
+        "lease_store": None,
+        "role": None,
+        "worker_id": None,
+        "shards": 64,
+        "shard": None,
+        "isolate_sessions": False,
+        "max_tasks_per_child": None,
+        "max_child_rss": None,
+        "session_pool": None,
+        "session_idle_timeout": None,
+        "memory_budget": None,
+        "benchmark": None,
+        "benchmark_repeat": 5,
+        "benchmark_output": None,
+        "benchmark_compare": None,
+        "incremental": False,
+    }
+    args.update(kwargs)
+    return MagicMock(**args)
 
 
 @pytest.fixture
@@ -131,7 +187,7 @@ def test_main_keyboard_interrupt(mock_parse_args, mock_parse_config_file):
         mock_parse_config_file: Mocked parse_config_file function.
 
     """
-    mock_parse_args.return_value = MagicMock(config="config.yaml", env=None, workers=2)
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=None, workers=2)
     mock_parse_config_file.side_effect = KeyboardInterrupt
 
     with patch.object(sys, "exit", side_effect=Exception("Test Exit")):
@@ -145,9 +201,7 @@ def test_main_with_config_and_env(
     mock_parse_args, mock_load_dotenv, mock_parse_config_file, mock_start_agent
 ):
     """Test running the CLI with a configuration file and environment file."""
-    mock_parse_args.return_value = MagicMock(
-        config="config.yaml", env=".env", workers=2
-    )
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=".env", workers=2)
     mock_load_dotenv.return_value = True
     mock_parse_config_file.return_value = MagicMock()
 
@@ -166,7 +220,7 @@ def test_main_with_config_no_env(
     mock_parse_args, mock_load_dotenv, mock_parse_config_file, mock_start_agent
 ):
     """Test running the CLI with a configuration file and no environment file."""
-    mock_parse_args.return_value = MagicMock(config="config.yaml", env=None, workers=2)
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=None, workers=2)
     mock_parse_config_file.return_value = MagicMock()
 
     with patch.object(sys, "exit", side_effect=Exception("Test Exit")):
@@ -182,9 +236,7 @@ def test_main_with_config_no_env(
 
 def test_main_load_dotenv_failure(mock_parse_args, mock_load_dotenv):
     """Test CLI failure when loading environment variables fails."""
-    mock_parse_args.return_value = MagicMock(
-        config="config.yaml", env=".env", workers=2
-    )
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=".env", workers=2)
     mock_load_dotenv.return_value = False
 
     with patch.object(sys, "exit", side_effect=Exception("Test Exit")) as mock_exit:
@@ -203,7 +255,7 @@ def test_main_start_agent_failure(
     mock_parse_args, mock_parse_config_file, mock_start_agent
 ):
     """Test CLI failure when starting the agent."""
-    mock_parse_args.return_value = MagicMock(config="config.yaml", env=None, workers=2)
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=None, workers=2)
     mock_parse_config_file.return_value = MagicMock()
     mock_start_agent.side_effect = Exception("Test Start Agent Failure")
 
@@ -229,7 +281,7 @@ def test_main_no_config_file(mock_parse_args):
         mock_parse_args: Mocked parse_args function.
 
     """
-    mock_parse_args.return_value = MagicMock(config=None, env=None, workers=2)
+    mock_parse_args.return_value = cli_args(config=None, env=None, workers=2)
 
     with patch.object(sys, "exit", side_effect=Exception("Test Exit")) as mock_exit:
         try:
@@ -251,7 +303,7 @@ def test_main_missing_policy(mock_parse_args, mock_parse_config_file):
         mock_parse_config_file: Mocked parse_config_file function.
 
     """
-    mock_parse_args.return_value = MagicMock(config="config.yaml", env=None, workers=2)
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=None, workers=2)
     mock_cfg = MagicMock()
     mock_cfg.policies = {"policy1": None}  # Simulating a missing policy
     mock_parse_config_file.return_value = mock_cfg
@@ -272,9 +324,7 @@ def test_main_load_dotenv_exception(mock_parse_args):
         mock_parse_args: Mocked parse_args function.
 
     """
-    mock_parse_args.return_value = MagicMock(
-        config="config.yaml", env=".env", workers=2
-    )
+    mock_parse_args.return_value = cli_args(config="config.yaml", env=".env", workers=2)
 
     with patch("dotenv.load_dotenv", side_effect=Exception("Load dotenv error")):
         with patch.object(sys, "exit", side_effect=Exception("Test Exit")) as mock_exit:
@@ -446,12 +496,18 @@ def test_start_agent(mock_client, mock_start_policy):
 
     # Verify that the client was initialized correctly
     mock_client().init_client.assert_called_once_with(
-        target="http://example.com", api_key="dummy_api_key"
+        target="http://example.com",
+        api_key="dummy_api_key",
+        channel=cfg.config.channel,
     )
 
     # Verify that start_policy was called for each policy
-    mock_start_policy.assert_any_call("policy1", cfg.policies["policy1"], workers)
-    mock_start_policy.assert_any_call("policy2", cfg.policies["policy2"], workers)
+    mock_start_policy.assert_any_call(
+        "policy1", cfg.policies["policy1"], workers, options=RunOptions()
+    )
+    mock_start_policy.assert_any_call(
+        "policy2", cfg.policies["policy2"], workers, options=RunOptions()
+    )
     assert mock_start_policy.call_count == 2
 
 
@@ -529,3 +585,627 @@ def test_start_policy_exception(mock_thread_pool_executor, mock_as_completed):
 
     mock_thread_pool_executor.assert_called_once_with(max_workers=2)
     mock_future.result.assert_called_once()
+
+
+def test_main_dry_run(mock_parse_args, mock_start_agent, tmp_path, capsys):
+    """Ensure dry-run prints the plan and exits without starting the agent."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("""
+diode:
+  config:
+    target: grpc://localhost:8081
+    api_key: key
+  policies:
+    policy1:
+      config:
+        netbox:
+          site: New York
+      data:
+        - driver: ios
+          hostname: router1
+          username: admin
+          password: password
+        - hostname: router2
+          username: admin
+          password: password
+""")
+    mock_parse_args.return_value = cli_args(
+        config=str(config_file), env=None, workers=4, dry_run=True
+    )
+
+    with patch("diode_napalm.cli.cli.get_supported_drivers", return_value=["ios"]):
+        with pytest.raises(SystemExit) as excinfo:
+            main()
+
+    assert excinfo.value.code == 0
+    mock_start_agent.assert_not_called()
+    output = capsys.readouterr().out
+    assert "Policies: 1, devices: 2" in output
+    assert (
+        "Policy policy1: 2 devices (ios: 1, discover: 1), 2 workers, 1 waves" in output
+    )
+
+
+def test_start_policy_streams_inventory(tmp_path):
+    """Ensure every inventory device is processed with a bounded number queued."""
+    inventory = tmp_path / "devices.jsonl"
+    inventory.write_text(
+        "".join(
+            f'{{"hostname": "router{i}", "username": "u", "password": "p"}}\n'
+            for i in range(10)
+        )
+    )
+    cfg = Policy(
+        config=DiscoveryConfig(netbox={"site": "test_site"}), inventory=inventory
+    )
+
+    with patch(
+        "diode_napalm.cli.cli.run_driver", return_value=False
+    ) as mock_run_driver:
+        mock_run_driver.side_effect = [Exception("failure")] + [None] * 9
+        start_policy("policy", cfg, 2)
+
+    hostnames = sorted(call.args[0].hostname for call in mock_run_driver.mock_calls)
+    assert hostnames == sorted(f"router{i}" for i in range(10))
+
+
+def test_run_cycles_reloads_inventory(tmp_path, mock_start_policy):
+    """Ensure inventory changes are picked up between cycles."""
+    inventory = tmp_path / "devices.jsonl"
+    inventory.write_text('{"hostname": "router1", "username": "u", "password": "p"}\n')
+    cfg = MagicMock()
+    cfg.policies = {
+        "policy1": Policy(
+            config=DiscoveryConfig(netbox={"site": "test_site"}), inventory=inventory
+        )
+    }
+    stop = threading.Event()
+    cycles = []
+
+    def side_effect(name, policy, workers, devices, options):
+        cycles.append(sorted(device.hostname for device in devices))
+        if len(cycles) == 1:
+            inventory.write_text(
+                '{"hostname": "router1", "username": "u", "password": "p"}\n'
+                '{"hostname": "router2", "username": "u", "password": "p"}\n'
+            )
+        else:
+            stop.set()
+
+    mock_start_policy.side_effect = side_effect
+
+    run_cycles(cfg, 2, RunOptions(interval=0), stop)
+
+    assert cycles == [["router1"], ["router1", "router2"]]
+
+
+def test_start_agent_with_interval(mock_client):
+    """Ensure an interval runs the policies in cycles."""
+    cfg = MagicMock()
+    options = RunOptions(interval=60)
+    with patch("diode_napalm.cli.cli.run_cycles") as mock_run_cycles:
+        start_agent(cfg, 3, options)
+    mock_run_cycles.assert_called_once_with(cfg, 3, options)
+
+
+def test_run_driver_collect_only(mock_client, mock_get_network_driver, tmp_path):
+    """Ensure collect-only runs write a snapshot instead of ingesting the data."""
+    info = Napalm(
+        driver="ios",
+        hostname="test_host",
+        username="user",
+        password="pass",
+        timeout=10,
+        optional_args={},
+    )
+    config = DiscoveryConfig(netbox={"site": "test_site"})
+    device = mock_get_network_driver.return_value.return_value.__enter__.return_value
+    device.get_facts.return_value = {"hostname": "test_host"}
+    device.get_interfaces.return_value = {}
+    device.get_interfaces_ip.return_value = {}
+
+    run_driver(info, config, RunOptions(snapshot_dir=tmp_path))
+
+    mock_client().ingest.assert_not_called()
+    (path,) = tmp_path.iterdir()
+    snapshot = read_snapshot(path)
+    assert snapshot.hostname == "test_host"
+    assert snapshot.data["site"] == "test_site"
+    assert snapshot.data["device"] == {"hostname": "test_host"}
+
+
+def test_run_driver_skips_fresh_getters(mock_client, mock_get_network_driver):
+    """Ensure getters with a refresh interval only run once their output is stale."""
+    info = Napalm(driver="ios", hostname="test_host", username="user", password="pass")
+    config = DiscoveryConfig(
+        netbox={"site": "test_site"},
+        getters=["get_facts", "get_vlans"],
+        refresh={"get_facts": "1h", "get_vlans": "1h"},
+    )
+    device = mock_get_network_driver.return_value.return_value.__enter__.return_value
+    device.get_facts.return_value = {"hostname": "test_host"}
+    device.get_vlans.return_value = {}
+
+    with patch("diode_napalm.cli.cli.getter_cache", GetterCache()):
+        run_driver(info, config)
+        run_driver(info, config)
+
+    device.get_vlans.assert_called_once()
+    mock_get_network_driver.return_value.assert_called_once()
+    mock_client().ingest.assert_called_once()
+
+
+def test_run_driver_new_interfaces_with_cached_facts(
+    mock_client, mock_get_network_driver, tmp_path
+):
+    """Ensure interfaces added since the facts were cached are ingested."""
+    info = Napalm(driver="ios", hostname="test_host", username="user", password="pass")
+    config = DiscoveryConfig(netbox={}, refresh={"get_facts": "1d"})
+    device = mock_get_network_driver.return_value.return_value.__enter__.return_value
+    device.get_interfaces_ip.return_value = {}
+
+    with patch("diode_napalm.cli.cli.getter_cache", GetterCache(tmp_path)):
+        for count in (2, 3):
+            names = [f"Ethernet{i}" for i in range(count)]
+            device.get_facts.return_value = {
+                "hostname": "test_host",
+                "interface_list": names,
+            }
+            device.get_interfaces.return_value = {
+                name: {"is_enabled": True} for name in names
+            }
+            run_driver(info, config)
+
+    data = mock_client().ingest.call_args.args[1]
+    assert [interface.name for interface in data.interfaces] == [
+        "Ethernet0",
+        "Ethernet1",
+        "Ethernet2",
+    ]
+
+
+def test_start_agent_collect_only(mock_client, mock_start_policy, tmp_path):
+    """Ensure collect-only runs do not connect to Diode."""
+    cfg = MagicMock()
+    cfg.policies = {"policy1": MagicMock()}
+
+    start_agent(cfg, 2, RunOptions(snapshot_dir=tmp_path))
+
+    mock_client().init_client.assert_not_called()
+    mock_start_policy.assert_called_once()
+
+
+def test_replay_snapshots(mock_client, tmp_path):
+    """Ensure every snapshot is ingested, skipping unreadable files."""
+    write_snapshot(tmp_path, "router1", {"driver": "ios"})
+    write_snapshot(tmp_path, "router2", {"driver": "eos"})
+    (tmp_path / "broken.json").write_text("{")
+    cfg = MagicMock()
+    cfg.config.target = "grpc://localhost:8081"
+    cfg.config.api_key = "key"
+
+    replay_snapshots(cfg, tmp_path, 2)
+
+    mock_client().init_client.assert_called_once_with(
+        target="grpc://localhost:8081", api_key="key", channel=cfg.config.channel
+    )
+    ingested = sorted(call.args for call in mock_client().ingest.mock_calls)
+    assert ingested == [("router1", {"driver": "ios"}), ("router2", {"driver": "eos"})]
+
+
+def test_main_benchmark(mock_parse_args, mock_parse_config_file, mock_start_agent):
+    """Ensure the benchmark mode does not start the agent."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml",
+        env=None,
+        workers=2,
+        benchmark="captures",
+        benchmark_output="results.json",
+    )
+    with patch("diode_napalm.cli.cli.benchmark_captures") as mock_benchmark:
+        main()
+
+    mock_benchmark.assert_called_once_with(
+        mock_parse_config_file.return_value,
+        "captures",
+        5,
+        "results.json",
+        None,
+    )
+    mock_start_agent.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"benchmark_compare": "results.json"},
+        {"benchmark": "captures", "benchmark_repeat": 0},
+    ],
+)
+def test_main_benchmark_options(mock_parse_args, mock_start_agent, options):
+    """Ensure benchmark options are rejected outside the benchmark mode or invalid."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, **options
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+    mock_start_agent.assert_not_called()
+
+
+def test_main_replay(mock_parse_args, mock_parse_config_file, mock_start_agent):
+    """Ensure the replay mode does not start the agent."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, replay="snapshots"
+    )
+    with patch("diode_napalm.cli.cli.replay_snapshots") as mock_replay:
+        main()
+
+    mock_replay.assert_called_once_with(
+        mock_parse_config_file.return_value, "snapshots", 2
+    )
+    mock_start_agent.assert_not_called()
+
+
+def test_start_agent_ledger_and_rerun_failed(mock_client, tmp_path):
+    """Ensure outcomes are written to the ledger and only failures are rerun."""
+    cfg = MagicMock()
+    cfg.policies = {
+        "policy": Policy(
+            config=DiscoveryConfig(netbox={}),
+            data=[
+                Napalm(hostname=hostname, username="user", password="pass")
+                for hostname in ("router1", "router2", "router3")
+            ],
+        )
+    }
+    ledger = tmp_path / "ledger.json"
+
+    def fail_router2(info, config, options, outcome):
+        if info.hostname == "router2":
+            raise TimeoutError("connection timed out")
+        outcome.entities = 3
+
+    with (
+        patch("diode_napalm.cli.cli.run_driver", side_effect=fail_router2),
+        patch("diode_napalm.cli.cli.preload_drivers"),
+    ):
+        start_agent(cfg, 2, RunOptions(ledger=ledger))
+
+    report = read_ledger(ledger)
+    assert report.summary == {"success": 2, "failed": 1}
+    assert report.failed() == {("policy", "router2")}
+
+    with (
+        patch("diode_napalm.cli.cli.run_driver", return_value=False) as mock_run_driver,
+        patch("diode_napalm.cli.cli.preload_drivers"),
+    ):
+        start_agent(cfg, 2, RunOptions(ledger=ledger, rerun_failed=True))
+
+    (call,) = mock_run_driver.mock_calls
+    assert call.args[0].hostname == "router2"
+    report = read_ledger(ledger)
+    assert report.summary == {"success": 3}
+    assert len(report.devices) == 3
+
+
+def test_main_rerun_failed_requires_ledger(mock_parse_args, mock_start_agent):
+    """Ensure --rerun-failed is rejected without a ledger."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, rerun_failed=True
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+    mock_start_agent.assert_not_called()
+
+
+def test_policy_drivers():
+    """Ensure drivers of inline devices and profiles are preloaded."""
+    cfg = MagicMock()
+    cfg.policies = {
+        "policy": Policy(
+            config=DiscoveryConfig(netbox={}),
+            profiles={"junos": {"driver": "junos", "username": "u", "password": "p"}},
+            data=[
+                {
+                    "hostname": "router1",
+                    "username": "u",
+                    "password": "p",
+                    "driver": "ios",
+                },
+                {"hostname": "router2", "profile": "junos"},
+            ],
+        )
+    }
+    supported = ["eos", "ios", "junos", "nxos"]
+    with patch("diode_napalm.cli.cli.get_supported_drivers", return_value=supported):
+        assert policy_drivers(cfg) == ["ios", "junos"]
+
+        cfg.policies["policy"].data.append(
+            Napalm(hostname="router3", username="u", password="p")
+        )
+        assert policy_drivers(cfg) == supported
+
+
+def test_start_worker_polls_each_device_once(tmp_path):
+    """Ensure a worker taking over a shard skips the devices already polled."""
+    cfg = MagicMock()
+    cfg.policies = {
+        "policy": Policy(
+            config=DiscoveryConfig(netbox={}),
+            data=[
+                Napalm(hostname=f"router{i}", username="user", password="pass")
+                for i in range(20)
+            ],
+        )
+    }
+    store = tmp_path / "leases.db"
+    coordinator = SQLiteLeaseStore(store)
+    cycle = coordinator.open_cycle(4)
+    # A worker died after polling one device of the first shard
+    dead = coordinator.claim("dead", 0.05)
+    polled = next(
+        f"policy/router{i}"
+        for i in range(20)
+        if dead.owns(device_key("policy", f"router{i}"))
+    )
+    assert coordinator.claim_device(dead, polled)
+    time.sleep(0.1)
+    stop = threading.Event()
+
+    with (
+        patch("diode_napalm.cli.cli.run_driver", return_value=False) as mock_run_driver,
+        patch(
+            "diode_napalm.cli.cli.finish_ledger", side_effect=lambda options: stop.set()
+        ),
+    ):
+        options = RunOptions(lease_store=str(store), role="worker", worker_id="a")
+        start_worker(cfg, 2, options, stop)
+
+    hostnames = sorted(call.args[0].hostname for call in mock_run_driver.mock_calls)
+    assert hostnames == sorted(
+        f"router{i}" for i in range(20) if f"policy/router{i}" != polled
+    )
+    assert coordinator.progress(cycle).completed == 4
+    coordinator.close()
+
+
+def test_main_role_requires_lease_store(mock_parse_args, mock_start_agent):
+    """Ensure --role is rejected without a lease store."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, role="worker"
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+    mock_start_agent.assert_not_called()
+
+
+def test_start_policy_shard():
+    """Ensure each shard polls a distinct part of the devices."""
+    cfg = Policy(
+        config=DiscoveryConfig(netbox={}),
+        data=[
+            Napalm(hostname=f"router{i}", username="user", password="pass")
+            for i in range(30)
+        ],
+    )
+    polled = []
+    with patch(
+        "diode_napalm.cli.cli.run_device",
+        side_effect=lambda name, info, config, options: polled.append(
+            (options.shard[0], info.hostname)
+        ),
+    ):
+        for index in range(3):
+            start_policy("policy", cfg, 2, options=RunOptions(shard=(index, 3)))
+
+    assert sorted(hostname for _, hostname in polled) == sorted(
+        f"router{i}" for i in range(30)
+    )
+    assert {index for index, _ in polled} == {0, 1, 2}
+
+
+@pytest.mark.parametrize("value", ["1/2", "0/1"])
+def test_shard_arg(value):
+    """Ensure valid shard arguments are parsed."""
+    index, count = value.split("/")
+    assert shard_arg(value) == (int(index), int(count))
+
+
+@pytest.mark.parametrize("value", ["2/2", "-1/2", "1", "a/b", "0/0"])
+def test_shard_arg_invalid(value):
+    """Ensure invalid shard arguments are rejected."""
+    with pytest.raises(argparse.ArgumentTypeError):
+        shard_arg(value)
+
+
+def test_run_driver_isolated_session(
+    mock_client, mock_get_network_driver, mock_discover_device_driver
+):
+    """Ensure isolated sessions send back the compact data and the getters to cache."""
+    info = Napalm(hostname="test_host", username="user", password="pass")
+    config = DiscoveryConfig(
+        netbox={"site": "test_site"},
+        getters=["get_facts", "get_vlans"],
+        refresh={"get_vlans": "1h"},
+    )
+    mock_discover_device_driver.return_value = "ios"
+    device = mock_get_network_driver.return_value.return_value.__enter__.return_value
+    device.get_facts.return_value = {"hostname": "test_host", "interface_list": []}
+    device.get_vlans.return_value = {"10": {"name": "users", "interfaces": []}}
+    cache = GetterCache()
+    outcome = DeviceOutcome(policy="policy", hostname="test_host")
+
+    with (
+        patch("diode_napalm.cli.cli.process_pool") as mock_pool,
+        patch("diode_napalm.cli.cli.getter_cache", cache),
+    ):
+        mock_pool.enabled = True
+        mock_pool.call.side_effect = lambda func, *args: func(*args)
+        run_driver(info, config, outcome=outcome)
+
+    assert mock_pool.call.call_args.args[0] is collect_in_process
+    assert info.driver == outcome.driver == "ios"
+    assert set(outcome.timings) == {"discover", "collect", "ingest"}
+    hostname, data = mock_client().ingest.call_args.args
+    assert isinstance(data, CollectedData)
+    assert data.device.site == "test_site"
+    assert set(cache.get("test_host")) == {"get_vlans"}
+
+
+def test_start_agent_isolated_sessions(mock_client, mock_start_policy):
+    """Ensure the session process pool is configured for the run and closed after."""
+    cfg = MagicMock()
+    cfg.policies = {"policy1": MagicMock()}
+    options = RunOptions(
+        isolate_sessions=True, max_tasks_per_child=50, max_child_rss=1 << 30
+    )
+
+    with (
+        patch("diode_napalm.cli.cli.process_pool") as mock_pool,
+        patch("diode_napalm.cli.cli.preload_drivers") as mock_preload,
+    ):
+        start_agent(cfg, 4, options)
+
+    mock_pool.configure.assert_called_once_with(4, 50, 1 << 30)
+    mock_pool.close.assert_called_once()
+    mock_preload.assert_not_called()
+    mock_start_policy.assert_called_once()
+
+
+def test_run_driver_hands_data_to_pipeline(
+    mock_client, mock_get_network_driver, mock_discover_device_driver
+):
+    """Ensure collected data goes through the ingest pipeline once admitted."""
+    info = Napalm(hostname="test_host", username="user", password="pass")
+    config = DiscoveryConfig(netbox={"site": "test_site"})
+    mock_discover_device_driver.return_value = "ios"
+    device = mock_get_network_driver.return_value.return_value.__enter__.return_value
+    device.get_facts.return_value = {"hostname": "test_host", "interface_list": []}
+
+    with (
+        patch("diode_napalm.cli.cli.ingest_pipeline") as mock_pipeline,
+        patch("diode_napalm.cli.cli.run_ledger") as mock_ledger,
+    ):
+        mock_pipeline.enabled = True
+        run_device("policy", info, config)
+
+    mock_pipeline.admit.assert_called_once()
+    hostname, data, outcome = mock_pipeline.submit.call_args.args
+    assert hostname == outcome.hostname == "test_host"
+    assert isinstance(data, CollectedData)
+    mock_client().ingest.assert_not_called()
+    # The pipeline records the outcome once the data is ingested
+    mock_ledger.record.assert_not_called()
+
+
+def test_start_agent_memory_budget(mock_client, mock_start_policy):
+    """Ensure the ingest pipeline is configured for the run and closed after."""
+    cfg = MagicMock()
+    cfg.policies = {"policy1": MagicMock()}
+
+    with (
+        patch("diode_napalm.cli.cli.ingest_pipeline") as mock_pipeline,
+        patch("diode_napalm.cli.cli.preload_drivers"),
+    ):
+        start_agent(cfg, 4, RunOptions(memory_budget=64 << 20))
+
+    mock_pipeline.configure.assert_called_once_with(mock_client(), 64 << 20)
+    mock_pipeline.close.assert_called_once()
+
+
+def test_main_memory_budget(
+    mock_parse_args, mock_load_dotenv, mock_parse_config_file, mock_start_agent
+):
+    """Ensure the memory budget is given in megabytes on the command line."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=16, memory_budget=256
+    )
+
+    main()
+
+    options = mock_start_agent.call_args.args[2]
+    assert options.memory_budget == 256 * 1024 * 1024
+
+
+def test_main_session_pool_requires_daemon(mock_parse_args, mock_start_agent):
+    """Ensure --session-pool is rejected for one-shot runs."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, session_pool=100
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+    mock_start_agent.assert_not_called()
+
+
+def test_run_driver_pooled_session(
+    mock_client, mock_get_network_driver, mock_discover_device_driver
+):
+    """Ensure getters run on a pooled session when the session pool is enabled."""
+    info = Napalm(hostname="test_host", username="user", password="pass")
+    config = DiscoveryConfig(netbox={"site": "test_site"})
+    mock_discover_device_driver.return_value = "ios"
+    device = MagicMock()
+    device.get_facts.return_value = {"hostname": "test_host", "interface_list": []}
+
+    with patch("diode_napalm.cli.cli.session_pool") as mock_pool:
+        mock_pool.enabled = True
+        mock_pool.run.side_effect = lambda info, np_driver, func: func(device)
+        run_driver(info, config)
+
+    mock_get_network_driver.return_value.assert_not_called()
+    device.get_facts.assert_called_once()
+    mock_client().ingest.assert_called_once()
+
+
+def test_start_agent_session_pool(mock_client):
+    """Ensure pooled sessions are kept for two intervals by default and closed after."""
+    cfg = MagicMock()
+    cfg.policies = {"policy1": MagicMock()}
+    options = RunOptions(session_pool=100, role="worker", lease_store="leases.db")
+
+    with (
+        patch("diode_napalm.cli.cli.session_pool") as mock_pool,
+        patch("diode_napalm.cli.cli.preload_drivers"),
+        patch("diode_napalm.cli.cli.run_policies"),
+    ):
+        start_agent(cfg, 4, options)
+        start_agent(cfg, 4, RunOptions(session_pool=10, interval=300))
+
+    assert mock_pool.configure.mock_calls[0].args == (100, DEFAULT_IDLE_TIMEOUT)
+    assert mock_pool.configure.mock_calls[1].args == (10, 600)
+    assert mock_pool.close.call_count == 2
+
+
+def test_start_agent_incremental(mock_client, tmp_path):
+    """Ensure fingerprints are kept in the cache directory and dropped after the run."""
+    cfg = MagicMock()
+    cfg.policies = {"policy1": MagicMock()}
+
+    with (
+        patch("diode_napalm.cli.cli.fingerprint_store") as mock_store,
+        patch("diode_napalm.cli.cli.preload_drivers"),
+        patch("diode_napalm.cli.cli.run_policies"),
+    ):
+        start_agent(cfg, 4, RunOptions(incremental=True, cache_dir=tmp_path))
+
+    mock_store.configure.assert_called_once_with(True, tmp_path / "fingerprints")
+    mock_store.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "options",
+    [{}, {"interval": 60, "replay": "snapshots"}],
+)
+def test_main_incremental_requires_state(mock_parse_args, mock_start_agent, options):
+    """Ensure --incremental is rejected when no poll can be diffed against a previous one."""
+    mock_parse_args.return_value = cli_args(
+        config="config.yaml", env=None, workers=2, incremental=True, **options
+    )
+
+    with pytest.raises(SystemExit):
+        main()
+    mock_start_agent.assert_not_called()
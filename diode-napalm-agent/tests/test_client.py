@@ -2,11 +2,26 @@
 # Copyright 2024 NetBox Labs Inc
 """NetBox Labs - Client Unit Tests."""
 
-from unittest.mock import patch
+from concurrent import futures
+from unittest.mock import MagicMock, patch
 
+import grpc
 import pytest
+from netboxlabs.diode.sdk.diode.v1 import ingester_pb2, ingester_pb2_grpc
 
-from diode_napalm.client import Client
+from diode_napalm.changes import fingerprint_store
+from diode_napalm.client import (
+    COMPRESSION,
+    Client,
+    IngestionError,
+    channel_options,
+    create_channel,
+    root_certificates,
+)
+from diode_napalm.collected import CollectedData
+from diode_napalm.ledger import DeviceOutcome, run_ledger
+from diode_napalm.parser import ChannelConfig
+from diode_napalm.pipeline import IngestPipeline
 from diode_napalm.translate import translate_data
 
 
@@ -95,11 +110,12 @@ def test_ingest_failure(mock_diode_client_class, sample_data):
     with patch(
         "diode_napalm.client.translate_data", return_value=translate_data(sample_data)
     ) as mock_translate_data:
-        client.ingest(hostname, sample_data)
+        with pytest.raises(IngestionError, match="Error1") as excinfo:
+            client.ingest(hostname, sample_data)
         mock_translate_data.assert_called_once_with(sample_data)
         mock_diode_instance.ingest.assert_called_once()
 
-    assert len(mock_diode_instance.ingest.return_value.errors) > 0
+    assert excinfo.value.errors == ["Error1", "Error2"]
 
 
 def test_ingest_without_initialization():
@@ -108,3 +124,187 @@ def test_ingest_without_initialization():
     client = Client()
     with pytest.raises(ValueError, match="Diode client not initialized"):
         client.ingest("", {})
+
+
+class RecordingIngester(ingester_pb2_grpc.IngesterServiceServicer):
+    """Ingester service recording the requests it receives."""
+
+    def __init__(self):
+        """Initialize with no request received."""
+        self.requests = []
+        self.errors = []
+
+    def Ingest(self, request, context):
+        """Record the request and its metadata."""
+        self.requests.append((request, dict(context.invocation_metadata())))
+        return ingester_pb2.IngestResponse(errors=self.errors)
+
+
+@pytest.fixture
+def ingester():
+    """Run an in-process Diode ingester service."""
+    servicer = RecordingIngester()
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=2))
+    ingester_pb2_grpc.add_IngesterServiceServicer_to_server(servicer, server)
+    port = server.add_insecure_port("localhost:0")
+    server.start()
+    servicer.target = f"grpc://localhost:{port}"
+    yield servicer
+    server.stop(None)
+
+
+def test_channel_options():
+    """Ensure keepalive and message size settings are turned into channel arguments."""
+    diode_client = MagicMock()
+    options = dict(
+        channel_options(
+            diode_client,
+            ChannelConfig(keepalive="1m", max_message_size=16 * 1024 * 1024),
+        )
+    )
+
+    assert options["grpc.keepalive_time_ms"] == 60000
+    assert options["grpc.keepalive_timeout_ms"] == 20000
+    assert options["grpc.max_send_message_length"] == 16 * 1024 * 1024
+    assert options["grpc.max_receive_message_length"] == 16 * 1024 * 1024
+    assert options["grpc.use_local_subchannel_pool"] == 1
+
+
+def test_create_channel_compression():
+    """Ensure the configured compression and path interceptor are applied."""
+    diode_client = MagicMock(tls_verify=False, target="localhost:8081", path="/diode")
+    with patch("diode_napalm.client.grpc") as mock_grpc:
+        create_channel(diode_client, ChannelConfig(compression="deflate"))
+
+    _, kwargs = mock_grpc.insecure_channel.call_args
+    assert kwargs["compression"] == COMPRESSION["deflate"]
+    mock_grpc.intercept_channel.assert_called_once()
+
+
+def test_create_channel_tls_roots():
+    """Ensure TLS channels trust the same CA bundle as the Diode SDK."""
+    diode_client = MagicMock(tls_verify=True, target="diode.example.com:443", path="")
+    with patch("diode_napalm.client.grpc") as mock_grpc:
+        create_channel(diode_client, ChannelConfig(compression="gzip"))
+
+    mock_grpc.ssl_channel_credentials.assert_called_once_with(
+        root_certificates=root_certificates()
+    )
+    assert b"BEGIN CERTIFICATE" in root_certificates()
+
+
+def test_init_client_closes_previous_pool():
+    """Ensure the pooled channels are closed when the client is initialized again."""
+    Client._instance = None
+    client = Client()
+    channel = ChannelConfig(compression="gzip", pool_size=2)
+    with patch("diode_napalm.client.create_channel") as mock_create_channel:
+        client.init_client(
+            target="grpc://localhost:8081", api_key="dummy_api_key", channel=channel
+        )
+        client.init_client(target="grpc://localhost:8081", api_key="dummy_api_key")
+
+    assert mock_create_channel.return_value.close.call_count == 2
+    assert client._stubs is None
+
+
+def test_ingest_with_channel_pool(ingester, sample_data):
+    """Ensure tuned channels send compressed requests with the client metadata."""
+    Client._instance = None
+    client = Client()
+    client.init_client(
+        target=ingester.target,
+        api_key="dummy_api_key",
+        channel=ChannelConfig(compression="gzip", keepalive="30s", pool_size=2),
+    )
+
+    client.ingest("router1", sample_data)
+    client.ingest("router1", sample_data)
+
+    assert len(ingester.requests) == 2
+    request, metadata = ingester.requests[0]
+    assert request.producer_app_name == "diode-napalm-agent"
+    assert request.stream == "latest"
+    assert request.entities[0].device.name == "router1"
+    assert metadata["diode-api-key"] == "dummy_api_key"
+    Client._instance = None
+
+
+@pytest.mark.parametrize("channel", [None, ChannelConfig(pool_size=2)])
+def test_send_serialized_request(ingester, sample_data, channel):
+    """Ensure serialized requests are sent with the client metadata, pooled or not."""
+    Client._instance = None
+    client = Client()
+    client.init_client(target=ingester.target, api_key="dummy_api_key", channel=channel)
+
+    request, entities = client.serialize("router1", sample_data)
+    client.send("router1", request)
+
+    assert entities == len(translate_data(sample_data))
+    (received, metadata), *_ = ingester.requests
+    assert received.SerializeToString() == request
+    assert len(received.entities) == entities
+    assert metadata["diode-api-key"] == "dummy_api_key"
+    Client._instance = None
+
+
+def test_send_without_initialization():
+    """Test sending without client initialization raises ValueError."""
+    Client._instance = None
+    client = Client()
+    with pytest.raises(ValueError, match="Diode client not initialized"):
+        client.send("router1", b"")
+
+
+def test_ingest_incremental(ingester, sample_data):
+    """Ensure unchanged polls are not sent once a poll was ingested."""
+    Client._instance = None
+    client = Client()
+    client.init_client(target=ingester.target, api_key="dummy_api_key")
+    fingerprint_store.configure(True)
+    try:
+        assert client.ingest("router1", sample_data) > 0
+        assert client.ingest("router1", sample_data) == 0
+        assert client.serialize("router1", sample_data) == (b"", 0)
+        client.send("router1", b"")
+
+        sample_data["device"]["serial_number"] = "987654321"
+        request, entities = client.serialize("router1", sample_data)
+        client.send("router1", request)
+    finally:
+        fingerprint_store.close()
+        Client._instance = None
+
+    assert len(ingester.requests) == 2
+    (changed,) = ingester.requests[1][0].entities
+    assert changed.device.serial == "987654321"
+
+
+@pytest.mark.parametrize("pipelined", [False, True])
+def test_rejected_ingestion_recorded_as_failed(ingester, sample_data, pipelined):
+    """Ensure devices whose entities Diode rejects are failed in the run ledger."""
+    Client._instance = None
+    client = Client()
+    client.init_client(target=ingester.target, api_key="dummy_api_key")
+    ingester.errors = ["invalid interface speed"]
+    run_ledger.start()
+    outcome = DeviceOutcome(policy="policy", hostname="router1")
+    try:
+        if pipelined:
+            pipeline = IngestPipeline()
+            pipeline.configure(client, 1 << 20)
+            pipeline.submit("router1", CollectedData.from_napalm(sample_data), outcome)
+            pipeline.join()
+            pipeline.close()
+        else:
+            try:
+                client.ingest("router1", sample_data)
+            except Exception as e:
+                outcome.fail(e)
+            run_ledger.record(outcome)
+    finally:
+        Client._instance = None
+
+    (recorded,) = run_ledger.finish().devices
+    assert (recorded.status, recorded.error_class) == ("failed", "IngestionError")
+    assert "invalid interface speed" in recorded.error
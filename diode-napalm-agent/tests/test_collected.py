@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Collected Data Unit Tests."""
+
+import json
+
+import pytest
+
+from diode_napalm.collected import CollectedData, intern_int, intern_str
+from diode_napalm.translate import translate_data
+
+
+@pytest.fixture
+def sample_data():
+    """Sample collected data for testing."""
+    return {
+        "driver": "ios",
+        "site": "New York",
+        "device": {
+            "hostname": "router1",
+            "model": "ISR4451",
+            "vendor": "Cisco",
+            "serial_number": "123456789",
+            "interface_list": ["GigabitEthernet0/0", "GigabitEthernet0/1"],
+        },
+        "interface": {
+            "GigabitEthernet0/0": {
+                "is_enabled": True,
+                "mtu": 1500,
+                "mac_address": "00:1C:58:29:4A:71",
+                "speed": 1000.0,
+                "description": "Uplink Interface",
+            },
+            "Loopback99": {"is_enabled": True, "mtu": 1514, "speed": 0},
+        },
+        "interface_ip": {
+            "GigabitEthernet0/0": {
+                "ipv4": {"192.0.2.1": {"prefix_length": 24}},
+                "ipv6": {"2001:db8::1": {"prefix_length": 64}},
+            },
+            "GigabitEthernet0/1": {},
+        },
+        "vlan": {10: {"name": "users", "interfaces": ["GigabitEthernet0/0"]}},
+        "lldp_neighbors": {
+            "GigabitEthernet0/0": [
+                {"remote_system_name": "switch1", "remote_port": "Ethernet1"}
+            ]
+        },
+        "arp_table": [{"interface": "GigabitEthernet0/0", "ip": "192.0.2.10"}],
+        "environment": {"cpu": {}},
+    }
+
+
+def test_intern_values():
+    """Ensure equal values built separately share the same instance."""
+    assert intern_str("".join(["Cis", "co"])) is intern_str("Cisco")
+    assert intern_int(float(10**6)) is intern_int(10**6)
+    assert intern_str(None) is None
+    assert intern_int(None) is None
+
+
+def test_collected_data_from_napalm(sample_data):
+    """Ensure only the data read by translation is kept."""
+    collected = CollectedData.from_napalm(sample_data)
+
+    assert collected.device.hostname == "router1"
+    assert collected.device.driver == "ios"
+    assert collected.device.site == "New York"
+    assert [interface.name for interface in collected.interfaces] == [
+        "GigabitEthernet0/0"
+    ]
+    assert collected.interfaces[0].speed == 1000
+    assert collected.interfaces[0].mode == "access"
+    assert collected.interfaces_ip == {
+        "GigabitEthernet0/0": (("192.0.2.1", 24), ("2001:db8::1", 64))
+    }
+    assert collected.neighbors[0].system_name == "switch1"
+    assert collected.arp_table[0].ip == "192.0.2.10"
+    assert not hasattr(collected, "__dict__")
+    assert "driver" not in sample_data["device"]
+
+
+def test_collected_data_without_facts():
+    """Ensure nothing is translated when facts were not collected."""
+    collected = CollectedData.from_napalm({"driver": "ios", "interface": {}})
+
+    assert collected.device is None
+    assert translate_data(collected) == []
+
+
+def test_translate_collected_data(sample_data):
+    """Ensure translating the compact data matches translating the raw data."""
+    raw = json.loads(json.dumps(sample_data))
+    expected = [entity.SerializeToString() for entity in translate_data(raw)]
+
+    entities = translate_data(CollectedData.from_napalm(sample_data))
+
+    assert [entity.SerializeToString() for entity in entities] == expected
+    assert len(entities) == 9
+
+
+def test_collected_data_approximate_size(sample_data):
+    """Ensure the size of collected data grows with what it holds."""
+    small = CollectedData.from_napalm({"device": {"hostname": "router1"}})
+    assert (
+        0
+        < small.approximate_size()
+        < CollectedData.from_napalm(sample_data).approximate_size()
+    )
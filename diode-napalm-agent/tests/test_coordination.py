@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Coordination Unit Tests."""
+
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from diode_napalm.coordination import (
+    LeaseKeeper,
+    ShardLease,
+    SQLiteLeaseStore,
+    create_lease_store,
+    device_key,
+    device_shard,
+    jump_hash,
+    run_coordinator,
+    run_worker,
+)
+
+
+@pytest.fixture
+def store(tmp_path):
+    """SQLite lease store in a temporary directory."""
+    store = SQLiteLeaseStore(tmp_path / "leases.db")
+    yield store
+    store.close()
+
+
+def test_device_shard_is_stable():
+    """Ensure devices are spread over every shard the same way on each call."""
+    keys = [device_key("policy", f"router{i}") for i in range(1000)]
+    shards = [device_shard(key, 8) for key in keys]
+    assert shards == [device_shard(key, 8) for key in keys]
+    assert set(shards) == set(range(8))
+
+
+def test_jump_hash_moves_few_keys():
+    """Ensure growing the number of buckets only moves keys to the new bucket."""
+    keys = [key * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF for key in range(10000)]
+    before = [jump_hash(key, 10) for key in keys]
+    after = [jump_hash(key, 11) for key in keys]
+
+    moved = [new for old, new in zip(before, after, strict=True) if old != new]
+    assert set(moved) == {10}
+    assert 700 < len(moved) < 1100
+    assert all(0 <= bucket < 10 for bucket in before)
+
+
+def test_claim_leases_each_shard_once(store):
+    """Ensure concurrent workers lease distinct shards of the latest cycle."""
+    cycle = store.open_cycle(2)
+
+    first = store.claim("worker-a", 60)
+    second = store.claim("worker-b", 60)
+
+    assert (first.cycle, first.shard, first.shards) == (cycle, 0, 2)
+    assert (second.cycle, second.shard) == (cycle, 1)
+    assert store.claim("worker-c", 60) is None
+
+    store.complete(first)
+    progress = store.progress(cycle)
+    assert (progress.completed, progress.leased, progress.pending) == (1, 1, 0)
+
+
+def test_expired_lease_is_taken_over(store):
+    """Ensure the shard of a worker that stopped renewing goes to another worker."""
+    store.open_cycle(1)
+    lost = store.claim("worker-a", 0.05)
+    assert store.claim_device(lost, "policy/router1")
+    time.sleep(0.1)
+
+    taken = store.claim("worker-b", 60)
+
+    assert taken.shard == lost.shard
+    assert store.polled(taken) == {"policy/router1"}
+    assert not store.renew(lost, 60)
+    assert store.renew(taken, 60)
+
+
+def test_claim_device_once_per_cycle(store):
+    """Ensure a device is claimed once, and not after the lease was lost."""
+    store.open_cycle(1)
+    lost = store.claim("worker-a", 0.05)
+    assert store.claim_device(lost, "policy/router1")
+    time.sleep(0.1)
+    assert not store.claim_device(lost, "policy/router2")
+
+    taken = store.claim("worker-b", 60)
+    assert not store.claim_device(taken, "policy/router1")
+    assert store.claim_device(taken, "policy/router2")
+    assert store.polled(taken) == {"policy/router1", "policy/router2"}
+
+
+def test_open_cycle_drops_old_cycles(store):
+    """Ensure only the latest cycles are kept in the database."""
+    for _ in range(4):
+        cycle = store.open_cycle(2)
+    lease = store.claim("worker-a", 60)
+
+    assert lease.cycle == cycle
+    assert store.progress(cycle - SQLiteLeaseStore.KEEP_CYCLES).pending == 0
+
+
+def test_create_lease_store(tmp_path):
+    """Ensure lease stores are created from their URL."""
+    for url in (f"sqlite://{tmp_path}/a.db", str(tmp_path / "b.db")):
+        store = create_lease_store(url)
+        assert isinstance(store, SQLiteLeaseStore)
+        store.close()
+    with pytest.raises(ValueError, match="unsupported lease store 'etcd'"):
+        create_lease_store("etcd://localhost:2379")
+
+
+def test_lease_keeper_flags_lost_lease():
+    """Ensure a lease that can't be renewed is flagged as lost."""
+    store = MagicMock()
+    store.renew.return_value = False
+    lease = ShardLease(cycle=1, shards=1, shard=0, worker="worker-a")
+
+    with LeaseKeeper(store, lease, 0.03) as keeper:
+        assert keeper.lost.wait(1)
+
+
+def test_run_worker_polls_every_shard(store):
+    """Ensure workers poll every shard of a cycle once and complete them."""
+    cycle = store.open_cycle(4)
+    stop = threading.Event()
+    polled = []
+
+    def finish_cycle(finished):
+        assert finished == cycle
+        stop.set()
+
+    run_worker(
+        store,
+        "worker-a",
+        lambda lease, keeper: polled.append(lease.shard),
+        stop,
+        on_cycle=finish_cycle,
+    )
+
+    assert polled == [0, 1, 2, 3]
+    assert store.progress(cycle).completed == 4
+
+
+def test_run_worker_retries_failed_shard(store):
+    """Ensure a shard whose polling failed is not completed."""
+    cycle = store.open_cycle(1)
+    stop = threading.Event()
+
+    def fail(lease, keeper):
+        stop.set()
+        raise RuntimeError("inventory unreadable")
+
+    run_worker(store, "worker-a", fail, stop, ttl=0.05)
+    time.sleep(0.1)
+
+    assert store.progress(cycle).completed == 0
+    assert store.claim("worker-b", 60).shard == 0
+
+
+def test_run_coordinator_opens_cycles():
+    """Ensure the coordinator reports the unfinished cycle before opening the next."""
+    store = MagicMock()
+    stop = threading.Event()
+    store.open_cycle.side_effect = [1, 2]
+    store.progress.return_value.completed = 1
+    store.progress.side_effect = lambda cycle: stop.set() or store.progress.return_value
+
+    run_coordinator(store, 4, 0, stop)
+
+    assert store.open_cycle.call_count == 2
+    store.progress.assert_called_once_with(1)
@@ -2,6 +2,7 @@
 # Copyright 2024 NetBox Labs Inc
 """NetBox Labs - Discovery Unit Tests."""
 
+import json
 import logging
 from types import SimpleNamespace
 from unittest.mock import MagicMock, patch
@@ -10,8 +11,12 @@ import pytest
 
 from diode_napalm.discovery import (
     discover_device_driver,
+    get_network_driver,
+    get_supported_drivers,
     napalm_driver_list,
+    preload_drivers,
     set_napalm_logs_level,
+    site_packages_fingerprint,
     supported_drivers,
 )
 
@@ -117,6 +122,30 @@ def test_discover_device_driver_exception(mock_get_network_driver):
     assert driver == "", "Expected no driver to be found due to exception"
 
 
+def test_discover_device_driver_keeps_driver_log_levels(mock_get_network_driver):
+    """Ensure discovery silences driver logs without changing global logger levels."""
+    napalm_logger = logging.getLogger("napalm")
+    level = napalm_logger.level
+    seen = []
+
+    def connect(*args):
+        seen.append(napalm_logger.level)
+        raise Exception("Connection failed")
+
+    mock_get_network_driver.return_value.side_effect = connect
+    info = SimpleNamespace(
+        hostname="testhost",
+        username="testuser",
+        password="testpass",
+        timeout=10,
+        optional_args={},
+    )
+
+    assert discover_device_driver(info) == ""
+    assert set(seen) == {level}
+    assert napalm_logger.level == level
+
+
 def test_discover_device_driver_mixed_results(mock_get_network_driver):
     """
     Test discovery with mixed results from drivers.
@@ -180,3 +209,106 @@ def test_set_napalm_logs_level(mock_loggers):
 
     for logger in mock_loggers.values():
         logger.setLevel.assert_called_once_with(logging.DEBUG)
+
+
+@pytest.fixture
+def driver_cache_dir(tmp_path, monkeypatch):
+    """Point the driver cache at a temporary directory and reset the memoized list."""
+    monkeypatch.setenv("DIODE_NAPALM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr("diode_napalm.discovery._supported_drivers", None)
+    return tmp_path
+
+
+def test_get_supported_drivers_writes_cache(
+    driver_cache_dir, mock_importlib_metadata_distributions
+):
+    """Ensure the driver list is enumerated once and persisted to disk."""
+    mock_importlib_metadata_distributions.return_value = [
+        MagicMock(metadata={"Name": "napalm-srl"})
+    ]
+
+    assert get_supported_drivers() == ["ios", "eos", "junos", "nxos", "srl"]
+    assert get_supported_drivers() == ["ios", "eos", "junos", "nxos", "srl"]
+    mock_importlib_metadata_distributions.assert_called_once()
+
+    cached = json.loads((driver_cache_dir / "drivers.json").read_text())
+    assert cached["fingerprint"] == site_packages_fingerprint()
+    assert cached["drivers"] == ["ios", "eos", "junos", "nxos", "srl"]
+
+
+def test_get_supported_drivers_reads_cache(
+    driver_cache_dir, mock_importlib_metadata_distributions
+):
+    """Ensure a cache matching the site-packages fingerprint skips enumeration."""
+    (driver_cache_dir / "drivers.json").write_text(
+        json.dumps({"fingerprint": site_packages_fingerprint(), "drivers": ["ios"]})
+    )
+
+    assert get_supported_drivers() == ["ios"]
+    mock_importlib_metadata_distributions.assert_not_called()
+
+
+def test_get_supported_drivers_stale_cache(
+    driver_cache_dir, mock_importlib_metadata_distributions
+):
+    """Ensure a cache with a different fingerprint is ignored and rewritten."""
+    (driver_cache_dir / "drivers.json").write_text(
+        json.dumps({"fingerprint": "stale", "drivers": ["ios"]})
+    )
+    mock_importlib_metadata_distributions.return_value = []
+
+    assert get_supported_drivers() == ["ios", "eos", "junos", "nxos"]
+    mock_importlib_metadata_distributions.assert_called_once()
+    cached = json.loads((driver_cache_dir / "drivers.json").read_text())
+    assert cached["fingerprint"] == site_packages_fingerprint()
+
+
+@pytest.fixture
+def driver_classes(monkeypatch):
+    """Start with an empty NAPALM driver class cache."""
+    classes = {}
+    monkeypatch.setattr("diode_napalm.discovery._driver_classes", classes)
+    return classes
+
+
+def test_get_network_driver_imports_napalm_lazily(driver_classes):
+    """Ensure the NAPALM driver class is resolved through napalm on demand."""
+    with patch("napalm.get_network_driver") as mock_napalm:
+        assert get_network_driver("eos") is mock_napalm.return_value
+        mock_napalm.assert_called_once_with("eos")
+
+
+def test_get_network_driver_caches_classes(driver_classes):
+    """Ensure driver classes are resolved once per process."""
+    with patch("napalm.get_network_driver") as mock_napalm:
+        first = get_network_driver("eos")
+        assert get_network_driver("eos") is first
+        mock_napalm.assert_called_once_with("eos")
+    assert driver_classes == {"eos": first}
+
+
+def test_preload_drivers(driver_classes):
+    """Ensure drivers are imported ahead of the run and failures are reported."""
+
+    def napalm_get_network_driver(driver):
+        if driver == "missing":
+            raise ModuleNotFoundError("No module named 'napalm_missing'")
+        return f"{driver}-class"
+
+    driver_classes["ios"] = "ios-class"
+    with patch(
+        "napalm.get_network_driver", side_effect=napalm_get_network_driver
+    ) as mock_napalm:
+        errors = preload_drivers(["ios", "eos", "junos", "eos", "missing"], 2)
+
+    assert list(errors) == ["missing"]
+    assert sorted(call.args[0] for call in mock_napalm.mock_calls) == [
+        "eos",
+        "junos",
+        "missing",
+    ]
+    assert driver_classes == {
+        "ios": "ios-class",
+        "eos": "eos-class",
+        "junos": "junos-class",
+    }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Getters Unit Tests."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from diode_napalm.getters import GetterCache, GetterStats, collect
+
+
+@pytest.fixture
+def stats():
+    """Replace the global getter statistics with a fresh instance."""
+    with patch("diode_napalm.getters.getter_stats", GetterStats()) as mock:
+        yield mock
+
+
+def test_collect_selected_getters(stats):
+    """Ensure only the selected getters run and their output is keyed for translation."""
+    device = MagicMock()
+    device.get_facts.return_value = {"hostname": "router1"}
+    device.get_vlans.return_value = {1: {"name": "default", "interfaces": []}}
+
+    data, timings = collect(device, "router1", "ios", ["get_facts", "get_vlans"])
+
+    assert data == {
+        "device": {"hostname": "router1"},
+        "vlan": {1: {"name": "default", "interfaces": []}},
+    }
+    assert set(timings) == {"get_facts", "get_vlans"}
+    device.get_interfaces.assert_not_called()
+    assert stats.stats[("ios", "get_facts")][0] == 1
+    assert stats.average("ios", "get_vlans") is not None
+    assert stats.average("eos", "get_vlans") is None
+
+
+def test_collect_optional_getter_failure(stats):
+    """Ensure failures of optional getters are skipped and accounted."""
+    device = MagicMock()
+    device.get_arp_table.side_effect = NotImplementedError
+
+    data, timings = collect(device, "router1", "ios", ["get_facts", "get_arp_table"])
+
+    assert set(data) == {"device"}
+    assert "get_arp_table" in timings
+    assert stats.stats[("ios", "get_arp_table")][1] == 1
+
+
+def test_collect_default_getter_failure(stats):
+    """Ensure failures of the default getters are raised."""
+    device = MagicMock()
+    device.get_interfaces.side_effect = Exception("timeout")
+
+    with pytest.raises(Exception, match="timeout"):
+        collect(device, "router1", "ios", ["get_facts", "get_interfaces"])
+
+
+def test_getter_stats_summary():
+    """Ensure the summary lists the most expensive getters first."""
+    stats = GetterStats()
+    stats.record("ios", "get_facts", 1.0)
+    stats.record("ios", "get_facts", 3.0)
+    stats.record("ios", "get_interfaces_ip", 10.0, failed=True)
+
+    assert stats.average("ios", "get_facts") == 2.0
+    assert stats.summary() == [
+        "ios get_interfaces_ip: 1 calls, 1 failed, avg 10.000s, max 10.000s, total 10.000s",
+        "ios get_facts: 2 calls, 0 failed, avg 2.000s, max 3.000s, total 4.000s",
+    ]
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_getter_cache_plan(tmp_path, persistent):
+    """Ensure fresh getters are served from the cache until their interval expires."""
+    cache = GetterCache(tmp_path if persistent else None)
+    getters = ["get_facts", "get_interfaces", "get_vlans"]
+    refresh = {"get_vlans": 3600}
+
+    assert cache.plan("router1", getters, refresh, 1000.0) == (getters, {})
+    cache.update("router1", {"get_vlans": {"10": {"name": "users"}}}, 1000.0)
+
+    due, cached = cache.plan("router1", getters, refresh, 2000.0)
+    assert due == ["get_facts", "get_interfaces"]
+    assert cached == {"vlan": {"10": {"name": "users"}}}
+
+    due, cached = cache.plan("router1", getters, refresh, 4600.0)
+    assert due == getters
+    assert cached == {}
+    assert cache.plan("router2", getters, refresh, 2000.0) == (getters, {})
+
+
+def test_getter_cache_plan_runs_facts_with_interfaces():
+    """Ensure cached facts are refreshed whenever interfaces are collected."""
+    cache = GetterCache()
+    getters = ["get_facts", "get_interfaces"]
+    refresh = {"get_facts": 86400}
+    cache.update("router1", {"get_facts": {"interface_list": ["Gi0/0"]}}, 1000.0)
+
+    assert cache.plan("router1", getters, refresh, 2000.0) == (getters, {})
+    assert cache.plan("router1", ["get_facts", "get_vlans"], refresh, 2000.0) == (
+        ["get_vlans"],
+        {"device": {"interface_list": ["Gi0/0"]}},
+    )
+
+
+def test_getter_cache_keeps_no_reference_to_output():
+    """Ensure the in-memory cache holds a compressed copy of the getters output."""
+    cache = GetterCache()
+    vlans = {"10": {"name": "users"}}
+    cache.update("router1", {"get_vlans": vlans}, 1000.0)
+    vlans["10"]["name"] = "changed"
+
+    assert isinstance(cache._entries["router1"], bytes)
+    assert cache.get("router1") == {"get_vlans": (1000.0, {"10": {"name": "users"}})}
+
+
+def test_getter_cache_unreadable_file(tmp_path):
+    """Ensure an unreadable cache file is ignored."""
+    cache = GetterCache(tmp_path)
+    (tmp_path / "router1.json.gz").write_text("not gzip")
+
+    assert cache.get("router1") == {}
@@ -0,0 +1,353 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Inventory Unit Tests."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from diode_napalm.inventory import (
+    DirectoryInventory,
+    FileInventory,
+    PolicyInventory,
+    _validate,
+    create_provider,
+    iter_inventory,
+    iter_records,
+    policy_devices,
+)
+from diode_napalm.parser import (
+    ConnectionProfile,
+    DiscoveryConfig,
+    InventorySource,
+    Napalm,
+    ParseException,
+    Policy,
+)
+
+
+@pytest.fixture
+def yaml_inventory(tmp_path):
+    """YAML inventory file with two devices."""
+    path = tmp_path / "devices.yaml"
+    path.write_text("""
+- hostname: router1
+  driver: ios
+  username: admin
+  password: ${ROUTER_PASSWORD}
+- hostname: router2
+  username: admin
+  password: password
+  timeout: 10
+  optional_args:
+    port: 2222
+""")
+    return path
+
+
+def test_iter_inventory_yaml(yaml_inventory):
+    """Ensure devices are read from a YAML list and env vars are resolved."""
+    with patch.dict(os.environ, {"ROUTER_PASSWORD": "secret"}):
+        devices = list(iter_inventory(yaml_inventory))
+
+    assert [device.hostname for device in devices] == ["router1", "router2"]
+    assert devices[0].password == "secret"
+    assert devices[1].timeout == 10
+    assert devices[1].optional_args == {"port": 2222}
+
+
+def test_iter_inventory_is_lazy(yaml_inventory):
+    """Ensure devices are yielded before the whole file is consumed."""
+    devices = iter_inventory(yaml_inventory)
+    assert next(devices).hostname == "router1"
+    assert next(devices).hostname == "router2"
+
+
+def test_iter_inventory_yaml_with_aliases(tmp_path):
+    """Ensure YAML files using anchors and aliases are supported."""
+    path = tmp_path / "devices.yml"
+    path.write_text("""
+- &router1
+  hostname: router1
+  username: admin
+  password: password
+- <<: *router1
+  hostname: router2
+""")
+    devices = list(iter_inventory(path))
+    assert [device.hostname for device in devices] == ["router1", "router2"]
+    assert devices[1].username == "admin"
+
+
+def test_iter_inventory_yaml_not_a_list(tmp_path):
+    """Ensure a YAML inventory must hold a list."""
+    path = tmp_path / "devices.yaml"
+    path.write_text("hostname: router1\n")
+    with pytest.raises(ParseException):
+        list(iter_inventory(path))
+
+
+def test_iter_inventory_jsonl(tmp_path):
+    """Ensure devices are read from JSON lines, skipping invalid lines."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(
+        '{"hostname": "router1", "username": "admin", "password": "password"}\n'
+        "\n"
+        "not json\n"
+        '{"hostname": "router2", "username": "admin", "password": "password"}\n'
+    )
+    devices = list(iter_inventory(path))
+    assert [device.hostname for device in devices] == ["router1", "router2"]
+
+
+def test_iter_inventory_csv(tmp_path):
+    """Ensure devices are read from CSV rows with optional arguments columns."""
+    path = tmp_path / "devices.csv"
+    path.write_text(
+        "hostname,driver,username,password,timeout,optional_args,optional_args.port\n"
+        'router1,eos,admin,password,,"{""transport"": ""https""}",8443\n'
+        "router2,,admin,password,30,,\n"
+    )
+    devices = list(iter_inventory(path))
+
+    assert devices[0] == Napalm(
+        hostname="router1",
+        driver="eos",
+        username="admin",
+        password="password",
+        optional_args={"transport": "https", "port": "8443"},
+    )
+    assert devices[1].driver is None
+    assert devices[1].timeout == 30
+    assert devices[1].optional_args is None
+
+
+def test_iter_inventory_skips_invalid_devices(tmp_path):
+    """Ensure invalid devices are skipped without stopping the stream."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(
+        '{"hostname": "router1", "username": "admin"}\n'
+        '{"hostname": "router2", "username": "admin", "password": "password"}\n'
+    )
+    devices = list(iter_inventory(path))
+    assert [device.hostname for device in devices] == ["router2"]
+
+
+def test_iter_inventory_skips_null_records(tmp_path):
+    """Ensure records that aren't objects are skipped without stopping the stream."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(
+        '{"hostname": "router1", "username": "admin", "password": "password"}\n'
+        "null\n"
+        "42\n"
+        '{"hostname": "router2", "username": "admin", "password": "password"}\n'
+    )
+    devices = list(iter_inventory(path))
+    assert [device.hostname for device in devices] == ["router1", "router2"]
+
+
+def test_iter_records_unsupported_format(tmp_path):
+    """Ensure unsupported inventory formats are rejected."""
+    with pytest.raises(ParseException):
+        iter_records(tmp_path / "devices.txt")
+
+
+def test_policy_devices(yaml_inventory):
+    """Ensure inline devices are followed by the inventory devices."""
+    policy = Policy(
+        config=DiscoveryConfig(netbox={"site": "New York"}),
+        data=[Napalm(hostname="router0", username="admin", password="password")],
+        inventory=yaml_inventory,
+    )
+    hostnames = [device.hostname for device in policy_devices(policy)]
+    assert hostnames == ["router0", "router1", "router2"]
+
+
+def jsonl_device(hostname: str, password: str = "password") -> str:
+    """Build a JSON lines device record."""
+    return (
+        f'{{"hostname": "{hostname}", "username": "admin", "password": "{password}"}}\n'
+    )
+
+
+def test_iter_inventory_netbox_export(tmp_path):
+    """Ensure NetBox exports are mapped to devices using the source defaults."""
+    path = tmp_path / "devices.json"
+    path.write_text("""
+{"results": [
+  {"name": "router1", "primary_ip": {"address": "192.0.2.1/24"},
+   "platform": {"slug": "cisco-ios", "napalm_driver": "ios"}},
+  {"name": "router2", "primary_ip": null, "platform": null}
+]}
+""")
+    source = InventorySource(
+        path=path, defaults={"username": "admin", "password": "password"}
+    )
+    devices = list(iter_inventory(source))
+
+    assert devices[0].hostname == "192.0.2.1"
+    assert devices[0].driver == "ios"
+    assert devices[0].username == "admin"
+    assert devices[1].hostname == "router2"
+    assert devices[1].driver is None
+
+
+def test_iter_inventory_netbox_export_profile(tmp_path):
+    """Ensure connection profiles apply to NetBox export records."""
+    path = tmp_path / "devices.json"
+    path.write_text('[{"hostname": "router1", "profile": "lab"}]')
+    profiles = {
+        "lab": ConnectionProfile(driver="eos", username="admin", password="password")
+    }
+    (device,) = iter_inventory(InventorySource(path=path), profiles)
+
+    assert device.profile == "lab"
+    assert (device.driver, device.username) == ("eos", "admin")
+
+
+def test_file_inventory_reload(tmp_path):
+    """Ensure only added and changed devices are validated again on reload."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(jsonl_device("router1") + jsonl_device("router2"))
+    inventory = FileInventory(path, InventorySource(path=path))
+
+    changes = inventory.reload()
+    assert changes.added == ["router1", "router2"]
+    router1 = next(iter(inventory.devices()))
+
+    assert not inventory.reload()
+
+    path.write_text(
+        jsonl_device("router1")
+        + jsonl_device("router2", "new")
+        + jsonl_device("router3")
+    )
+    with patch("diode_napalm.inventory._validate", wraps=_validate) as mock_validate:
+        changes = inventory.reload()
+
+    assert changes.added == ["router3"]
+    assert changes.changed == ["router2"]
+    assert changes.removed == []
+    assert mock_validate.call_count == 2
+    devices = {device.hostname: device for device in inventory.devices()}
+    assert devices["router1"] is router1
+    assert devices["router2"].password == "new"
+
+    path.write_text(jsonl_device("router3"))
+    changes = inventory.reload()
+    assert sorted(changes.removed) == ["router1", "router2"]
+    assert [device.hostname for device in inventory.devices()] == ["router3"]
+
+
+def test_file_inventory_reload_resolved_hostnames(tmp_path):
+    """Ensure records with env var hostnames are served from cache when unchanged."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(jsonl_device("${ROUTER_HOSTNAME}") + jsonl_device("router2"))
+    inventory = FileInventory(path, InventorySource(path=path))
+
+    with patch.dict(os.environ, {"ROUTER_HOSTNAME": "router1"}):
+        assert inventory.reload().added == ["router1", "router2"]
+        path.write_text(
+            jsonl_device("${ROUTER_HOSTNAME}")
+            + jsonl_device("router2")
+            + jsonl_device("router3")
+        )
+        with patch(
+            "diode_napalm.inventory._validate", wraps=_validate
+        ) as mock_validate:
+            changes = inventory.reload()
+
+    assert changes.added == ["router3"]
+    assert changes.changed == []
+    assert changes.removed == []
+    assert mock_validate.call_count == 1
+
+
+def test_file_inventory_reload_duplicated_cached_hostname(tmp_path, caplog):
+    """Ensure a record served from cache is still reported as duplicated."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(jsonl_device("router1"))
+    inventory = FileInventory(path, InventorySource(path=path))
+    inventory.reload()
+
+    path.write_text(jsonl_device("router1", "new") + jsonl_device("router1"))
+    changes = inventory.reload()
+
+    assert changes.changed == ["router1"]
+    assert "duplicated hostname router1" in caplog.text
+    (device,) = inventory.devices()
+    assert device.password == "password"
+
+
+def test_file_inventory_reload_error_keeps_devices(tmp_path):
+    """Ensure devices are kept when the file can no longer be parsed."""
+    path = tmp_path / "devices.yaml"
+    path.write_text("- hostname: router1\n  username: admin\n  password: password\n")
+    inventory = FileInventory(path, InventorySource(path=path))
+    inventory.reload()
+
+    path.write_text("- hostname: [router1\n")
+    assert not inventory.reload()
+    assert [device.hostname for device in inventory.devices()] == ["router1"]
+
+
+def test_directory_inventory_reload(tmp_path):
+    """Ensure only changed files of a directory are read again on reload."""
+    (tmp_path / "site1.jsonl").write_text(jsonl_device("router1"))
+    (tmp_path / "site2.jsonl").write_text(jsonl_device("router2"))
+    (tmp_path / "README.txt").write_text("not an inventory")
+    inventory = create_provider(InventorySource(path=tmp_path))
+    assert isinstance(inventory, DirectoryInventory)
+
+    assert sorted(inventory.reload().added) == ["router1", "router2"]
+
+    (tmp_path / "site2.jsonl").unlink()
+    (tmp_path / "site3.jsonl").write_text(jsonl_device("router3"))
+    with patch("diode_napalm.inventory.iter_records", wraps=iter_records) as mock_iter:
+        changes = inventory.reload()
+
+    mock_iter.assert_called_once_with(tmp_path / "site3.jsonl", "auto")
+    assert changes.added == ["router3"]
+    assert changes.removed == ["router2"]
+    assert sorted(device.hostname for device in inventory.devices()) == [
+        "router1",
+        "router3",
+    ]
+
+
+def test_policy_inventory(yaml_inventory):
+    """Ensure a policy inventory combines inline and file devices."""
+    policy = Policy(
+        config=DiscoveryConfig(netbox={"site": "New York"}),
+        data=[Napalm(hostname="router0", username="admin", password="password")],
+        inventory=yaml_inventory,
+    )
+    inventory = PolicyInventory(policy)
+
+    assert inventory.reload().added == ["router0", "router1", "router2"]
+    assert not inventory.reload()
+    assert [device.hostname for device in inventory.devices()] == [
+        "router0",
+        "router1",
+        "router2",
+    ]
+
+
+def test_policy_devices_with_profiles(tmp_path):
+    """Ensure inventory devices can reference the policy connection profiles."""
+    path = tmp_path / "devices.jsonl"
+    path.write_text(
+        '{"hostname": "router1", "profile": "ios"}\n'
+        '{"hostname": "router2", "profile": "unknown"}\n'
+    )
+    policy = Policy(
+        config=DiscoveryConfig(netbox={}),
+        profiles={"ios": {"driver": "ios", "username": "admin", "password": "pass"}},
+        inventory=path,
+    )
+
+    (device,) = policy_devices(policy)
+    assert device.hostname == "router1"
+    assert device.driver == "ios"
+    assert device.username == "admin"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Isolation Unit Tests."""
+
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from diode_napalm.getters import GetterStats, getter_stats
+from diode_napalm.isolation import WorkerProcessPool, current_rss
+from diode_napalm.profiling import Tracer, tracer
+
+
+class UnpicklableError(Exception):
+    """Error that can't be rebuilt from its arguments."""
+
+    def __init__(self, code, message):
+        """Initialize the error with two arguments."""
+        super().__init__(message)
+
+
+def worker_pid(value):
+    """Return the value and the worker process id."""
+    return value, os.getpid()
+
+
+def raise_error(unpicklable):
+    """Raise an error in the worker process."""
+    if unpicklable:
+        raise UnpicklableError(1, "session closed")
+    raise ValueError("bad output")
+
+
+def run_getter(fail):
+    """Record a getter call and its span in the worker process."""
+    with tracer.span("get_facts", hostname="router1"):
+        getter_stats.record("ios", "get_facts", 0.5, failed=fail)
+    if fail:
+        raise ValueError("get_facts failed")
+    return "done"
+
+
+def crash():
+    """Exit the worker process abruptly."""
+    os._exit(3)
+
+
+@pytest.fixture
+def pool():
+    """Worker process pool closed at the end of the test."""
+    pool = WorkerProcessPool()
+    yield pool
+    pool.close()
+
+
+def test_current_rss():
+    """Ensure the resident memory of the process is reported."""
+    assert current_rss() > 1024 * 1024
+
+
+def test_pool_recycles_after_max_tasks(pool):
+    """Ensure worker processes are reused, then replaced after max_tasks calls."""
+    pool.configure(1, max_tasks=2)
+
+    results = [pool.call(worker_pid, value) for value in range(3)]
+
+    assert [value for value, _ in results] == [0, 1, 2]
+    pids = [pid for _, pid in results]
+    assert pids[0] == pids[1] != pids[2]
+    assert os.getpid() not in pids
+    assert pool.recycled == 1
+
+
+def test_pool_recycles_above_max_rss(pool):
+    """Ensure worker processes above the memory limit are replaced."""
+    pool.configure(1, max_rss=1)
+
+    first = pool.call(worker_pid, None)
+    second = pool.call(worker_pid, None)
+
+    assert first[1] != second[1]
+    assert pool.recycled == 2
+
+
+def test_pool_raises_worker_errors(pool):
+    """Ensure errors are raised in the caller, unpicklable ones by message."""
+    pool.configure(1)
+
+    with pytest.raises(ValueError, match="bad output"):
+        pool.call(raise_error, False)
+    with pytest.raises(RuntimeError, match="UnpicklableError: session closed"):
+        pool.call(raise_error, True)
+    assert pool.recycled == 0
+
+
+def test_pool_replaces_dead_worker(pool):
+    """Ensure a worker process that died is reported and replaced."""
+    pool.configure(1)
+
+    with pytest.raises(RuntimeError, match="exited with code 3"):
+        pool.call(crash)
+    assert pool.call(worker_pid, "next")[0] == "next"
+
+
+def test_pool_records_worker_telemetry(pool, tmp_path):
+    """Ensure getter costs and spans of worker processes are recorded by the caller."""
+    pool.configure(1)
+    stats = GetterStats()
+    parent_tracer = Tracer()
+    parent_tracer.configure(tmp_path / "trace.jsonl")
+
+    with (
+        patch("diode_napalm.isolation.getter_stats", stats),
+        patch("diode_napalm.isolation.tracer", parent_tracer),
+    ):
+        with parent_tracer.span("run_driver") as parent:
+            assert pool.call(run_getter, False) == "done"
+        with pytest.raises(ValueError, match="get_facts failed"):
+            pool.call(run_getter, True)
+    parent_tracer.close()
+
+    assert stats.stats[("ios", "get_facts")] == [2, 1, 1.0, 0.5]
+    with open(tmp_path / "trace.jsonl") as f:
+        spans = [json.loads(line) for line in f]
+    assert [span["name"] for span in spans] == ["get_facts", "run_driver", "get_facts"]
+    assert spans[0]["trace_id"] == parent.trace_id
+    assert spans[0]["parent_span_id"] == parent.span_id
+    assert spans[2]["parent_span_id"] is None
+    assert spans[2]["status"] == "OK"
+
+
+def test_pool_worker_telemetry_disabled(pool):
+    """Ensure worker processes don't hold spans while tracing is disabled."""
+    pool.configure(1)
+    stats = GetterStats()
+
+    with patch("diode_napalm.isolation.getter_stats", stats):
+        pool.call(run_getter, False)
+
+    assert stats.stats[("ios", "get_facts")][0] == 1
+    assert not tracer.enabled
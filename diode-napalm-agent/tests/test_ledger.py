@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Ledger Unit Tests."""
+
+from diode_napalm.ledger import (
+    DeviceOutcome,
+    RunLedger,
+    RunReport,
+    read_ledger,
+    write_ledger,
+)
+
+
+def test_run_ledger_records_started_runs_only():
+    """Ensure outcomes are only recorded between start and finish."""
+    ledger = RunLedger()
+    ledger.record(DeviceOutcome(policy="p", hostname="ignored"))
+    assert ledger.finish() is None
+
+    ledger.start()
+    ledger.record(DeviceOutcome(policy="p", hostname="router1"))
+    failed = DeviceOutcome(policy="p", hostname="router2")
+    failed.fail(TimeoutError("connection timed out"))
+    ledger.record(failed)
+    report = ledger.finish()
+
+    assert report.summary == {"success": 1, "failed": 1}
+    assert report.failed() == {("p", "router2")}
+    assert report.devices[1].error_class == "TimeoutError"
+    assert report.devices[1].finished_at is not None
+    assert report.finished_at is not None
+
+
+def test_run_report_merge():
+    """Ensure a rerun keeps the previous outcomes of the devices it did not run."""
+    previous = RunReport(
+        devices=[
+            DeviceOutcome(policy="p", hostname="router1"),
+            DeviceOutcome(policy="p", hostname="router2", status="failed"),
+        ]
+    )
+    report = RunReport(devices=[DeviceOutcome(policy="p", hostname="router2")])
+
+    report.merge(previous)
+
+    assert [outcome.hostname for outcome in report.devices] == ["router1", "router2"]
+    assert report.summary == {"success": 2}
+    assert report.failed() == set()
+
+
+def test_write_read_ledger(tmp_path):
+    """Ensure ledgers round-trip through their JSON file."""
+    outcome = DeviceOutcome(
+        policy="p",
+        hostname="router1",
+        driver="ios",
+        timings={"collect": 1.5, "ingest": 0.2},
+        entities=12,
+    )
+    path = tmp_path / "ledger" / "run.json"
+
+    write_ledger(path, RunReport(devices=[outcome], summary={"success": 1}))
+
+    report = read_ledger(path)
+    assert report.devices == [outcome]
+    assert [p.name for p in path.parent.iterdir()] == ["run.json"]
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Logs Unit Tests."""
+
+import io
+import json
+import logging
+import threading
+
+import pytest
+
+from diode_napalm import logs
+from diode_napalm.logs import (
+    ContextFilter,
+    JsonFormatter,
+    configure_logging,
+    log_context,
+    suppress_driver_logs,
+)
+
+
+@pytest.fixture
+def json_logs():
+    """Logger writing JSON lines with the log context to a buffer."""
+    output = io.StringIO()
+    handler = logging.StreamHandler(output)
+    handler.setFormatter(JsonFormatter())
+    handler.addFilter(ContextFilter())
+    logger = logging.getLogger("diode_napalm.tests")
+    driver_logger = logging.getLogger("napalm.ios.ios")
+    for log in (logger, driver_logger):
+        log.addHandler(handler)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    yield logger, driver_logger, output
+    for log in (logger, driver_logger):
+        log.removeHandler(handler)
+        log.propagate = True
+
+
+def lines(output: io.StringIO) -> list[dict]:
+    """Parse the JSON lines written so far."""
+    return [json.loads(line) for line in output.getvalue().splitlines()]
+
+
+def test_log_context_fields(json_logs):
+    """Ensure records carry the context fields of the block they are logged in."""
+    logger, _, output = json_logs
+
+    with log_context(policy="policy"):
+        with log_context(hostname="router1"):
+            logger.info("Hostname %s: Successful ingestion", "router1")
+        logger.warning("done")
+
+    first, second = lines(output)
+    assert first["message"] == "Hostname router1: Successful ingestion"
+    assert (first["policy"], first["hostname"], first["level"]) == (
+        "policy",
+        "router1",
+        "INFO",
+    )
+    assert second["policy"] == "policy" and "hostname" not in second
+
+
+def test_driver_logs_suppressed_per_thread(json_logs):
+    """Ensure driver logs are only dropped in the thread suppressing them."""
+    _, driver_logger, output = json_logs
+    suppressing = threading.Event()
+    logged = threading.Event()
+
+    def discover():
+        with suppress_driver_logs():
+            driver_logger.info("discovery noise")
+            suppressing.set()
+            logged.wait(1)
+
+    thread = threading.Thread(target=discover)
+    thread.start()
+    suppressing.wait(1)
+    driver_logger.info("session of another device")
+    logged.set()
+    thread.join()
+
+    assert [line["message"] for line in lines(output)] == ["session of another device"]
+
+
+def test_configure_logging_json(capsys):
+    """Ensure JSON mode writes the records from a background thread."""
+    configure_logging("json")
+    try:
+        with log_context(hostname="router1"):
+            logging.getLogger("diode_napalm.tests").info("Getting information")
+    finally:
+        # Switching back to text stops the listener once the queue is written
+        configure_logging("text")
+        logging.getLogger().removeHandler(logs._handler)
+
+    (line,) = capsys.readouterr().err.splitlines()
+    assert json.loads(line)["hostname"] == "router1"
+    with pytest.raises(ValueError, match="unknown log format 'xml'"):
+        configure_logging("xml")
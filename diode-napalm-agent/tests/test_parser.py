@@ -7,12 +7,22 @@ from pathlib import Path
 from unittest.mock import mock_open, patch
 
 import pytest
+import yaml
+from pydantic import ValidationError
 
 from diode_napalm.parser import (
+    ChannelConfig,
     Config,
+    DiscoveryConfig,
+    EnvResolver,
     ParseException,
+    Policy,
+    TranslatorConfig,
+    iter_yaml_sequence,
+    load_yaml,
     parse_config,
     parse_config_file,
+    parse_duration,
     resolve_env_vars,
 )
 
@@ -113,7 +123,226 @@ def test_resolve_env_vars_no_env():
     assert resolved_config["api_key"] == "${MISSING_KEY}"
 
 
+@patch.dict(os.environ, {"SITE": "nyc", "USER": "admin"})
+def test_resolve_env_vars_embedded_and_defaults():
+    """Ensure embedded references and defaults are resolved in place."""
+    config = {
+        "devices": [
+            {"hostname": "${SITE}-core.example.com", "username": "${USER}"},
+            {"password": "${MISSING_PASSWORD:-changeme}", "port": 22},
+        ],
+        "literal": "${MISSING}-${SITE}",
+        "empty_default": "${MISSING:-}",
+    }
+    devices = config["devices"]
+
+    resolved = resolve_env_vars(config)
+
+    assert resolved is config
+    assert devices[0] == {"hostname": "nyc-core.example.com", "username": "admin"}
+    assert devices[1] == {"password": "changeme", "port": 22}
+    assert config["literal"] == "${MISSING}-nyc"
+    assert config["empty_default"] == ""
+
+
+def test_env_resolver_scalars():
+    """Ensure values that aren't strings or containers are returned unchanged."""
+    resolver = EnvResolver()
+    for value in (None, 22, 1.5, True):
+        assert resolver.resolve(value) is value
+        assert resolve_env_vars(value) is value
+
+
+def test_env_resolver_secrets(tmp_path):
+    """Ensure secrets are read from the secrets directory once per resolver."""
+    (tmp_path / "arista_password").write_text("s3cret\n")
+    resolver = EnvResolver(secrets_dir=tmp_path)
+
+    assert resolver.resolve("${secret:arista_password}") == "s3cret"
+    (tmp_path / "arista_password").write_text("rotated\n")
+    assert resolver.resolve({"p": "${secret:arista_password}"}) == {"p": "s3cret"}
+    assert EnvResolver(tmp_path).resolve("${secret:arista_password}") == "rotated"
+    assert resolver.resolve("${secret:missing:-none}") == "none"
+    assert resolver.resolve("${secret:../arista_password}") == (
+        "${secret:../arista_password}"
+    )
+
+
+@patch.dict(os.environ, {"DIODE_NAPALM_SECRETS_DIR": "/run/secrets"})
+def test_env_resolver_secrets_dir_from_env():
+    """Ensure the secrets directory defaults to the environment variable."""
+    assert EnvResolver().secrets_dir == Path("/run/secrets")
+
+
 def test_parse_config_file_exception():
     """Ensure file parsing errors are handled correctly."""
     with pytest.raises(Exception):
         parse_config_file(Path("non_existent_file.yaml"))
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "a: 1\nb: [yes, ~, 1.5, '2', 2001-01-01]\nc:\n  - d: e\n",
+        "a: &anchor {b: 1}\nc: *anchor\n",
+        "a: !!str 1\n",
+        "<<: {a: 1}\nb: 2\n",
+        "",
+        "null: a\nb: c\nd: e\n",
+        "~: a\nb: {null: c, d: ~}\n",
+    ],
+)
+def test_load_yaml_matches_safe_load(document):
+    """Ensure the fast YAML loader builds the same objects as yaml.safe_load."""
+    assert load_yaml(document) == yaml.safe_load(document)
+
+
+def test_load_yaml_multiple_documents():
+    """Ensure multiple YAML documents are rejected like yaml.safe_load does."""
+    with pytest.raises(yaml.YAMLError):
+        load_yaml("a: 1\n---\nb: 2\n")
+
+
+def test_iter_yaml_sequence(tmp_path):
+    """Ensure the items of a YAML list are yielded one at a time."""
+    path = tmp_path / "items.yaml"
+    path.write_text("- a: 1\n- [1, 2]\n- b\n")
+    assert list(iter_yaml_sequence(path)) == [{"a": 1}, [1, 2], "b"]
+
+    path.write_text("- null: a\n  b: c\n- {~: d}\n")
+    assert list(iter_yaml_sequence(path)) == [{None: "a", "b": "c"}, {None: "d"}]
+
+
+def test_parse_config_file_inventory_path(tmp_path):
+    """Ensure inventory paths are resolved relative to the configuration file."""
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("""
+diode:
+  config:
+    target: "target_value"
+    api_key: "api_key_value"
+  policies:
+    policy1:
+      config:
+        netbox:
+          site: "New York"
+      inventory: devices.csv
+""")
+    config = parse_config_file(config_file)
+    assert config.policies["policy1"].data == []
+    assert config.policies["policy1"].inventory.path == tmp_path / "devices.csv"
+
+
+def test_discovery_config_getters():
+    """Ensure getters default to facts, interfaces and IPs, and are validated."""
+    assert DiscoveryConfig(netbox={}).getters == [
+        "get_facts",
+        "get_interfaces",
+        "get_interfaces_ip",
+    ]
+    config = DiscoveryConfig(netbox={}, getters=["get_facts", "get_vlans", "get_facts"])
+    assert config.getters == ["get_facts", "get_vlans"]
+
+    with pytest.raises(ValueError, match="unsupported getters"):
+        DiscoveryConfig(netbox={}, getters=["get_facts", "get_config"])
+    with pytest.raises(ValueError, match="get_facts"):
+        DiscoveryConfig(netbox={}, getters=["get_interfaces"])
+
+
+@pytest.mark.parametrize(
+    "value,seconds",
+    [(30, 30), ("30", 30), ("45s", 45), ("15m", 900), ("6h", 21600), ("1d", 86400)],
+)
+def test_parse_duration(value, seconds):
+    """Ensure durations accept seconds and unit suffixes."""
+    assert parse_duration(value) == seconds
+
+
+def test_discovery_config_refresh():
+    """Ensure refresh intervals are converted to seconds and validated."""
+    config = DiscoveryConfig(netbox={}, refresh={"get_lldp_neighbors_detail": "1h"})
+    assert config.refresh == {"get_lldp_neighbors_detail": 3600}
+
+    with pytest.raises(ValueError, match="invalid duration"):
+        DiscoveryConfig(netbox={}, refresh={"get_vlans": "soon"})
+    with pytest.raises(ValueError, match="get_config"):
+        DiscoveryConfig(netbox={}, refresh={"get_config": "1h"})
+
+
+def test_channel_config():
+    """Ensure channel settings default to the SDK behaviour and accept durations."""
+    assert ChannelConfig().compression == "none"
+    config = ChannelConfig(compression="gzip", keepalive="2m", keepalive_timeout="10s")
+    assert config.keepalive == 120
+    assert config.keepalive_timeout == 10
+
+    with pytest.raises(ValueError):
+        ChannelConfig(compression="brotli")
+    with pytest.raises(ValueError):
+        ChannelConfig(pool_size=0)
+
+
+def test_translator_config():
+    """Ensure translator mappings are validated when the configuration is parsed."""
+    config = TranslatorConfig(interface={"name": "name | normalize_interface_name"})
+    assert config.device == {}
+
+    with pytest.raises(ValueError, match="unknown interface fields"):
+        TranslatorConfig(interface={"label": "name"})
+    with pytest.raises(ValueError, match="unknown transform"):
+        TranslatorConfig(device={"name": "hostname | titlecase"})
+
+
+@pytest.fixture
+def profiled_policy():
+    """Policy data with devices referencing a connection profile."""
+    return {
+        "config": {"netbox": {"site": "New York"}},
+        "profiles": {
+            "ios": {
+                "driver": "ios",
+                "username": "admin",
+                "password": "secret",
+                "timeout": 30,
+                "optional_args": {"transport": "ssh", "secret": "enable"},
+            }
+        },
+        "data": [
+            {"hostname": "router1", "profile": "ios"},
+            {"hostname": "router2", "profile": "ios"},
+            {
+                "hostname": "router3",
+                "profile": "ios",
+                "username": "operator",
+                "optional_args": {"port": 2222},
+            },
+            {"hostname": "router4", "username": "root", "password": "pass"},
+        ],
+    }
+
+
+def test_policy_connection_profiles(profiled_policy):
+    """Ensure devices inherit their profile settings and share its optional arguments."""
+    router1, router2, router3, router4 = Policy(**profiled_policy).data
+
+    assert router1.driver == "ios"
+    assert router1.username == "admin"
+    assert router1.password == "secret"
+    assert router1.timeout == 30
+    assert router1.optional_args is router2.optional_args
+    assert router3.username == "operator"
+    assert router3.optional_args == {
+        "transport": "ssh",
+        "secret": "enable",
+        "port": 2222,
+    }
+    assert router4.profile is None
+    assert router4.optional_args is None
+
+
+def test_policy_unknown_connection_profile(profiled_policy):
+    """Ensure devices referencing an unknown profile are rejected."""
+    profiled_policy["data"].append({"hostname": "router5", "profile": "eos"})
+
+    with pytest.raises(ValidationError, match="unknown connection profile 'eos'"):
+        Policy(**profiled_policy)
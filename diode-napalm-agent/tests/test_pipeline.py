@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Pipeline Unit Tests."""
+
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from diode_napalm.collected import CollectedData
+from diode_napalm.ledger import DeviceOutcome, run_ledger
+from diode_napalm.pipeline import IngestPipeline, MemoryBudget
+
+
+def collected(hostname: str) -> CollectedData:
+    """Build the compact data of a device with a few interfaces."""
+    return CollectedData.from_napalm(
+        {
+            "device": {
+                "hostname": hostname,
+                "interface_list": [f"Ethernet{i}" for i in range(8)],
+            },
+            "interface": {f"Ethernet{i}": {"is_enabled": True} for i in range(8)},
+        }
+    )
+
+
+@pytest.fixture
+def pipeline():
+    """Ingest pipeline closed at the end of the test."""
+    pipeline = IngestPipeline()
+    yield pipeline
+    pipeline.close()
+
+
+def test_memory_budget_waits_for_release():
+    """Ensure waiting for the budget blocks until enough is released."""
+    budget = MemoryBudget(100)
+    budget.reserve(150)
+    admitted = threading.Event()
+    waiter = threading.Thread(target=lambda: budget.wait() or admitted.set())
+    waiter.start()
+
+    assert not admitted.wait(0.05)
+    budget.release(100)
+    assert admitted.wait(1)
+    waiter.join()
+    assert (budget.used, budget.peak) == (50, 150)
+
+
+def test_pipeline_ingests_and_records_outcomes(pipeline):
+    """Ensure submitted data is serialized, sent and recorded in the run ledger."""
+    client = MagicMock()
+    client.serialize.side_effect = lambda hostname, data: (hostname.encode(), 9)
+    pipeline.configure(client, 1 << 20)
+    run_ledger.start()
+
+    for i in range(10):
+        pipeline.admit()
+        outcome = DeviceOutcome(policy="policy", hostname=f"router{i}")
+        pipeline.submit(f"router{i}", collected(f"router{i}"), outcome)
+    pipeline.join()
+
+    report = run_ledger.finish()
+    assert sorted(call.args[1] for call in client.send.mock_calls) == sorted(
+        f"router{i}".encode() for i in range(10)
+    )
+    assert len(report.devices) == 10
+    assert all(outcome.entities == 9 for outcome in report.devices)
+    assert set(report.devices[0].timings) == {"translate", "ingest"}
+    assert pipeline.budget.used == 0
+
+
+def test_pipeline_pauses_collection_at_budget(pipeline):
+    """Ensure collection waits while the data in flight exceeds the budget."""
+    client = MagicMock()
+    client.serialize.return_value = (b"x" * 1000, 1)
+    sending = threading.Event()
+    client.send.side_effect = lambda hostname, request: sending.wait(5)
+    pipeline.configure(client, 500, translators=1, senders=1)
+
+    pipeline.submit(
+        "router1", collected("router1"), DeviceOutcome(policy="", hostname="router1")
+    )
+    admitted = threading.Event()
+    collector = threading.Thread(target=lambda: pipeline.admit() or admitted.set())
+    collector.start()
+
+    assert not admitted.wait(0.1)
+    sending.set()
+    assert admitted.wait(1)
+    collector.join()
+
+
+def test_pipeline_records_failures(pipeline):
+    """Ensure devices whose data can't be sent are recorded as failed."""
+    client = MagicMock()
+    client.serialize.return_value = (b"request", 1)
+    client.send.side_effect = ConnectionError("ingester unavailable")
+    pipeline.configure(client, 1 << 20)
+    run_ledger.start()
+
+    pipeline.submit(
+        "router1", collected("router1"), DeviceOutcome(policy="", hostname="router1")
+    )
+    pipeline.join()
+
+    (outcome,) = run_ledger.finish().devices
+    assert (outcome.status, outcome.error_class) == ("failed", "ConnectionError")
+    assert pipeline.budget.used == 0
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Plan Unit Tests."""
+
+import pytest
+
+from diode_napalm.parser import Diode, DiodeConfig, DiscoveryConfig, Napalm, Policy
+from diode_napalm.plan import build_plan, format_plan
+
+
+def napalm(hostname: str, driver: str | None = None) -> Napalm:
+    """Build a NAPALM device entry."""
+    return Napalm(driver=driver, hostname=hostname, username="user", password="pass")
+
+
+@pytest.fixture
+def sample_config():
+    """Sample configuration with two policies."""
+    return Diode(
+        config=DiodeConfig(target="grpc://localhost:8081", api_key="key"),
+        policies={
+            "policy1": Policy(
+                config=DiscoveryConfig(netbox={"site": "New York"}),
+                data=[
+                    napalm("router1", "ios"),
+                    napalm("router2", "ios"),
+                    napalm("router3"),
+                ],
+            ),
+            "policy2": Policy(
+                config=DiscoveryConfig(netbox={"site": "Boston"}),
+                data=[napalm("router1", "eos"), napalm("switch1", "fake")],
+            ),
+        },
+    )
+
+
+def test_build_plan(sample_config):
+    """Ensure device counts and the concurrency plan are computed per policy."""
+    plan = build_plan(sample_config, 2, ["ios", "eos", "junos"])
+
+    assert plan.devices == 5
+    policy1, policy2 = plan.policies
+    assert policy1.name == "policy1"
+    assert policy1.devices == 3
+    assert policy1.drivers == {"ios": 2, "discover": 1}
+    assert policy1.workers == 2
+    assert policy1.waves == 2
+    assert policy1.discovery_attempts == 3
+    assert policy2.drivers == {"eos": 1, "fake": 1}
+    assert policy2.discovery_attempts == 0
+
+
+def test_build_plan_errors(sample_config):
+    """Ensure duplicated hostnames and unknown drivers are reported."""
+    plan = build_plan(sample_config, 2, ["ios", "eos", "junos"])
+
+    assert plan.duplicates == {"router1": ["policy1", "policy2"]}
+    assert plan.unknown_drivers == {"policy2/switch1": "fake"}
+    assert len(plan.errors) == 2
+
+
+def test_format_plan(sample_config):
+    """Ensure the plan is formatted as readable text."""
+    output = format_plan(build_plan(sample_config, 8, ["ios", "eos", "junos"]))
+
+    assert output.splitlines()[0] == "Policies: 2, devices: 5"
+    assert (
+        "Policy policy1: 3 devices (ios: 2, discover: 1), 3 workers, 1 waves" in output
+    )
+    assert "up to 3 connections to discover drivers" in output
+    assert "Errors: 2" in output
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Profiling Unit Tests."""
+
+import json
+import threading
+import time
+
+import pytest
+
+from diode_napalm.profiling import SamplingProfiler, Tracer, profile_run
+
+
+def busy_loop(stop: threading.Event):
+    """Keep a thread busy until stopped."""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def tracer(tmp_path):
+    """Tracer writing to a temporary file."""
+    tracer = Tracer()
+    tracer.configure(tmp_path / "trace.jsonl")
+    yield tracer
+    tracer.close()
+
+
+def read_spans(path):
+    """Read the spans of a trace file."""
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_sampling_profiler_collapsed_stacks():
+    """Ensure the stacks of other threads are sampled and collapsed."""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    profiler = SamplingProfiler(interval=0.001)
+    worker.start()
+    profiler.start()
+    time.sleep(0.1)
+    profiler.stop()
+    stop.set()
+    worker.join()
+
+    lines = profiler.collapsed()
+    assert lines
+    assert any("busy_loop (test_profiling.py)" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    assert ";" in stack
+
+
+def test_profile_run(tmp_path):
+    """Ensure the profile is written when the profiled code ends."""
+    path = tmp_path / "profile.folded"
+    with profile_run(path, interval=0.001):
+        time.sleep(0.05)
+
+    assert path.exists()
+
+
+def test_profile_run_disabled(tmp_path):
+    """Ensure nothing is profiled without a path."""
+    with profile_run(None):
+        pass
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tracer_disabled():
+    """Ensure spans are not recorded until the tracer is configured."""
+    tracer = Tracer()
+    with tracer.span("run_driver") as span:
+        assert span is None
+    assert not tracer.enabled
+
+
+def test_tracer_nested_spans(tracer, tmp_path):
+    """Ensure nested spans share the trace and reference their parent."""
+    with tracer.span("run_driver", hostname="router1") as parent:
+        with tracer.span("collect") as child:
+            child.set_attribute("getters", 3)
+    tracer.close()
+
+    collect, run_driver = read_spans(tmp_path / "trace.jsonl")
+    assert run_driver["name"] == "run_driver"
+    assert run_driver["attributes"] == {"hostname": "router1"}
+    assert run_driver["parent_span_id"] is None
+    assert collect["trace_id"] == run_driver["trace_id"] == parent.trace_id
+    assert collect["parent_span_id"] == run_driver["span_id"]
+    assert collect["attributes"] == {"getters": 3}
+    assert collect["status"] == "OK"
+    assert collect["end_time_unix_nano"] >= collect["start_time_unix_nano"]
+
+
+def test_tracer_error_span(tracer, tmp_path):
+    """Ensure failed spans record the exception."""
+    with pytest.raises(TimeoutError):
+        with tracer.span("ingest"):
+            raise TimeoutError("deadline exceeded")
+    tracer.close()
+
+    (span,) = read_spans(tmp_path / "trace.jsonl")
+    assert span["status"] == "ERROR"
+    assert span["attributes"]["exception.type"] == "TimeoutError"
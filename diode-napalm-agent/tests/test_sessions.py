@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Sessions Unit Tests."""
+
+import time
+
+import pytest
+
+from diode_napalm.parser import Napalm
+from diode_napalm.sessions import SessionPool, is_alive
+
+
+class FakeDriver:
+    """NAPALM driver recording the sessions opened and closed."""
+
+    sessions = []
+
+    def __init__(self, hostname, username, password, timeout, optional_args):
+        """Initialize a closed session."""
+        self.hostname = hostname
+        self.alive = False
+        self.closed = False
+        FakeDriver.sessions.append(self)
+
+    def open(self):
+        """Open the session."""
+        self.alive = True
+
+    def close(self):
+        """Close the session."""
+        self.alive = False
+        self.closed = True
+
+    def is_alive(self):
+        """Report whether the session is open."""
+        return {"is_alive": self.alive}
+
+
+def device(hostname: str) -> Napalm:
+    """Build the information data of a device."""
+    return Napalm(hostname=hostname, username="user", password="pass", driver="ios")
+
+
+@pytest.fixture
+def pool():
+    """Session pool closed at the end of the test."""
+    FakeDriver.sessions = []
+    pool = SessionPool()
+    pool.configure(2, idle_timeout=60)
+    yield pool
+    pool.close()
+
+
+def test_sessions_reused_across_polls(pool):
+    """Ensure the sessions of a device are kept open and reused."""
+    first = pool.run(device("router1"), FakeDriver, lambda session: session)
+    second = pool.run(device("router1"), FakeDriver, lambda session: session)
+
+    assert first is second
+    assert not first.closed
+    assert (pool.opened, pool.reused) == (1, 1)
+
+
+def test_sessions_reopened_after_settings_change(pool):
+    """Ensure a session is not reused once the device connection settings changed."""
+    info = device("router1")
+    first = pool.run(info, FakeDriver, lambda session: session)
+    info.password = "rotated"
+    second = pool.run(info, FakeDriver, lambda session: session)
+
+    assert first is not second
+
+
+def test_dead_session_reconnected(pool):
+    """Ensure sessions failing the health check or the poll are replaced."""
+    first = pool.run(device("router1"), FakeDriver, lambda session: session)
+    first.alive = False
+    second = pool.run(device("router1"), FakeDriver, lambda session: session)
+    assert second is not first and first.closed
+
+    def fail_once(session):
+        if session is second:
+            raise ConnectionResetError("connection reset by peer")
+        return session
+
+    third = pool.run(device("router1"), FakeDriver, fail_once)
+    assert third is not second and second.closed
+    assert pool.reconnected == 2
+
+
+def test_failed_new_session_not_retried(pool):
+    """Ensure errors of a new session are raised and the session closed."""
+
+    def fail(session):
+        raise TimeoutError("getter timed out")
+
+    with pytest.raises(TimeoutError):
+        pool.run(device("router1"), FakeDriver, fail)
+    (session,) = FakeDriver.sessions
+    assert session.closed
+
+
+def test_sessions_capped(pool):
+    """Ensure the least recently used idle session makes room for a new one."""
+    router1 = pool.run(device("router1"), FakeDriver, lambda session: session)
+    router2 = pool.run(device("router2"), FakeDriver, lambda session: session)
+    pool.run(device("router3"), FakeDriver, lambda session: session)
+
+    assert router1.closed and not router2.closed
+
+
+def test_sessions_in_use_not_evicted(pool):
+    """Ensure sessions opened while every session is in use are closed after the poll."""
+    pool.configure(1, idle_timeout=60)
+
+    def nested(session):
+        return session, pool.run(device("router2"), FakeDriver, lambda inner: inner)
+
+    outer, inner = pool.run(device("router1"), FakeDriver, nested)
+
+    assert inner.closed and not outer.closed
+
+
+def test_idle_sessions_expire(pool):
+    """Ensure idle sessions are closed after the idle timeout."""
+    pool.configure(2, idle_timeout=0.05)
+    session = pool.run(device("router1"), FakeDriver, lambda session: session)
+    time.sleep(0.1)
+
+    pool.reap()
+
+    assert session.closed
+    assert (
+        pool.run(device("router1"), FakeDriver, lambda session: session) is not session
+    )
+
+
+def test_is_alive_without_health_check():
+    """Ensure drivers without a health check are assumed to be alive."""
+
+    class NoCheck:
+        def is_alive(self):
+            raise NotImplementedError
+
+    assert is_alive(NoCheck())
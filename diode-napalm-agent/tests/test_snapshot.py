@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Snapshot Unit Tests."""
+
+import gzip
+import json
+from datetime import datetime, timezone
+
+from diode_napalm.snapshot import (
+    iter_snapshots,
+    read_snapshot,
+    snapshot_files,
+    snapshot_path,
+    write_snapshot,
+)
+
+
+def test_snapshot_path(tmp_path):
+    """Ensure snapshot file names are safe and unique per run."""
+    collected_at = datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc)
+    path = snapshot_path(tmp_path, "fe80::1/router", collected_at)
+    assert path == tmp_path / "fe80__1_router-20240102T030405000006Z.json.gz"
+
+
+def test_write_and_read_snapshot(tmp_path):
+    """Ensure snapshots are written compressed and read back."""
+    data = {"driver": "ios", "device": {"hostname": "router1", "uptime": 1.5}}
+    path = write_snapshot(tmp_path / "snapshots", "router1", data)
+
+    with gzip.open(path, "rt") as f:
+        assert json.load(f)["data"] == data
+    snapshot = read_snapshot(path)
+    assert snapshot.hostname == "router1"
+    assert snapshot.data == data
+    assert list(path.parent.iterdir()) == [path]
+
+
+def test_iter_snapshots(tmp_path):
+    """Ensure snapshots are read from directories, including plain JSON files."""
+    write_snapshot(tmp_path / "run1", "router1", {"driver": "ios"})
+    (tmp_path / "router2.json").write_text(
+        json.dumps(
+            {
+                "hostname": "router2",
+                "collected_at": "2024-01-01T00:00:00+00:00",
+                "data": {"driver": "eos"},
+            }
+        )
+    )
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    assert len(snapshot_files(tmp_path)) == 2
+    hostnames = sorted(snapshot.hostname for snapshot in iter_snapshots(tmp_path))
+    assert hostnames == ["router1", "router2"]
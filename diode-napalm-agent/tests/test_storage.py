@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Storage Unit Tests."""
+
+import gzip
+
+import pytest
+
+from diode_napalm.storage import HostStore, atomic_open, safe_filename
+
+
+def test_safe_filename():
+    """Ensure characters unsafe in file names are replaced."""
+    assert safe_filename("core/sw1:22 a.b-c_d") == "core_sw1_22_a.b-c_d"
+
+
+def test_atomic_open_replaces_file(tmp_path):
+    """Ensure the file is replaced once complete, in a created directory."""
+    path = tmp_path / "reports" / "ledger.json"
+
+    with atomic_open(path) as f:
+        f.write("first")
+        assert not path.exists()
+    with atomic_open(path, "wt", compresslevel=6) as f:
+        f.write("second")
+
+    with gzip.open(path, "rt") as f:
+        assert f.read() == "second"
+    assert [p.name for p in path.parent.iterdir()] == ["ledger.json"]
+
+
+def test_atomic_open_failure_keeps_previous_file(tmp_path):
+    """Ensure a failed write leaves the previous file and no temporary file."""
+    path = tmp_path / "ledger.json"
+    path.write_text("previous")
+
+    with pytest.raises(ValueError):
+        with atomic_open(path) as f:
+            f.write("partial")
+            raise ValueError("serialization failed")
+
+    assert path.read_text() == "previous"
+    assert [p.name for p in tmp_path.iterdir()] == ["ledger.json"]
+
+
+@pytest.mark.parametrize("persisted", [False, True])
+def test_host_store(tmp_path, persisted):
+    """Ensure documents are stored per device, in memory or in files."""
+    store = HostStore(tmp_path / "store" if persisted else None)
+
+    assert store.read("router/1") is None
+    store.write("router/1", b'{"a":1}')
+    store.write("router/1", b'{"a":2}')
+    store.write("router2", b"{}")
+
+    assert store.read("router/1") == b'{"a":2}'
+    assert store.read("router2") == b"{}"
+    if persisted:
+        assert store.path("router/1") == tmp_path / "store" / "router_1.json.gz"
+        assert sorted(p.name for p in (tmp_path / "store").iterdir()) == [
+            "router2.json.gz",
+            "router_1.json.gz",
+        ]
+    else:
+        assert set(store._entries) == {"router/1", "router2"}
+
+
+def test_host_store_configure_drops_memory(tmp_path):
+    """Ensure configuring a directory drops the documents held in memory."""
+    store = HostStore()
+    store.write("router1", b"{}")
+
+    store.configure(tmp_path)
+
+    assert store.read("router1") is None
@@ -2,13 +2,20 @@
 # Copyright 2024 NetBox Labs Inc
 """NetBox Labs - Translate Unit Tests."""
 
+import ipaddress
+
 import pytest
 
+from diode_napalm.collected import interface_vlan_modes
 from diode_napalm.translate import (
+    address_prefixes,
+    device_reference,
+    translate_arp_table,
     translate_data,
     translate_device,
     translate_interface,
     translate_interface_ips,
+    translate_lldp_neighbors,
 )
 
 
@@ -135,3 +142,202 @@ def test_translate_data(
     assert entities[1].interface.name == "GigabitEthernet0/0"
     assert entities[2].prefix.prefix == "192.0.2.0/24"
     assert entities[3].ip_address.address == "192.0.2.1/24"
+
+
+@pytest.fixture
+def sample_lldp_neighbors():
+    """Sample LLDP neighbors for testing."""
+    return {
+        "GigabitEthernet0/0": [
+            {
+                "remote_system_name": "switch1",
+                "remote_port": "Ethernet1",
+                "remote_port_description": "to router1",
+            }
+        ],
+        "GigabitEthernet0/1": [
+            {"remote_system_name": "switch1", "remote_port": "Ethernet2"},
+            {"remote_system_name": "", "remote_port": "unknown"},
+        ],
+    }
+
+
+def test_translate_lldp_neighbors(sample_device_info, sample_lldp_neighbors):
+    """Ensure LLDP neighbors are translated into devices and interfaces."""
+    device = translate_device(sample_device_info)
+    entities = list(translate_lldp_neighbors(device, sample_lldp_neighbors))
+
+    assert len(entities) == 3
+    assert entities[0].device.name == "switch1"
+    assert entities[0].device.site.name == "New York"
+    assert entities[1].interface.device.name == "switch1"
+    assert entities[1].interface.name == "Ethernet1"
+    assert entities[1].interface.description == "to router1"
+    assert entities[2].interface.name == "Ethernet2"
+
+
+@pytest.mark.parametrize(
+    "ip, prefix_length",
+    [
+        ("192.0.2.10", 24),
+        ("192.0.2.10", 32),
+        ("10.1.2.3", 0),
+        ("2001:db8::1", 64),
+        ("2001:db8:0:1:2:3:4:5", 127),
+        ("fe80::1", 10),
+        ("::ffff:192.0.2.1", 120),
+        ("::", 0),
+        ("fe80::1%eth0", 64),
+        ("fe80::1%1", 10),
+    ],
+)
+def test_address_prefixes_match_ipaddress(ip, prefix_length):
+    """Ensure prefixes computed with integer masks match ipaddress networks."""
+    prefixes = address_prefixes([(ip, prefix_length)])
+    expected = ipaddress.ip_network(f"{ip}/{prefix_length}", strict=False)
+    assert prefixes == {(ip, prefix_length): str(expected)}
+
+
+@pytest.mark.parametrize(
+    "ip, prefix_length",
+    [
+        ("192.0.2.300", 24),
+        ("192.0.2.1", 33),
+        ("192.0.2.1", -1),
+        ("192.0.2.1%eth0", 24),
+        ("2001:db8::1", -1),
+        ("2001:db8::1", 129),
+        ("2001:db8::1", None),
+        ("fe80::1%", 64),
+        ("fe80::1%eth0%eth1", 64),
+        ("fe80::1%eth0", 129),
+    ],
+)
+def test_address_prefixes_invalid(ip, prefix_length):
+    """Ensure invalid addresses and prefix lengths are rejected."""
+    with pytest.raises(ValueError):
+        address_prefixes([(ip, prefix_length)])
+
+
+def test_translate_arp_table(sample_device_info, sample_interfaces_ip):
+    """Ensure ARP entries are translated using the connected subnet prefix length."""
+    device = translate_device(sample_device_info)
+    arp_table = [
+        {
+            "interface": "GigabitEthernet0/0",
+            "mac": "00:00:00:00:00:01",
+            "ip": "192.0.2.10",
+        },
+        {
+            "interface": "GigabitEthernet0/0",
+            "mac": "00:00:00:00:00:02",
+            "ip": "192.0.2.1",
+        },
+        {
+            "interface": "GigabitEthernet0/1",
+            "mac": "00:00:00:00:00:03",
+            "ip": "2001:db8::1",
+        },
+    ]
+    entities = list(translate_arp_table(device, arp_table, sample_interfaces_ip))
+
+    assert len(entities) == 2
+    assert entities[0].ip_address.address == "192.0.2.10/24"
+    assert entities[0].ip_address.status == "active"
+    assert (
+        entities[0].ip_address.description == "ARP entry on router1 GigabitEthernet0/0"
+    )
+    assert entities[1].ip_address.address == "2001:db8::1/128"
+
+
+def test_translate_arp_table_longest_prefix(sample_device_info):
+    """Ensure ARP entries get the most specific matching interface subnet."""
+    device = translate_device(sample_device_info)
+    interfaces_ip = {
+        "Vlan10": {"ipv4": {"10.0.0.1": {"prefix_length": 8}}},
+        "Vlan20": {"ipv4": {"10.1.2.1": {"prefix_length": 24}}},
+        "Vlan30": {"ipv6": {"2001:db8:0:1::1": {"prefix_length": 64}}},
+    }
+    arp_table = [
+        {"interface": "Vlan20", "ip": "10.1.2.20"},
+        {"interface": "Vlan10", "ip": "10.9.9.9"},
+        {"interface": "Vlan30", "ip": "2001:db8:0:1::20"},
+        {"interface": "Vlan30", "ip": "2001:db8:0:2::20"},
+        {"interface": "Vlan99", "ip": "198.51.100.1"},
+    ]
+    entities = translate_arp_table(device, arp_table, interfaces_ip)
+
+    assert [entity.ip_address.address for entity in entities] == [
+        "10.1.2.20/24",
+        "10.9.9.9/8",
+        "2001:db8:0:1::20/64",
+        "2001:db8:0:2::20/128",
+        "198.51.100.1/32",
+    ]
+
+
+def test_interface_vlan_modes():
+    """Ensure interfaces in one VLAN are access ports and in several are tagged."""
+    vlans = {
+        1: {"name": "default", "interfaces": ["Gi0/1", "Gi0/2"]},
+        10: {"name": "users", "interfaces": ["Gi0/2"]},
+    }
+    assert interface_vlan_modes(vlans) == {"Gi0/1": "access", "Gi0/2": "tagged"}
+
+
+def test_translate_data_with_optional_getters(
+    sample_device_info,
+    sample_interface_info,
+    sample_interfaces_ip,
+    sample_lldp_neighbors,
+):
+    """Ensure data from the optional getters is translated."""
+    data = {
+        "device": sample_device_info,
+        "interface": sample_interface_info,
+        "interface_ip": sample_interfaces_ip,
+        "vlan": {10: {"name": "users", "interfaces": ["GigabitEthernet0/0"]}},
+        "lldp_neighbors": sample_lldp_neighbors,
+        "arp_table": [{"interface": "GigabitEthernet0/0", "ip": "192.0.2.10"}],
+        "environment": {"cpu": {}},
+        "driver": "ios",
+        "site": "New York",
+    }
+    entities = list(translate_data(data))
+
+    assert len(entities) == 8
+    assert entities[1].interface.mode == "access"
+    assert entities[4].device.name == "switch1"
+    assert entities[7].ip_address.address == "192.0.2.10/24"
+
+
+def test_device_reference(sample_device_info):
+    """Ensure device references only carry the name and site."""
+    reference = device_reference(translate_device(sample_device_info))
+
+    assert reference.name == "router1"
+    assert reference.site.name == "New York"
+    assert not reference.HasField("device_type")
+    assert not reference.HasField("platform")
+    assert reference.serial == ""
+
+
+def test_translate_data_references_parents(
+    sample_device_info, sample_interface_info, sample_interfaces_ip
+):
+    """Ensure interfaces and IP addresses reference their parents by name and site."""
+    data = {
+        "device": sample_device_info,
+        "interface": sample_interface_info,
+        "interface_ip": sample_interfaces_ip,
+        "driver": "ios",
+        "site": "New York",
+    }
+    device, interface, prefix, ip_address = translate_data(data)
+
+    assert device.device.device_type.model == "ISR4451"
+    assert interface.interface.device == device_reference(device.device)
+    assert prefix.prefix.site.name == "New York"
+    assert ip_address.ip_address.interface.name == "GigabitEthernet0/0"
+    assert ip_address.ip_address.interface.device == device_reference(device.device)
+    assert ip_address.ip_address.interface.mtu == 0
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# Copyright 2024 NetBox Labs Inc
+"""NetBox Labs - Translators Unit Tests."""
+
+import pytest
+
+from diode_napalm.collected import CollectedData, DeviceRecord, InterfaceRecord
+from diode_napalm.translate import translate_data
+from diode_napalm.translators import (
+    Translator,
+    compile_field,
+    get_translator,
+    normalize_interface_name,
+    register_translator,
+    reset_translators,
+)
+
+
+@pytest.fixture(autouse=True)
+def translators():
+    """Drop the translators registered by the test."""
+    yield
+    reset_translators()
+
+
+@pytest.fixture
+def device_record():
+    """Device record of an IOS router."""
+    return DeviceRecord.from_napalm(
+        {
+            "hostname": "router1.example.com",
+            "model": "ISR4451",
+            "vendor": "Cisco",
+            "serial_number": "123456789",
+            "site": "New York",
+            "driver": "ios",
+        }
+    )
+
+
+def interface_record(name: str = "Gi0/1", **info) -> InterfaceRecord:
+    """Build an interface record."""
+    return InterfaceRecord.from_napalm(
+        name, {"is_enabled": True, "speed": 1000, "mtu": 1500, **info}
+    )
+
+
+@pytest.mark.parametrize(
+    "name,expected",
+    [
+        ("Gi0/1", "GigabitEthernet0/1"),
+        ("te1/0/1.100", "TenGigabitEthernet1/0/1.100"),
+        ("Po10", "Port-channel10"),
+        ("GigabitEthernet0/1", "GigabitEthernet0/1"),
+        ("xe-0/0/0", "xe-0/0/0"),
+    ],
+)
+def test_normalize_interface_name(name, expected):
+    """Ensure abbreviated interface names are expanded and others kept."""
+    assert normalize_interface_name(name) == expected
+
+
+def test_compile_field_transforms():
+    """Ensure transforms apply left to right and stop at None."""
+    assert (
+        compile_field("interface", "speed | int | scale:1000")(
+            interface_record(speed=100.0)
+        )
+        == 100000
+    )
+    assert (
+        compile_field("interface", "mode | nonempty | upper")(interface_record())
+        is None
+    )
+    assert (
+        compile_field("interface", "description | replace:uplink=core")(
+            interface_record(description="uplink to spine")
+        )
+        == "core to spine"
+    )
+
+    with pytest.raises(ValueError, match="unknown interface attribute"):
+        compile_field("interface", "hostname")
+    with pytest.raises(ValueError, match="invalid transform"):
+        compile_field("interface", "speed | scale:fast")
+
+
+def test_default_translator(device_record):
+    """Ensure the default mappings match the NAPALM data to the entities."""
+    translator = get_translator("ios")
+    device = translator.device(device_record)
+    interface = translator.interface(device, interface_record(speed=1000.0))
+
+    assert device.name == "router1.example.com"
+    assert device.platform.name == "ios"
+    assert device.device_type.manufacturer.name == "Cisco"
+    assert interface.name == "Gi0/1"
+    # NAPALM 4 speeds are floats, in Mbps
+    assert interface.speed == 1000000
+    assert interface.mtu == 1500
+    assert interface.mode == ""
+
+
+def test_overflowing_values_unset(device_record):
+    """Ensure values overflowing the int32 entity fields are left unset."""
+    translator = Translator()
+    interface = translator.interface(
+        translator.device(device_record),
+        interface_record(speed=4_000_000, mtu=2**40),
+    )
+
+    assert not interface.HasField("speed")
+    assert not interface.HasField("mtu")
+
+
+def test_registered_translator(device_record):
+    """Ensure a driver translator overrides the default mappings of that driver only."""
+    register_translator(
+        "ios",
+        device={"name": "hostname | remove_suffix:.example.com"},
+        interface={"name": "name | normalize_interface_name"},
+    )
+    data = CollectedData.from_napalm(
+        {
+            "device": {
+                "hostname": "router1.example.com",
+                "driver": "ios",
+                "interface_list": ["Gi0/1"],
+            },
+            "interface": {"Gi0/1": {"is_enabled": True}},
+            "interface_ip": {"Gi0/1": {"ipv4": {"10.0.0.1": {"prefix_length": 24}}}},
+        }
+    )
+
+    entities = list(translate_data(data))
+
+    assert entities[0].device.name == "router1"
+    assert entities[1].interface.name == "GigabitEthernet0/1"
+    (address,) = [entity.ip_address for entity in entities if entity.ip_address.address]
+    assert address.interface.name == "GigabitEthernet0/1"
+    assert address.interface.device.name == "router1"
+    assert get_translator("eos").device(device_record).name == "router1.example.com"